@@ -3,18 +3,42 @@
 import logging
 import time
 
-from .haimports import *  # pylint: disable=W0401,W0614
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_USERNAME, Platform
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
+
+from .statedispatcher import UIProtectAlarmsStateDispatcher
+from .startup import StartupPipeline, StartupStage
+from .snapshot import UIProtectAlarmsSnapshotStore, async_remove_snapshot
+from .executor import UIProtectAlarmsExecutor
+from .services import async_get_loaded_entry_data, async_setup_services, async_unload_services
 from .const import (
     LOGGER,
     DOMAIN,
     PYUIPROTECTALARMS_MANAGER,
     UIPROTECTALARMS_PLATFORMS,
+    UIPROTECTALARMS_WEBSOCKET,
+    UIPROTECTALARMS_DISPATCHER,
+    UIPROTECTALARMS_SNAPSHOT,
+    UIPROTECTALARMS_EXECUTOR,
     CONF_RULE_PREFIX,
-    SERVICE_REFRESH_ALARMS
+    CONF_STALL_DETECTION
 )
 
 _LOGGER = logging.getLogger(LOGGER)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Set up what is shared by all consoles."""
+    from .metricsview import UIProtectAlarmsMetricsView  # pylint: disable=C0415
+
+    hass.http.register_view(UIProtectAlarmsMetricsView())
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     "HomeAssistant EntryPoint"
@@ -27,73 +51,192 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     rule_prefix = config_entry.options.get(CONF_RULE_PREFIX)
 
     from .pyuiprotectalarms import PyUIProtectAlarms  # pylint: disable=C0415
+    from .pyuiprotectalarms.exceptions import NotAuthorized, UnifiProtectError  # pylint: disable=C0415
 
     pyuiprotectalarms_manager = PyUIProtectAlarms(host, username, password)
     pyuiprotectalarms_manager.automation_rule_prefix = rule_prefix
 
-    authenticate = await hass.async_add_executor_job(pyuiprotectalarms_manager.authenticate)
-
-    if not authenticate:
-        _LOGGER.error("Unable to login to the UIProtect server")
-        return False
-
-    load_automations = await hass.async_add_executor_job(pyuiprotectalarms_manager.load_automations)
-
-    if not load_automations:
-        _LOGGER.error("Unable to load automation list from the uiprotectalarms server")
-        return False
-
-    _LOGGER.info("%d UIProtect automations found", len(pyuiprotectalarms_manager.automations))
-
-    # Load users first (needed for updating notifications for all users)
-    load_users = await hass.async_add_executor_job(pyuiprotectalarms_manager.load_users)
-    if load_users:
-        _LOGGER.info("%d UIProtect users found", len(pyuiprotectalarms_manager.users))
-    
-    # Load notifications (non-blocking, continue even if it fails)
-    load_notifications = await hass.async_add_executor_job(pyuiprotectalarms_manager.load_notifications)
-    if load_notifications:
-        _LOGGER.info("%d UIProtect notifications found", len(pyuiprotectalarms_manager.notifications))
-    else:
-        _LOGGER.warning("Unable to load notifications, continuing without notification controls")
-
     platforms = set()
     platforms.add(Platform.SWITCH)
 
-    hass.data[DOMAIN] = {}
-    hass.data[DOMAIN][PYUIPROTECTALARMS_MANAGER] = pyuiprotectalarms_manager
-    hass.data[DOMAIN][UIPROTECTALARMS_PLATFORMS] = platforms
+    # One config entry per console. The executor is shared by all of them.
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if UIPROTECTALARMS_EXECUTOR not in domain_data:
+        domain_data[UIPROTECTALARMS_EXECUTOR] = UIProtectAlarmsExecutor(hass)
+    executor: UIProtectAlarmsExecutor = domain_data[UIPROTECTALARMS_EXECUTOR]
+    if config_entry.options.get(CONF_STALL_DETECTION):
+        executor.async_enable_stall_detection()
+
+    entry_data = domain_data[config_entry.entry_id] = {}
+    entry_data[PYUIPROTECTALARMS_MANAGER] = pyuiprotectalarms_manager
+    entry_data[UIPROTECTALARMS_PLATFORMS] = platforms
+    snapshot_store = UIProtectAlarmsSnapshotStore(hass, config_entry.entry_id, pyuiprotectalarms_manager)
+    entry_data[UIPROTECTALARMS_SNAPSHOT] = snapshot_store
+    # Keep the snapshot current as states and the set of rules change
+    dispatcher = entry_data[UIPROTECTALARMS_DISPATCHER] = UIProtectAlarmsStateDispatcher(
+        hass, on_flush=snapshot_store.async_schedule_save, metrics=pyuiprotectalarms_manager.metrics
+    )
+    config_entry.async_on_unload(
+        pyuiprotectalarms_manager.add_change_callback(lambda changes: snapshot_store.schedule_save())
+    )
 
     _LOGGER.debug("Platforms are: %s", platforms)
 
-    await hass.config_entries.async_forward_entry_setups(config_entry, platforms)
-
-    async def async_refresh_automations(service: ServiceCall) -> None:
-        """Refresh the automations, notifications, and users."""
-        _LOGGER.debug("Refreshing automations, notifications, and users")
-        
-        await hass.async_add_executor_job(pyuiprotectalarms_manager.load_automations)
-        await hass.async_add_executor_job(pyuiprotectalarms_manager.load_users)
-        await hass.async_add_executor_job(pyuiprotectalarms_manager.load_notifications)
-    
-    hass.services.async_register(
-        DOMAIN, SERVICE_REFRESH_ALARMS, async_refresh_automations
+    async def async_authenticate() -> bool:
+        if not await executor.async_run(pyuiprotectalarms_manager.authenticate):
+            _LOGGER.error("Unable to login to the UIProtect server")
+            return False
+        return True
+
+    async def async_load_automations() -> bool:
+        if not await executor.async_run(pyuiprotectalarms_manager.load_automations):
+            _LOGGER.error("Unable to load automation list from the uiprotectalarms server")
+            return False
+        _LOGGER.info("%d UIProtect automations found", len(pyuiprotectalarms_manager.automations))
+        return True
+
+    async def async_load_users() -> bool:
+        # Users are needed for updating notifications for all users
+        load_users = await executor.async_run(pyuiprotectalarms_manager.load_users)
+        if load_users:
+            _LOGGER.info("%d UIProtect users found", len(pyuiprotectalarms_manager.users))
+        return load_users
+
+    async def async_probe_capabilities() -> bool:
+        # Only the version is read while the console runs the one the stored capabilities were found on
+        capabilities = await executor.async_run(pyuiprotectalarms_manager.probe_capabilities)
+        return capabilities.complete
+
+    async def async_load_notifications() -> bool:
+        # Notification switches are added by the switch platform once these arrive
+        load_notifications = await executor.async_run(pyuiprotectalarms_manager.load_notifications)
+        if load_notifications:
+            _LOGGER.info("%d UIProtect notifications found", len(pyuiprotectalarms_manager.notifications))
+        else:
+            _LOGGER.warning("Unable to load notifications, continuing without notification controls")
+        return load_notifications
+
+    async def async_forward_platforms() -> bool:
+        await hass.config_entries.async_forward_entry_setups(config_entry, platforms)
+        return True
+
+    # Entities can be created from the last snapshot without touching the network,
+    # and then reconciled against the live server in the background.
+    warm_start = await snapshot_store.async_restore()
+
+    # Users and automations load side by side after login, and the automation
+    # switches are registered without waiting for the notifications.
+    stages = [
+        StartupStage("authenticate", async_authenticate),
+        StartupStage("load_automations", async_load_automations, ("authenticate",)),
+        StartupStage("load_users", async_load_users, ("authenticate",), required=False),
+        StartupStage("probe_capabilities", async_probe_capabilities, ("authenticate",), required=False),
+        StartupStage("load_notifications", async_load_notifications, ("load_automations",), required=False,
+                     runs_after=("load_users", "probe_capabilities")),
+    ]
+
+    # Subscribe to pushed changes so the entities follow edits made in UniFi Protect
+    from homeassistant.helpers.aiohttp_client import async_get_clientsession  # pylint: disable=C0415
+
+    from .pyuiprotectalarms.pyuiprotectwebsocket import PyUIProtectWebsocket  # pylint: disable=C0415
+
+    websocket = PyUIProtectWebsocket(
+        pyuiprotectalarms_manager,
+        async_get_clientsession(hass, verify_ssl=False),
+        executor=executor.async_run,
+        batch=dispatcher.batch,
     )
+    entry_data[UIPROTECTALARMS_WEBSOCKET] = websocket
+
+    if warm_start:
+        _LOGGER.info("Warm start from snapshot, reconciling with the UIProtect server in the background")
+        await async_forward_platforms()
+
+        async def async_reconcile() -> None:
+            try:
+                # The states the loads change are written once they are all done
+                with dispatcher.batch():
+                    reconciled = await StartupPipeline(stages).async_run()
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOGGER.debug("Reconcile failed: %s", ex)
+                reconciled = False
+
+            if reconciled:
+                snapshot_store.async_schedule_save()
+            else:
+                _LOGGER.warning("Unable to reach the UIProtect server, using the last known state until it is back")
+                websocket.request_resync()
+
+        config_entry.async_create_background_task(hass, async_reconcile(), "uiprotectalarms_reconcile")
+    else:
+        pipeline = StartupPipeline([
+            *stages,
+            # The per-user switches are built with the platforms, for the users loaded by then
+            StartupStage("forward_platforms", async_forward_platforms, ("load_automations",), runs_after=("load_users",)),
+        ])
+
+        async def async_abort_setup() -> None:
+            if pipeline.results.get("forward_platforms"):
+                await hass.config_entries.async_unload_platforms(config_entry, platforms)
+            _async_pop_entry_data(hass, config_entry)
+
+        try:
+            with dispatcher.batch():
+                started = await pipeline.async_run()
+        except NotAuthorized as ex:
+            await async_abort_setup()
+            raise ConfigEntryAuthFailed(f"Unable to login to the UIProtect server: {ex}") from ex
+        except UnifiProtectError as ex:
+            await async_abort_setup()
+            raise ConfigEntryNotReady(f"Unable to reach the UIProtect server: {ex}") from ex
+        except Exception:
+            await async_abort_setup()
+            raise
+        if not started:
+            await async_abort_setup()
+            return False
+
+        snapshot_store.async_schedule_save()
+
+    config_entry.async_create_background_task(hass, websocket.async_run(), "uiprotectalarms_websocket")
+    # Options such as the per-user switches are read at setup, so reload to apply them
+    config_entry.async_on_unload(config_entry.add_update_listener(async_reload_entry))
+
+    async_setup_services(hass)
 
     return True
 
+@callback
+def _async_pop_entry_data(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Drop the data of a config entry, and the shared data after the last one."""
+    hass.data[DOMAIN].pop(config_entry.entry_id, None)
+    if not async_get_loaded_entry_data(hass):
+        async_unload_services(hass)
+        hass.data.pop(DOMAIN)[UIPROTECTALARMS_EXECUTOR].shutdown()
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    if DOMAIN not in hass.data:
+    entry_data = hass.data.get(DOMAIN, {}).get(config_entry.entry_id)
+    if entry_data is None:
         return True
-    
+
+    await entry_data[UIPROTECTALARMS_WEBSOCKET].async_stop()
+    await entry_data[UIPROTECTALARMS_SNAPSHOT].async_save()
+
     unload_ok = await hass.config_entries.async_unload_platforms(
         config_entry,
-        hass.data[DOMAIN][UIPROTECTALARMS_PLATFORMS],
+        entry_data[UIPROTECTALARMS_PLATFORMS],
     )
-    
+
     if unload_ok:
-        hass.services.async_remove(DOMAIN, SERVICE_REFRESH_ALARMS)
-        hass.data.pop(DOMAIN)
+        _async_pop_entry_data(hass, config_entry)
 
     return unload_ok
+
+async def async_reload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Reload a config entry after its options changed."""
+    await hass.config_entries.async_reload(config_entry.entry_id)
+
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Delete the stored snapshot when the config entry is removed."""
+    await async_remove_snapshot(hass, config_entry.entry_id)
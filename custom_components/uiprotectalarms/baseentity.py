@@ -1,17 +1,18 @@
 """BaseDevice utilities for Protect Component."""
 
-import asyncio
 import logging
 
+from homeassistant.helpers.entity import DeviceInfo, Entity
+
 from .pyuiprotectalarms import PyUIProtectAlarms
 from .pyuiprotectalarms.pyuiprotectbaseobject import PyUIProtectBaseObject
 
-from .haimports import * # pylint: disable=W0401,W0614
-
 from .const import (
     DOMAIN,
-    LOGGER
+    LOGGER,
+    UIPROTECTALARMS_DISPATCHER
 )
+from .statedispatcher import UIProtectAlarmsStateDispatcher
 
 _LOGGER = logging.getLogger(LOGGER)
 
@@ -21,6 +22,7 @@ class UIProtectAlarmsBaseEntityHA(Entity):
     def __init__(self, pyuiprotect_base_obj: PyUIProtectBaseObject) -> None:
         """Initialize the entity."""
         self.pyuiprotect_base_obj = pyuiprotect_base_obj
+        self._dispatcher: UIProtectAlarmsStateDispatcher | None = None
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -29,9 +31,9 @@ class UIProtectAlarmsBaseEntityHA(Entity):
         return DeviceInfo(
             identifiers={
                 # Serial numbers are unique identifiers within a specific domain
-                (DOMAIN, self.pyuiprotect_base_obj._uiProtectAlarms._host)
+                (DOMAIN, self.pyuiprotect_base_obj._uiProtectAlarms.host)
             },
-            name="NVR - " + self.pyuiprotect_base_obj._uiProtectAlarms._host,
+            name="NVR - " + self.pyuiprotect_base_obj._uiProtectAlarms.host,
             manufacturer="Ubiquiti",
             model="NVR"
         )
@@ -42,31 +44,27 @@ class UIProtectAlarmsBaseEntityHA(Entity):
         # return self.device.connection_status == "online"
         return True
     
+    @property
+    def subscribed_fields(self) -> tuple[str, ...] | None:
+        """Return the fields of the object's record the entity shows, or None for all of them."""
+        return None
+
     async def async_added_to_hass(self):
         """Register callbacks."""
 
-        # Store hass reference for thread-safe updates
-        hass_ref = self.hass
+        self._dispatcher = self.hass.data[DOMAIN][self.platform.config_entry.entry_id][
+            UIPROTECTALARMS_DISPATCHER
+        ]
 
-        # Create a callback to update state in HA and add it a callback in
-        # the PyUIProtectAlarms device. This will cause all handle_server_update responses
-        # to update the state in HA.
-        def update_state():
-            # Schedule the state update in the event loop
-            # This ensures we're not calling async_write_ha_state from a thread
-            if hass_ref and hass_ref.loop and hass_ref.loop.is_running():
-                # Create a task in the event loop using call_soon_threadsafe
-                # We need to create the coroutine and schedule it properly
-                def schedule_update():
-                    # This function runs in the event loop thread
-                    # Use hass.async_create_task which is the proper way to schedule
-                    # async operations in Home Assistant
-                    hass_ref.async_create_task(self.async_write_ha_state())
-                
-                # Schedule the function to run in the event loop
-                hass_ref.loop.call_soon_threadsafe(schedule_update)
-            else:
-                # Fallback: try to schedule directly if loop is not available
-                _LOGGER.warning("Cannot schedule state update: hass or loop not available")
+        # Have handle_server_update responses changing the fields the entity
+        # shows update its state in HA. The object holds the callback by weak
+        # reference, and it is dropped when the entity is removed, as the object
+        # can outlive it (e.g. the entity is disabled).
+        self.async_on_remove(
+            self.pyuiprotect_base_obj.add_attr_callback(self._handle_object_update, self.subscribed_fields)
+        )
 
-        self.pyuiprotect_base_obj.add_attr_callback(update_state)
\ No newline at end of file
+    def _handle_object_update(self) -> None:
+        # Can run on an executor thread, so the write is handed to the
+        # dispatcher, which batches them onto the event loop.
+        self._dispatcher.mark_dirty(self)
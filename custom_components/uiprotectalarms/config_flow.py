@@ -4,11 +4,18 @@ from typing import Any
 
 import voluptuous as vol
 
-from .haimports import * # pylint: disable=W0401,W0614
+from homeassistant import config_entries
+from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
+
 from .const import (
     DOMAIN,
+    PYUIPROTECTALARMS_MANAGER,
     CONF_AUTO_RECONNECT,
-    CONF_RULE_PREFIX
+    CONF_RULE_PREFIX,
+    CONF_STALL_DETECTION,
+    CONF_PER_USER_NOTIFICATIONS
 )
 from .pyuiprotectalarms import PyUIProtectAlarms
 
@@ -47,9 +54,6 @@ class UiprotectalarmsFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_user(self, user_input=None):
         """Handle a flow start."""
-        if self._async_current_entries():
-            return self.async_abort(reason="single_instance_allowed")
-
         if user_input is None:
             return self._show_form()
 
@@ -57,6 +61,10 @@ class UiprotectalarmsFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         self._password = user_input[CONF_PASSWORD]
         self._host = user_input[CONF_HOST]
 
+        # One entry per console
+        await self.async_set_unique_id(self._host)
+        self._abort_if_unique_id_configured()
+
         pyuiprotectalarms_manager = PyUIProtectAlarms(self._host,
                                                       self._username, 
                                                       self._password)
@@ -98,9 +106,23 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             _LOGGER.debug("rule_prefix not set, setting it to True")
             rule_prefix = True
 
+        # Users of the console, once it is loaded, offered for per-user notification switches
+        manager: PyUIProtectAlarms | None = self.hass.data.get(DOMAIN, {}).get(
+            self.config_entry.entry_id, {}
+        ).get(PYUIPROTECTALARMS_MANAGER)
+        users = {user.id: user.name for user in manager.users.values()} if manager is not None else {}
+        per_user_ids = [
+            user_id for user_id in self.config_entry.options.get(CONF_PER_USER_NOTIFICATIONS, []) if user_id in users
+        ]
+
         options_schema = vol.Schema(
             {
-                vol.Required(CONF_RULE_PREFIX, default=rule_prefix): str
+                vol.Required(CONF_RULE_PREFIX, default=rule_prefix): str,
+                vol.Required(
+                    CONF_STALL_DETECTION,
+                    default=self.config_entry.options.get(CONF_STALL_DETECTION, False),
+                ): bool,
+                vol.Optional(CONF_PER_USER_NOTIFICATIONS, default=per_user_ids): cv.multi_select(users),
             }
         )
         return self.async_show_form(
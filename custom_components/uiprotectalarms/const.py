@@ -6,8 +6,40 @@ UIPROTECTALARMS_DISCOVERY = "uiprotectalarms_discovery_{}"
 SERVICE_UPDATE_DEVS = "update_devices"
 PYUIPROTECTALARMS_MANAGER = "pyuiprotectalarms_manager"
 UIPROTECTALARMS_PLATFORMS = "platforms"
+UIPROTECTALARMS_WEBSOCKET = "websocket"
+UIPROTECTALARMS_DISPATCHER = "dispatcher"
+UIPROTECTALARMS_SNAPSHOT = "snapshot"
+UIPROTECTALARMS_EXECUTOR = "executor"
 
 CONF_AUTO_RECONNECT = "auto_reconnect"
 CONF_RULE_PREFIX = "rule_prefix"
+CONF_STALL_DETECTION = "stall_detection"
+CONF_PER_USER_NOTIFICATIONS = "per_user_notifications"
 
-SERVICE_REFRESH_ALARMS = "refresh_alarms"
\ No newline at end of file
+SERVICE_REFRESH_ALARMS = "refresh_alarms"
+SERVICE_CAPTURE_TRACES = "capture_traces"
+SERVICE_PROFILE = "profile"
+SERVICE_RECORD_CASSETTE = "record_cassette"
+SERVICE_SET_NOTIFICATION_CHANNEL = "set_notification_channel"
+
+ATTR_SCOPE = "scope"
+ATTR_AUTOMATION_IDS = "automation_ids"
+ATTR_FORCE = "force"
+ATTR_DURATION = "duration"
+ATTR_SORT = "sort"
+ATTR_TOP = "top"
+ATTR_REFRESH = "refresh"
+ATTR_CHANNEL = "channel"
+ATTR_ENABLED = "enabled"
+ATTR_USER_IDS = "user_ids"
+
+REFRESH_SCOPE_AUTOMATIONS = "automations"
+REFRESH_SCOPE_USERS = "users"
+REFRESH_SCOPE_NOTIFICATIONS = "notifications"
+REFRESH_SCOPES = (REFRESH_SCOPE_AUTOMATIONS, REFRESH_SCOPE_USERS, REFRESH_SCOPE_NOTIFICATIONS)
+
+# Notification channels the set_notification_channel service can turn on or off
+NOTIFICATION_CHANNELS = ("push", "email")
+
+# Orders of the profile service's CPU report
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "calls")
\ No newline at end of file
@@ -9,11 +9,17 @@ import logging
 
 from typing import Any
 
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
 from .pyuiprotectalarms import PyUIProtectAlarms
-from .haimports import * # pylint: disable=W0401,W0614
+from .pyuiprotectalarms.helpers import SENSITIVE_KEYS
+from .pyuiprotectalarms.pyuiprotectreceivers import notification_receivers
 from .const import (
     DOMAIN,
-    PYUIPROTECTALARMS_MANAGER
+    PYUIPROTECTALARMS_MANAGER,
+    UIPROTECTALARMS_EXECUTOR
 )
 
 KEYS_TO_REDACT = {
@@ -27,9 +33,21 @@ KEYS_TO_REDACT = {
     "_username",
     "token",
     "_token",
-    "productId"
+    "productId",
+    "host",
+    "email",
+    "firstName",
+    "lastName",
+    "fullName",
+    "localUsername",
+    "phone",
+    # What the library redacts from its logs and cassettes
+    *SENSITIVE_KEYS,
 }
 
+# Users are people, so their names go too
+USER_KEYS_TO_REDACT = KEYS_TO_REDACT | {"name", "alias"}
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -37,37 +55,52 @@ async def async_get_config_entry_diagnostics(
     hass: HomeAssistant, entry: ConfigEntry
 ) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
-    pyuiprotectalarms_manager: PyUIProtectAlarms = hass.data[DOMAIN][PYUIPROTECTALARMS_MANAGER]
+    pyuiprotectalarms_manager: PyUIProtectAlarms = hass.data[DOMAIN][entry.entry_id][
+        PYUIPROTECTALARMS_MANAGER
+    ]
+
+    stall_detector = hass.data[DOMAIN][UIPROTECTALARMS_EXECUTOR].stall_detector
 
-    return _get_diagnostics(pyuiprotectalarms_manager)
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), KEYS_TO_REDACT),
+            "options": dict(entry.options),
+        },
+        **_get_diagnostics(pyuiprotectalarms_manager),
+        # Shared by all consoles, and only there when enabled in the options
+        "stall_detection": stall_detector.as_dict() if stall_detector is not None else None,
+    }
 
 def _get_diagnostics(pyuiprotectalarms_manager: PyUIProtectAlarms) -> dict[str, Any]:
-    data = {
+    # Read one published state, so the automations, notifications and users agree
+    state = pyuiprotectalarms_manager.state
+    automations = state.automations.values()
+    notifications = state.notifications.values()
+    users = state.users
+    # Receivers the users don't resolve, e.g. users deleted since or loaded too long ago
+    unknown_receivers = {
+        receiver.get("user")
+        for automation in automations if automation.raw_details
+        for receiver in notification_receivers(automation.raw_details)
+    } - users.keys() - {None}
+
+    return {
         DOMAIN: {
-            "device_count": len(pyuiprotectalarms_manager.devices),
-            "raw_devicelist": _redact_values(pyuiprotectalarms_manager.raw_response),
+            "automation_count": len(automations),
+            "notification_count": len(notifications),
+            "user_count": len(users),
+            "users_stale": pyuiprotectalarms_manager.users_stale,
+            "capabilities": pyuiprotectalarms_manager.capabilities.as_dict(),
         },
-        "devices": [_redact_values(device.__dict__) for device in pyuiprotectalarms_manager.devices],
+        "automations": [
+            async_redact_data(automation.raw_details, KEYS_TO_REDACT)
+            for automation in automations if automation.raw_details
+        ],
+        "notifications": [
+            async_redact_data(notification.raw_details, KEYS_TO_REDACT)
+            for notification in notifications if notification.raw_details
+        ],
+        "users": [async_redact_data(user.as_dict(), USER_KEYS_TO_REDACT) for user in users.values()],
+        "unknown_receivers": sorted(unknown_receivers),
+        "stats": pyuiprotectalarms_manager.stats.as_dict(),
     }
-
-    return data
-
-def _redact_values(data: dict) -> dict:
-    """Rebuild and redact values of a dictionary, recursively"""
-
-    new_data = {}
-
-    for key, item in data.items():
-        if key not in KEYS_TO_REDACT:
-            if isinstance(item, dict):
-                new_data[key] = _redact_values(item)
-            elif isinstance(item, list):
-                for listitem in item:
-                    if isinstance(listitem, dict):
-                        new_data[key] = [_redact_values(listitem)]
-            else:
-                new_data[key] = item
-        else:
-            new_data[key] = REDACTED
-
-    return new_data
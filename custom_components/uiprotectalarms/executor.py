@@ -0,0 +1,78 @@
+"""Executor shared by every UIProtect console configured in HomeAssistant."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from homeassistant.core import HomeAssistant, callback
+
+from .stalldetector import UIProtectAlarmsStallDetector
+
+from .const import LOGGER
+
+_LOGGER = logging.getLogger(LOGGER)
+
+# Blocking library calls allowed to run at once, across all consoles
+MAX_CONCURRENT_JOBS = 4
+# Delay between starting the refresh of one console and the next
+REFRESH_STAGGER_SECONDS = 0.5
+
+
+class UIProtectAlarmsExecutor:
+    """Run blocking library calls in HA's executor, a bounded number at a time.
+
+    One instance is shared by all config entries, so a site with dozens of
+    consoles does not tie up every executor thread. Calls waiting for a slot
+    wait on the event loop, not on an executor thread. With stall detection
+    enabled, every job is timed.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_jobs: int = MAX_CONCURRENT_JOBS) -> None:
+        self._hass = hass
+        self._semaphore = asyncio.Semaphore(max_jobs)
+        self.stall_detector: UIProtectAlarmsStallDetector | None = None
+
+    async def async_run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func(*args) in the executor once a slot is free."""
+        stall_detector = self.stall_detector
+        if stall_detector is None:
+            async with self._semaphore:
+                return await self._hass.async_add_executor_job(func, *args)
+
+        submitted = time.perf_counter()
+        async with self._semaphore:
+            timed = stall_detector.wrap(func, submitted, time.perf_counter())
+            return await self._hass.async_add_executor_job(timed, *args)
+
+    @callback
+    def async_enable_stall_detection(self) -> UIProtectAlarmsStallDetector:
+        """Start timing jobs and watching the event loop, if not already."""
+        if self.stall_detector is None:
+            self.stall_detector = UIProtectAlarmsStallDetector(self._hass)
+            self.stall_detector.async_start()
+        return self.stall_detector
+
+    def shutdown(self) -> None:
+        """Stop the stall detector, once the last console is unloaded."""
+        if self.stall_detector is not None:
+            self.stall_detector.stop()
+
+    async def async_run_staggered(
+        self, jobs: list[Callable[[], Awaitable[Any]]], interval: float = REFRESH_STAGGER_SECONDS
+    ) -> list[Any]:
+        """Start each job `interval` seconds after the previous one and wait for all of them.
+
+        Exceptions are returned in place of the job's result.
+        """
+        async def async_run_job(delay: float, job: Callable[[], Awaitable[Any]]) -> Any:
+            if delay:
+                await asyncio.sleep(delay)
+            return await job()
+
+        return await asyncio.gather(
+            *(async_run_job(index * interval, job) for index, job in enumerate(jobs)),
+            return_exceptions=True,
+        )
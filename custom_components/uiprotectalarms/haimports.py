@@ -1,45 +0,0 @@
-"""Include all HA imports here."""
-
-# Single file for all HA imports so that we can include this in all
-# other files, and disable linting in one specific place.
-
-# This is pretty ugly all things considered, but seems less ugly than 
-# ignoring specific lines all over the place
-
-# pylint: disable=unused-import, wildcard-import, unused-wildcard-import
-
-import voluptuous as vol
-from homeassistant.const import CONF_PASSWORD, CONF_USERNAME, CONF_HOST, Platform
-
-from homeassistant import config_entries, core
-
-from homeassistant.core import HomeAssistant, ServiceCall
-from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
-
-from homeassistant.components.diagnostics import REDACTED 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.typing import StateType
-
-from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-
-from homeassistant.helpers.entity import (
-    DeviceInfo,
-    Entity,
-    EntityDescription
-)
-
-from homeassistant.components.switch import (
-    SwitchEntity,
-    SwitchEntityDescription
-)
-
-from homeassistant.const import (
-    ATTR_ENTITY_ID,
-    STATE_OFF,
-    STATE_ON
-)
-
-from homeassistant.helpers import entity_platform
@@ -0,0 +1,35 @@
+"""Prometheus metrics endpoint for the Uiprotectalarms HomeAssistant Integration."""
+
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .pyuiprotectalarms.metrics import render_prometheus
+from .services import async_get_loaded_entry_data
+from .const import DOMAIN, PYUIPROTECTALARMS_MANAGER, UIPROTECTALARMS_EXECUTOR
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class UIProtectAlarmsMetricsView(HomeAssistantView):
+    """Serve the metrics of every console in the Prometheus text format.
+
+    Like the rest of the HA API, this needs a long-lived access token.
+    """
+
+    url = "/api/uiprotectalarms/metrics"
+    name = "api:uiprotectalarms:metrics"
+    requires_auth = True
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Render the current metrics."""
+        hass: HomeAssistant = request.app["hass"]
+        registries = [
+            entry_data[PYUIPROTECTALARMS_MANAGER].metrics
+            for entry_data in async_get_loaded_entry_data(hass).values()
+        ]
+        executor = hass.data.get(DOMAIN, {}).get(UIPROTECTALARMS_EXECUTOR)
+        if executor is not None and executor.stall_detector is not None:
+            registries.append(executor.stall_detector.metrics)
+        body = render_prometheus(registries)
+        return web.Response(body=body.encode(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
@@ -10,12 +10,13 @@ from typing import Any, Callable
 from dataclasses import dataclass
 import logging
 
-from .haimports import *  # pylint: disable=W0401,W0614
+from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
+
 from .pyuiprotectalarms import PyUIProtectAlarms
 from .pyuiprotectalarms.pyuiprotectnotification import PyUIProtectNotification
 from .baseentity import UIProtectAlarmsBaseEntityHA
 
-from .const import LOGGER, DOMAIN, PYUIPROTECTALARMS_MANAGER
+from .const import LOGGER, DOMAIN, PYUIPROTECTALARMS_MANAGER, UIPROTECTALARMS_EXECUTOR
 
 _LOGGER = logging.getLogger(LOGGER)
 
@@ -89,6 +90,11 @@ class UIProtectAlarmsNotificationSwitchHA(UIProtectAlarmsBaseEntityHA, SwitchEnt
         if description.icon:
             self._attr_icon = description.icon
 
+    @property
+    def subscribed_fields(self) -> tuple[str, ...]:
+        """Return the fields of the record the switch shows."""
+        return (self.entity_description.attr_name, "name")
+
     @property
     def is_on(self) -> bool:
         """Return True if notification channel is enabled."""
@@ -110,7 +116,7 @@ class UIProtectAlarmsNotificationSwitchHA(UIProtectAlarmsBaseEntityHA, SwitchEnt
         """Turn the notification channel on."""
         _LOGGER.debug("Turning on %s %s", self.pyuiprotectalarms_notification.name, self.entity_description.key)
         # Run the synchronous setter in executor to avoid blocking
-        await self.hass.async_add_executor_job(
+        await self.hass.data[DOMAIN][UIPROTECTALARMS_EXECUTOR].async_run(
             setattr, 
             self.pyuiprotectalarms_notification, 
             self.entity_description.attr_name, 
@@ -126,7 +132,7 @@ class UIProtectAlarmsNotificationSwitchHA(UIProtectAlarmsBaseEntityHA, SwitchEnt
             "Turning off %s %s", self.pyuiprotectalarms_notification.name, self.entity_description.key
         )
         # Run the synchronous setter in executor to avoid blocking
-        await self.hass.async_add_executor_job(
+        await self.hass.data[DOMAIN][UIPROTECTALARMS_EXECUTOR].async_run(
             setattr,
             self.pyuiprotectalarms_notification,
             self.entity_description.attr_name,
@@ -0,0 +1,158 @@
+"""On-demand profiling of UIProtect refreshes with cProfile and tracemalloc."""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from .executor import UIProtectAlarmsExecutor
+from .pyuiprotectalarms import PyUIProtectAlarms
+from .pyuiprotectalarms.pyuiprotectchanges import PyUIProtectChanges
+from .const import (
+    LOGGER,
+    REFRESH_SCOPE_AUTOMATIONS,
+    REFRESH_SCOPE_USERS,
+    REFRESH_SCOPE_NOTIFICATIONS,
+)
+
+_LOGGER = logging.getLogger(LOGGER)
+
+# Frames kept per allocation by tracemalloc
+TRACEMALLOC_FRAMES = 10
+# Functions the CPU report always lists, wherever they rank
+PROFILE_FOCUS = (
+    "load_automations",
+    "load_users",
+    "load_notifications",
+    "_extract_notifications_from_automations",
+    "update_state",
+    "_do_callbacks",
+    "_notify_changes",
+    "_async_flush",
+    "async_write_ha_state",
+)
+
+# Allocations made by the profilers themselves are left out of the report
+_TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def run_refresh(pyuiprotectalarms_manager: PyUIProtectAlarms, scope: set[str], force: bool) -> PyUIProtectChanges:
+    """Reload the given scope of one console, the blocking part of a refresh."""
+    summary = PyUIProtectChanges()
+    if REFRESH_SCOPE_AUTOMATIONS in scope:
+        pyuiprotectalarms_manager.load_automations(force, summary)
+    if REFRESH_SCOPE_USERS in scope:
+        pyuiprotectalarms_manager.load_users()
+    if REFRESH_SCOPE_NOTIFICATIONS in scope:
+        pyuiprotectalarms_manager.load_notifications(force, summary)
+    return summary
+
+
+class UIProtectAlarmsProfiler:
+    """Profile library calls in the executor and the state writes on the event loop.
+
+    cProfile only sees the thread it is enabled on, so every executor job gets
+    its own profile, and so does the event loop while the state writes the
+    calls scheduled are flushed. The profiles are merged into one report.
+    tracemalloc traces every thread, and reports what the run allocated and
+    still holds at the end.
+    """
+
+    def __init__(self, executor: UIProtectAlarmsExecutor) -> None:
+        self._executor = executor
+        self._profiles: list[cProfile.Profile] = []
+        self._started_tracemalloc = False
+        self._snapshot_before: tracemalloc.Snapshot | None = None
+        self.snapshot: tracemalloc.Snapshot | None = None
+        self.peak_memory = 0
+        self.elapsed = 0.0
+        self._start = 0.0
+
+    def start(self) -> None:
+        """Start tracing memory allocations."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._snapshot_before = tracemalloc.take_snapshot()
+        self._start = time.perf_counter()
+
+    async def async_run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func(*args) in the executor under its own profile."""
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        return await self._executor.async_run(profile.runcall, func, *args)
+
+    async def async_settle(self) -> None:
+        """Profile the event loop until the callbacks already scheduled (e.g. state flushes) have run."""
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        profile.enable()
+        try:
+            await asyncio.sleep(0)
+        finally:
+            profile.disable()
+
+    def stop(self) -> None:
+        """Stop tracing memory allocations and keep what the run allocated."""
+        self.elapsed = time.perf_counter() - self._start
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        self.snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def cpu_report(self, sort: str = "cumulative", top: int = 40) -> str:
+        """Return the merged profiles as text, sorted by sort, with the refresh functions called out."""
+        output = io.StringIO()
+        profiles = [profile for profile in self._profiles if profile.getstats()]
+        if not profiles:
+            return "Nothing was profiled\n"
+
+        stats = pstats.Stats(profiles[0], stream=output)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.strip_dirs().sort_stats(sort)
+
+        output.write(f"UIProtect alarms profile, {self.elapsed:.3f} s wall time\n\n")
+        output.write("Refresh functions\n")
+        stats.print_stats("|".join(PROFILE_FOCUS))
+        output.write(f"\nTop {top} functions by {sort}\n")
+        stats.print_stats(top)
+        output.write("\nCallers of the refresh functions\n")
+        stats.print_callers("|".join(PROFILE_FOCUS))
+        return output.getvalue()
+
+    def memory_report(self, top: int = 40) -> str:
+        """Return the top allocations of the run, by size still held at the end, as text."""
+        if self.snapshot is None or self._snapshot_before is None:
+            return "Nothing was traced\n"
+
+        before = self._snapshot_before.filter_traces(_TRACEMALLOC_FILTERS)
+        after = self.snapshot.filter_traces(_TRACEMALLOC_FILTERS)
+        differences = after.compare_to(before, "traceback")
+
+        lines = [
+            f"UIProtect alarms allocations, peak traced memory {self.peak_memory / 1024:.1f} KiB",
+            "",
+            f"Top {top} allocations still held after the run",
+        ]
+        for index, difference in enumerate(differences[:top], 1):
+            lines.append(
+                f"#{index}: {difference.size_diff / 1024:+.1f} KiB in {difference.count_diff:+d} blocks"
+                f" ({difference.size / 1024:.1f} KiB in total)"
+            )
+            lines.extend(f"    {line}" for line in difference.traceback.format(most_recent_first=True))
+        return "\n".join(lines) + "\n"
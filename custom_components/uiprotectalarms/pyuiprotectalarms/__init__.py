@@ -1,34 +1,52 @@
 """UniFi Protect Server Wrapper."""
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import replace
 from http import HTTPStatus
-from http.cookies import SimpleCookie
-from pathlib import Path
-from typing import Optional, Any, cast
-from urllib.parse import SplitResult
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Mapping, Optional, Any, cast
 
 import threading
 import hashlib
 import logging
 import re
 import time
-import requests
 
-import aiohttp
-from yarl import URL
 from .constants import (
     LOGGER_NAME,
     UIProtectApi,
     UIPROTECT_APIS,
     UIPROTECT_API_PATH,
-    UIPROTECT_API_METHOD
+    UIPROTECT_API_METHOD,
+    UIPROTECT_WS_UPDATES_PATH,
+    UIProtectModelKey,
+    UIProtectWsAction
 )
 
 from .helpers import Helpers
 from .exceptions import (NvrError, NotAuthorized, BadRequest)
 from .pyuiprotectautomation import PyUIProtectAutomation
 from .pyuiprotectnotification import PyUIProtectNotification
+from .pyuiprotectchanges import PyUIProtectChanges
+from .pyuiprotectstats import PyUIProtectStats
+from .pyuiprotectreceivers import CHANNEL_BITS, PyUIProtectReceiverMatrix, receiver_ids
+from .pyuiprotectstate import PyUIProtectStagedState, PyUIProtectState
+from .pyuiprotectusers import USERS_TTL, PyUIProtectUserDirectory
+from .pyuiprotectcapabilities import PyUIProtectCapabilities, endpoint_available
+from .metrics import MetricsRegistry
+from .tracing import TRACER
+
+if TYPE_CHECKING:
+    from http.cookies import SimpleCookie
+
+    import aiohttp
+    import requests
 
 TOKEN_COOKIE_MAX_EXP_SECONDS = 60
 
+SNAPSHOT_VERSION = 1
+# Automation fields that change on every run and are not needed to rebuild state
+SNAPSHOT_VOLATILE_AUTOMATION_KEYS = frozenset({"status"})
+
 # retry timeout for thumbnails/heatmaps
 RETRY_TIMEOUT = 10
 PROTECT_APT_URLS = [
@@ -45,7 +63,7 @@ def get_user_hash(host: str, username: str) -> str:
     session.update(username.encode("utf8"))
     return session.hexdigest()
 
-def get_response_reason(response: aiohttp.ClientResponse) -> str:
+def get_response_reason(response: "aiohttp.ClientResponse") -> str:
     """Get the reason from the response."""
     return response.reason or "Unknown"
 
@@ -77,12 +95,30 @@ class PyUIProtectAlarms:
         self._password = password
         
         self._automation_rule_prefix = None
-        self._automations : dict[str, PyUIProtectAutomation] = {}
-        self._notifications : dict[str, PyUIProtectNotification] = {}
-        self._users : list[dict] = []
+        # Published as a whole, see pyuiprotectstate. Readers take it without a lock.
+        self._state = PyUIProtectState()
+        # Held by the one writer staging the next state
+        self._state_lock = threading.RLock()
+        self._staged : PyUIProtectStagedState | None = None
+        # Who each automation notifies, and how, compiled from the automations as they change
+        self.receivers = PyUIProtectReceiverMatrix()
+        # Seconds the users are fresh for, and when they were last loaded, on the monotonic clock
+        self.users_ttl = USERS_TTL
+        self._users_loaded_at : float | None = None
+        # What the console's firmware supports, replaced as a whole. See probe_capabilities.
+        self.capabilities = PyUIProtectCapabilities()
+        self._notifications_from_automations = False
+        self._change_cbs : list[Callable[[PyUIProtectChanges], None]] = []
+        self.metrics = MetricsRegistry({"console": host})
+        self.stats = PyUIProtectStats(self.metrics)
 
         self._update_url()
 
+    @property
+    def host(self) -> str:
+        """Return the console host."""
+        return self._host
+
     @property
     def automation_rule_prefix(self):
         """For filtering automations by name."""
@@ -94,41 +130,131 @@ class PyUIProtectAlarms:
         self._automation_rule_prefix = value
 
     @property
-    def automations(self) -> dict[PyUIProtectAutomation]:
-        """Return the automations."""
-        return self._automations
+    def state(self) -> PyUIProtectState:
+        """Return the published state. Read it once to get a consistent view."""
+        return self._state
+
+    @property
+    def automations(self) -> Mapping[str, PyUIProtectAutomation]:
+        """Return the automations, as a read-only map."""
+        return self._state.automations
+
+    @property
+    def notifications(self) -> Mapping[str, PyUIProtectNotification]:
+        """Return the notifications, as a read-only map."""
+        return self._state.notifications
 
     @property
-    def notifications(self) -> dict[PyUIProtectNotification]:
-        """Return the notifications."""
-        return self._notifications
+    def users(self) -> PyUIProtectUserDirectory:
+        """Return the users, by id."""
+        return self._state.users
 
     @property
-    def users(self) -> list[dict]:
-        """Return the users."""
-        return self._users
+    def users_stale(self) -> bool:
+        """Return True if the users were never loaded, or not within users_ttl."""
+        return self._users_loaded_at is None or time.monotonic() - self._users_loaded_at >= self.users_ttl
+
+    @contextmanager
+    def _staging(self) -> Iterator[PyUIProtectStagedState]:
+        """Stage changes to the state, published as one new version when the outermost block exits.
+
+        Writers are serialized; readers keep seeing the previous version until
+        then. Changes reported while staging reach the change callbacks after
+        they are published, once the lock is released.
+        """
+        with self._state_lock:
+            outermost = self._staged is None
+            if outermost:
+                self._staged = PyUIProtectStagedState(self._state)
+            staged = self._staged
+            try:
+                yield staged
+            finally:
+                if outermost:
+                    self._staged = None
+                    if staged.changed:
+                        self._state = staged.build()
+        if outermost:
+            for changes in staged.pending_changes:
+                self._run_change_callbacks(changes)
+
+    def add_change_callback(self, cb: Callable[[PyUIProtectChanges], Optional[Future]]) -> Callable[[], None]:
+        """Add a callback run when automations or notifications are added or removed.
+
+        The callback runs on the thread that made the change. Removed objects are
+        released once it returns, or, if it hands them on and returns a Future
+        (e.g. from asyncio.run_coroutine_threadsafe), once that is done.
+        Returns a function that removes the callback again.
+        """
+        self._change_cbs.append(cb)
+        return lambda: self._change_cbs.remove(cb)
+
+    def _notify_changes(self, changes: PyUIProtectChanges) -> None:
+        if not changes:
+            return
 
-    def _update_cookiename(self, cookie: SimpleCookie) -> None:
+        with self._state_lock:
+            # Held already if this thread is staging, so the changes wait until they are published
+            if self._staged is not None:
+                self._staged.pending_changes.append(changes)
+                return
+        self._run_change_callbacks(changes)
+
+    def _run_change_callbacks(self, changes: PyUIProtectChanges) -> None:
+        _LOGGER.debug("PyUIProtectAlarms: changes: +%s -%s automations, +%s -%s notifications, receivers of %s",
+                      list(changes.added_automations), list(changes.removed_automations),
+                      list(changes.added_notifications), list(changes.removed_notifications),
+                      list(changes.receivers_changed_automations))
+        change_cbs = list(self._change_cbs)
+        self.stats.change_callbacks.inc(len(change_cbs))
+        with TRACER.span("change_callbacks", callbacks=len(change_cbs)):
+            pending = [result for result in (cb(changes) for cb in change_cbs) if isinstance(result, Future)]
+
+        removed_objs = [*changes.removed_automations.values(), *changes.removed_notifications.values()]
+        if removed_objs:
+            self._release_when_done(removed_objs, pending)
+
+    @staticmethod
+    def _release_when_done(objs: list, pending: list[Future]) -> None:
+        """Release objs once the listeners still using them are done, now if none are."""
+        remaining = len(pending)
+        lock = threading.Lock()
+
+        def done(_future: Optional[Future] = None) -> None:
+            nonlocal remaining
+            with lock:
+                remaining -= 1
+                if remaining > 0:
+                    return
+            for obj in objs:
+                obj.release()
+
+        if not pending:
+            remaining = 1
+            done()
+        for future in pending:
+            future.add_done_callback(done)
+
+    def _update_cookiename(self, cookie: "SimpleCookie") -> None:
         if "UOS_TOKEN" in cookie:
             self._cookiename = "UOS_TOKEN"
 
     def _update_url(self) -> None:
         """Updates the url after changing _host or _port."""
-        if self._port != 443:
-            self._url = URL(f"https://{self._host}:{self._port}")
-        else:
-            self._url = URL(f"https://{self._host}")
-
-        self.base_url = str(self._url)
+        netloc = self._host if self._port == 443 else f"{self._host}:{self._port}"
+        self.base_url = f"https://{netloc}"
+        self.ws_url = f"wss://{netloc}{UIPROTECT_WS_UPDATES_PATH}"
 
     def _raise_for_status(
-        self, response: aiohttp.ClientResponse, raise_exception: bool = True
+        self, api: str, status: int, raise_exception: bool = True
     ) -> None:
-        """Raise an exception based on the response status."""
-        url = response.url
-        reason = get_response_reason(response)
+        """Raise an exception based on the status code of a call to api. 0 means the request failed."""
+        url = self.base_url + UIPROTECT_APIS[api][UIPROTECT_API_PATH]
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = "No response" if not status else "Unknown"
         msg = "Request failed: %s - Status: %s - Reason: %s"
-        status = response.status
 
         if raise_exception:
             if status in {
@@ -137,7 +263,7 @@ class PyUIProtectAlarms:
             }:
                 raise NotAuthorized(msg % (url, status, reason))
             elif status == HTTPStatus.TOO_MANY_REQUESTS.value:
-                _LOGGER.debug("Too many requests - Login is rate limited: %s", response)
+                _LOGGER.debug("Too many requests - Login is rate limited: %s", url)
                 raise NvrError(msg % (url, status, reason))
             elif (
                 status >= HTTPStatus.BAD_REQUEST.value
@@ -151,7 +277,10 @@ class PyUIProtectAlarms:
     def ensure_authenticated(self) -> None:
         """Ensure we are authenticated."""
         if self.is_authenticated() is False:
+            self.stats.caches["auth_token"].record(misses=1)
             self.authenticate()
+        else:
+            self.stats.caches["auth_token"].record(hits=1)
     
     def call_uiprotect_api(self, api: str, path:str = None, json_object: Optional[dict] = None) -> tuple[dict, int]:
         """Call the UIProtect API. This is used for login and the initial device list and states as well
@@ -163,33 +292,68 @@ class PyUIProtectAlarms:
             json_object = {}
 
         if (api == UIProtectApi.LOGIN):
-            response_obj = Helpers.call_api(
-                self.base_url,
-                UIPROTECT_APIS[api][UIPROTECT_API_PATH],
-                UIPROTECT_APIS[api][UIPROTECT_API_METHOD],
-                json_object,
-                None,
+            import requests  # pylint: disable=C0415
+
+            start = time.perf_counter()
+            try:
+                response_obj = Helpers.call_api(
+                    self.base_url,
+                    UIPROTECT_APIS[api][UIPROTECT_API_PATH],
+                    UIPROTECT_APIS[api][UIPROTECT_API_METHOD],
+                    json_object,
+                    None,
+                    self.stats.endpoints[api],
+                )
+            except requests.exceptions.RequestException as ex:
+                # Unreachable, like the other calls: status 0, raised by authenticate as an NvrError
+                _LOGGER.debug("Login request failed: %s", ex)
+                self.stats.endpoints[api].record(time.perf_counter() - start, 0, 0)
+                return None, 0
+            self.stats.endpoints[api].record(
+                time.perf_counter() - start, response_obj.status_code, len(response_obj.content)
             )
             if (response_obj.status_code == 200):
                 # Unfortunate hack here to set the last token cookie here...
                 self._update_last_token_cookie(response_obj)
                 self._is_authenticated = True
                 return response_obj.json(), response_obj.status_code
-        else:
-            full_path = UIPROTECT_APIS[api][UIPROTECT_API_PATH]
-            if (path is not None):
-                full_path = f"{full_path}/{path}"
-                _LOGGER.debug("call_uiprotect_api: full_path={%s}", full_path)
-
-            return Helpers.call_json_api(
-                self.base_url,
-                full_path,
-                UIPROTECT_APIS[api][UIPROTECT_API_METHOD],
-                json_object,
-                {"Cookie": f"{self._cookiename}={self._last_token_cookie}",
-                 "X-CSRF-Token": self._last_csrf_token},
+            return None, response_obj.status_code
+
+        # Log in again before the token expires, and once more if the console rejects it
+        self.ensure_authenticated()
+        response, status_code = self._call_json_api(api, path, json_object)
+        if status_code == HTTPStatus.UNAUTHORIZED.value:
+            _LOGGER.debug("Token rejected by the console, logging in again")
+            self._is_authenticated = False
+            self.authenticate()
+            response, status_code = self._call_json_api(api, path, json_object)
+        return response, status_code
+
+    def _call_json_api(self, api: str, path: Optional[str], json_object: dict) -> tuple[dict, int]:
+        full_path = UIPROTECT_APIS[api][UIPROTECT_API_PATH]
+        if (path is not None):
+            full_path = f"{full_path}/{path}"
+            _LOGGER.debug("call_uiprotect_api: full_path={%s}", full_path)
+
+        return Helpers.call_json_api(
+            self.base_url,
+            full_path,
+            UIPROTECT_APIS[api][UIPROTECT_API_METHOD],
+            json_object,
+            {"Cookie": f"{self._cookiename}={self._last_token_cookie}",
+             "X-CSRF-Token": self._last_csrf_token},
+            self.stats.endpoints[api],
         )
 
+    def get_auth_headers(self) -> dict[str, str]:
+        """Return the headers needed to authenticate a request, logging in first if needed."""
+        self.ensure_authenticated()
+
+        headers = {"Cookie": f"{self._cookiename}={self._last_token_cookie}"}
+        if self._last_csrf_token is not None:
+            headers["X-CSRF-Token"] = self._last_csrf_token
+        return headers
+
 
     def authenticate(self) -> bool:
         """Authenticate and get a token."""
@@ -207,44 +371,289 @@ class PyUIProtectAlarms:
             }
 
             response, status_code  = self.call_uiprotect_api(UIProtectApi.LOGIN, json_object=auth)
+            self.stats.record_auth(status_code == 200)
             if status_code == 200:
                 self._is_authenticated = True
                 _LOGGER.debug("Authenticated successfully!")
             else:
-                self._raise_for_status(response, True)
+                self._raise_for_status(UIProtectApi.LOGIN, status_code, True)
 
         return self._is_authenticated
             
-    def load_automations(self) -> bool:
-        """Load automations from the Unifi Protect API."""
+    def load_automations(self, force: bool = False, summary: PyUIProtectChanges | None = None) -> bool:
+        """Load automations from the Unifi Protect API.
+
+        Automations whose details have not changed are left alone unless force
+        is set. If summary is given, what the load touched is added to it.
+        """
         _LOGGER.debug("PyUIProtectAlarms: load_automations")
+        start = time.perf_counter()
 
         response, status_code  = self.call_uiprotect_api(UIProtectApi.GET_AUTOMATIONS)
         if status_code != 200:  
-            self._raise_for_status(response, True)
+            self._raise_for_status(UIProtectApi.GET_AUTOMATIONS, status_code, True)
 
 
-        for automation_details in response:
-            automation_id : str = automation_details.get("id")
-            automation_obj : PyUIProtectAutomation = self._automations.get(automation_id) or None
-            _LOGGER.debug("PyUIProtectAlarms: load_automations: automation_id=%s, automation_obj=%s", automation_id, automation_obj)
-            if (automation_obj is None):
-                automation_obj = PyUIProtectAutomation(automation_details, self)
+        with self._reconcile("automations", len(response)), self._staging() as staged:
+            changes = PyUIProtectChanges()
+            seen_ids = set()
+            for automation_details in response:
+                seen_ids.add(automation_details.get("id"))
+                self._apply_automation_details(automation_details, changes, force)
 
-                if (self.automation_rule_prefix is None or automation_obj.name.startswith(self.automation_rule_prefix)):
-                    self._automations[automation_obj.id] = automation_obj
+            # Rules deleted on the console
+            for automation_id in [automation_id for automation_id in staged.automations if automation_id not in seen_ids]:
+                self._remove_automation(automation_id, changes)
 
-            else:
-                automation_obj.handle_server_update_base(automation_details)
+            self._notify_changes(changes)
+        self._record_changes(changes)
+        if summary is not None:
+            summary.merge(changes)
+        self.stats.record_refresh("load_automations", time.perf_counter() - start)
+        return True
 
+    def refresh_automation(
+        self, automation_id: str, force: bool = False, summary: PyUIProtectChanges | None = None
+    ) -> bool:
+        """Reload a single automation from the Unifi Protect API.
 
+        Picks up an automation that is new on the console, and drops one that
+        was deleted. Returns False if the console could not be asked.
+        """
+        _LOGGER.debug("PyUIProtectAlarms: refresh_automation %s", automation_id)
+
+        response, status_code = self.call_uiprotect_api(UIProtectApi.GET_AUTOMATIONS, automation_id)
+        changes = PyUIProtectChanges()
+        with self._staging() as staged:
+            if status_code == HTTPStatus.NOT_FOUND.value:
+                if automation_id in staged.automations:
+                    self._remove_automation(automation_id, changes)
+            elif status_code == 200 and isinstance(response, dict):
+                automation_obj = self._apply_automation_details(response, changes, force)
+                if automation_obj is not None:
+                    self._update_notification_from_automation(automation_obj, changes)
+            else:
+                _LOGGER.warning("Unable to refresh automation %s, status code: %s", automation_id, status_code)
+                return False
 
+            self._notify_changes(changes)
+        self._record_changes(changes)
+        if summary is not None:
+            summary.merge(changes)
         return True
 
+    def set_notification_channel(
+        self,
+        channel: str,
+        enabled: bool,
+        user_ids: Iterable[str] | None = None,
+        automation_ids: Iterable[str] | None = None,
+    ) -> int:
+        """Turn a notification channel on or off for users across automations, e.g. mute push for a user everywhere.
+
+        With no user ids every receiver is changed, with no automation ids every
+        automation. Only users who already are receivers of an automation are
+        changed, and the other channels are kept. One update is sent per
+        automation the change touches. Returns how many were updated.
+        """
+        if channel not in CHANNEL_BITS:
+            raise ValueError(f"Unknown notification channel {channel}")
+
+        automations = self._state.automations
+        if automation_ids is not None:
+            selected = [automations[automation_id] for automation_id in automation_ids if automation_id in automations]
+        else:
+            selected = list(automations.values())
+        user_ids = None if user_ids is None else set(user_ids)
+        planned = self.receivers.compile_update(selected, channel, enabled, user_ids)
+
+        updated = 0
+        with TRACER.span("notification_channel_update", channel=channel, automations=len(planned)):
+            for automation_id in planned:
+                automation = automations[automation_id]
+                with automation.update_lock:
+                    # Compiled again, as an update may have landed since
+                    details = self.receivers.compile_update([automation], channel, enabled, user_ids).get(automation_id)
+                    if details is None:
+                        continue
+                    response, status_code = self.send_automation_update(automation_id, automation.raw_details, details)
+                    if status_code != 200:
+                        _LOGGER.error("Failed to update automation %s, status: %s", automation_id, status_code)
+                        continue
+                    updated += 1
+                    if response:
+                        self.apply_automation_response(automation, response)
+
+        _LOGGER.info("Set %s=%s in %d/%d automations", channel, enabled, updated, len(planned))
+        return updated
+
+    def update_payload(self, before: dict, after: dict) -> dict:
+        """Return what to send to update an automation from before to after.
+
+        Only the fields that change once the console is confirmed to take
+        partial updates, else all of after, which is safe whether the console
+        merges an update into the automation or replaces the automation with it.
+        """
+        if not self.capabilities.partial_patch:
+            return after
+        return {key: value for key, value in after.items() if before.get(key) != value}
+
+    def send_automation_update(self, automation_id: str, before: dict, after: dict) -> tuple[dict | None, int]:
+        """Update an automation from before to after on the console, see update_payload.
+
+        Returns the console's answer and status, (None, 200) if nothing changes.
+        Call it holding the automation's update_lock.
+        """
+        payload = self.update_payload(before, after)
+        if not payload:
+            return None, 200
+        return self.call_uiprotect_api(UIProtectApi.UPDATE_AUTOMATION, automation_id, payload)
+
+    def probe_capabilities(self) -> PyUIProtectCapabilities:
+        """Find out what the console supports, unless it was already found for the Protect version it runs.
+
+        Reads the version, then probes whether the notifications endpoint
+        exists, if not known for the version yet. Only reads, nothing on the
+        console is changed, so partial updates are left unconfirmed.
+        """
+        response, status_code = self.call_uiprotect_api(UIProtectApi.GET_NVR)
+        version = response.get("version") if status_code == 200 and isinstance(response, dict) else None
+        capabilities = self.capabilities.for_version(version)
+
+        if capabilities.notifications_endpoint is None:
+            _, status_code = self.call_uiprotect_api(UIProtectApi.GET_NOTIFICATIONS)
+            capabilities = replace(capabilities, notifications_endpoint=endpoint_available(status_code))
+
+        if capabilities != self.capabilities:
+            _LOGGER.info("Console capabilities for Protect %s: %s", version, capabilities.as_dict())
+        self.capabilities = capabilities
+        return capabilities
+
+    def apply_automation_response(self, automation: PyUIProtectAutomation, response: dict) -> None:
+        """Apply what the console answered to an update of an automation, and to the notification extracted from it."""
+        changes = PyUIProtectChanges()
+        with self._staging() as staged:
+            self._update_automation(automation, response, changes)
+            if staged.automations.get(automation.id) is automation:
+                self._update_notification_from_automation(automation, changes)
+            self._notify_changes(changes)
+
+    def _update_automation(
+        self, automation_obj: PyUIProtectAutomation, details: dict, changes: PyUIProtectChanges
+    ) -> None:
+        """Apply new details to a tracked automation, noting it in changes if its receivers changed."""
+        before = receiver_ids(automation_obj.raw_details)
+        automation_obj.handle_server_update_base(details)
+        if receiver_ids(automation_obj.raw_details) != before:
+            changes.receivers_changed_automations[automation_obj.id] = automation_obj
+
+    def _apply_automation_details(
+        self, automation_details: dict, changes: PyUIProtectChanges, force: bool = False
+    ) -> PyUIProtectAutomation | None:
+        """Add or update an automation from its details. Returns None if it is filtered out."""
+        staged = self._staged
+        automation_id : str = automation_details.get("id")
+        automation_obj : PyUIProtectAutomation = staged.automations.get(automation_id) or None
+        _LOGGER.debug("PyUIProtectAlarms: automation_id=%s, automation_obj=%s", automation_id, automation_obj)
+        if (automation_obj is None):
+            automation_obj = PyUIProtectAutomation(automation_details, self)
+
+            if (self.automation_rule_prefix is not None and not automation_obj.name.startswith(self.automation_rule_prefix)):
+                return None
+            staged.edit_automations()[automation_obj.id] = automation_obj
+            changes.added_automations[automation_obj.id] = automation_obj
+
+        elif not force and automation_details == automation_obj.raw_details:
+            changes.unchanged_automations[automation_id] = automation_obj
+        else:
+            self._update_automation(automation_obj, automation_details, changes)
+            changes.updated_automations[automation_id] = automation_obj
+
+        return automation_obj
+
+    @contextmanager
+    def _reconcile(self, name: str, count: int):
+        """Time a loop applying a response to the tracked objects, for metrics and traces."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.stats.record_reconcile(name, end - start)
+            TRACER.add_span(f"reconcile_{name}", start, end, objects=count)
+
+    def _record_changes(self, changes: PyUIProtectChanges) -> None:
+        """Count unchanged objects as change detection cache hits, and updated ones as misses."""
+        self.stats.caches["automation_details"].record(
+            len(changes.unchanged_automations), len(changes.updated_automations)
+        )
+        self.stats.caches["notification_details"].record(
+            len(changes.unchanged_notifications), len(changes.updated_notifications)
+        )
+
+    def _remove_automation(self, automation_id: str, changes: PyUIProtectChanges) -> None:
+        staged = self._staged
+        changes.removed_automations[automation_id] = staged.edit_automations().pop(automation_id)
+        self.receivers.forget(automation_id)
+        if self._notifications_from_automations and automation_id in staged.notifications:
+            changes.removed_notifications[automation_id] = staged.edit_notifications().pop(automation_id)
+
+
+    def export_snapshot(self) -> dict[str, Any]:
+        """Return a compact, JSON serialisable snapshot of the last known state."""
+        state = self._state
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "automations": [
+                {key: value for key, value in automation.raw_details.items() if key not in SNAPSHOT_VOLATILE_AUTOMATION_KEYS}
+                for automation in state.automations.values() if automation.raw_details
+            ],
+            "users": [user.as_dict() for user in state.users.values()],
+            "notifications_from_automations": self._notifications_from_automations,
+            # Kept with the state, so a restart skips the probes while the console runs the same version
+            "capabilities": self.capabilities.as_dict(),
+        }
+        if not self._notifications_from_automations:
+            # Extracted notifications are rebuilt from the automations
+            snapshot["notifications"] = [
+                notification.raw_details
+                for notification in state.notifications.values() if notification.raw_details
+            ]
+        return snapshot
+
+    def restore_snapshot(self, snapshot: dict[str, Any]) -> bool:
+        """Rebuild automations, notifications and users from a snapshot, without any network calls.
+
+        Returns False if the snapshot is unusable.
+        """
+        if not snapshot or snapshot.get("version") != SNAPSHOT_VERSION or not snapshot.get("automations"):
+            return False
+
+        with self._staging() as staged:
+            for automation_details in snapshot["automations"]:
+                automation_obj = PyUIProtectAutomation(automation_details, self)
+                if (self.automation_rule_prefix is None or automation_obj.name.startswith(self.automation_rule_prefix)):
+                    staged.edit_automations()[automation_obj.id] = automation_obj
+
+            staged.users = snapshot.get("users", [])
+            self.capabilities = PyUIProtectCapabilities.from_dict(snapshot.get("capabilities", {}))
+
+            self._notifications_from_automations = snapshot.get("notifications_from_automations", False)
+            if self._notifications_from_automations:
+                self._extract_notifications_from_automations()
+            else:
+                for notification_details in snapshot.get("notifications", []):
+                    notification_obj = PyUIProtectNotification(notification_details, self)
+                    staged.edit_notifications()[notification_obj.id] = notification_obj
+
+        _LOGGER.info("Restored %d automations and %d notifications from snapshot",
+                     len(self._state.automations), len(self._state.notifications))
+        return True
 
     def load_users(self) -> bool:
         """Load list of users from the Unifi Protect API."""
         _LOGGER.debug("PyUIProtectAlarms: load_users")
+        start = time.perf_counter()
 
         response, status_code = self.call_uiprotect_api(UIProtectApi.GET_USERS)
         if status_code != 200:  
@@ -255,60 +664,116 @@ class PyUIProtectAlarms:
             _LOGGER.warning("Users response is not a list: %s", type(response))
             return False
 
-        self._users = response
-        _LOGGER.info("Loaded %d users from UniFi Protect", len(self._users))
+        users = PyUIProtectUserDirectory.from_response(user for user in response if isinstance(user, dict))
+        changed_ids = users.changed_ids(self._state.users)
+        # Only published if a user was added, removed or renamed
+        if changed_ids:
+            with self._staging() as staged:
+                staged.users = users
+        self._users_loaded_at = time.monotonic()
+        _LOGGER.info("Loaded %d users from UniFi Protect, %d changed", len(users), len(changed_ids))
+        self.stats.record_refresh("load_users", time.perf_counter() - start)
         return True
 
-    def load_notifications(self) -> bool:
+    def load_users_if_stale(self) -> bool:
+        """Load the users if they are stale, see users_stale. Returns False if they were and failed to load."""
+        if not self.users_stale:
+            return True
+        return self.load_users()
+
+    def load_notifications(self, force: bool = False, summary: PyUIProtectChanges | None = None) -> bool:
         """Load notifications from the Unifi Protect API.
         
         Note: This loads notification settings for the authenticated user.
         When updating, we will update for all users.
         
         First tries the dedicated notifications endpoint, if that fails,
-        extracts notifications from automations.
+        extracts notifications from automations. force and summary work as
+        for load_automations.
         """
         _LOGGER.debug("PyUIProtectAlarms: load_notifications")
+        start = time.perf_counter()
 
-        # First, try to load users if not already loaded
-        if not self._users:
-            self.load_users()
+        # First, load the users if not loaded within their TTL
+        self.load_users_if_stale()
+
+        # Try dedicated notifications endpoint first, unless the console is known not to have it
+        if self.capabilities.notifications_endpoint is False:
+            response, status_code = None, HTTPStatus.NOT_FOUND.value
+        else:
+            response, status_code = self.call_uiprotect_api(UIProtectApi.GET_NOTIFICATIONS)
+            _LOGGER.debug("Notifications endpoint response: status_code=%s, response_type=%s", status_code, type(response))
+            available = endpoint_available(status_code)
+            if available is not None and available != self.capabilities.notifications_endpoint:
+                self.capabilities = replace(self.capabilities, notifications_endpoint=available)
 
-        # Try dedicated notifications endpoint first
-        response, status_code = self.call_uiprotect_api(UIProtectApi.GET_NOTIFICATIONS)
-        _LOGGER.debug("Notifications endpoint response: status_code=%s, response_type=%s", status_code, type(response))
-        
         if status_code == 200 and isinstance(response, list) and len(response) > 0:
             _LOGGER.info("Loaded %d notifications from dedicated endpoint", len(response))
-            for notification_details in response:
-                notification_id = notification_details.get("id")
-                if notification_id is None:
-                    notification_id = notification_details.get("type") or notification_details.get("name", "unknown")
+            with self._reconcile("notifications", len(response)), self._staging() as staged:
+                changes = PyUIProtectChanges()
+                seen_ids = set()
+                for notification_details in response:
+                    notification_id = notification_details.get("id")
+                    if notification_id is None:
+                        notification_id = notification_details.get("type") or notification_details.get("name", "unknown")
+                    seen_ids.add(notification_id)
                 
-                notification_obj = self._notifications.get(notification_id) or None
-                if notification_obj is None:
-                    notification_obj = PyUIProtectNotification(notification_details, self)
-                    self._notifications[notification_obj.id] = notification_obj
-                else:
-                    notification_obj.handle_server_update_base(notification_details)
+                    notification_obj = staged.notifications.get(notification_id) or None
+                    if notification_obj is None:
+                        notification_obj = PyUIProtectNotification(notification_details, self)
+                        staged.edit_notifications()[notification_obj.id] = notification_obj
+                        changes.added_notifications[notification_obj.id] = notification_obj
+                    else:
+                        self._update_notification(notification_obj, notification_details, changes, force)
+                self._remove_notifications_not_in(seen_ids, changes)
+                self._notifications_from_automations = False
+                self._notify_changes(changes)
+            self._record_changes(changes)
+            if summary is not None:
+                summary.merge(changes)
+            self.stats.record_refresh("load_notifications", time.perf_counter() - start)
             return True
         
         # If dedicated endpoint doesn't work, extract from automations
         _LOGGER.info("Notifications endpoint not available (status_code=%s), extracting from automations", status_code)
-        return self._extract_notifications_from_automations()
+        self._notifications_from_automations = True
+        with self._reconcile("notifications", len(self._state.automations)):
+            extracted = self._extract_notifications_from_automations(force, summary)
+        self.stats.record_refresh("load_notifications", time.perf_counter() - start)
+        return extracted
     
-    def _extract_notifications_from_automations(self) -> bool:
+    def _update_notification(
+        self,
+        notification_obj: PyUIProtectNotification,
+        notification_details: dict,
+        changes: PyUIProtectChanges,
+        force: bool = False,
+    ) -> None:
+        if not force and notification_details == notification_obj.raw_details:
+            changes.unchanged_notifications[notification_obj.id] = notification_obj
+        else:
+            notification_obj.handle_server_update_base(notification_details)
+            changes.updated_notifications[notification_obj.id] = notification_obj
+
+    def _extract_notifications_from_automations(
+        self, force: bool = False, summary: PyUIProtectChanges | None = None
+    ) -> bool:
         """Extract notification settings from automations."""
         _LOGGER.debug("Extracting notifications from automations")
-        
-        if not self._automations:
+        with self._staging() as staged:
+            return self._extract_notifications_from_staged(staged, force, summary)
+
+    def _extract_notifications_from_staged(
+        self, staged: PyUIProtectStagedState, force: bool, summary: PyUIProtectChanges | None
+    ) -> bool:
+        if not staged.automations:
             _LOGGER.warning("No automations available to extract notifications from")
             return False
         
         # Group automations by notification type
         notification_types = {}
         
-        for automation in self._automations.values():
+        for automation in staged.automations.values():
             if not hasattr(automation, 'raw_details') or not automation.raw_details:
                 _LOGGER.debug("Automation %s has no raw_details, skipping", automation.name)
                 continue
@@ -316,58 +781,163 @@ class PyUIProtectAlarms:
             automation_name = automation.name
             _LOGGER.debug("Processing automation: %s", automation_name)
             
-            # Extract notification actions from automation
-            actions = automation.raw_details.get("actions", [])
-            _LOGGER.debug("Automation %s has %d actions", automation_name, len(actions))
+            channels = self._get_notification_channels(automation.raw_details)
+            if channels is None:
+                continue
+            _LOGGER.debug("Automation %s has channels: %s", automation_name, channels)
             
-            for action in actions:
-                if action.get("type") == "SEND_NOTIFICATION":
-                    _LOGGER.debug("Found SEND_NOTIFICATION action in automation %s", automation_name)
-                    metadata = action.get("metadata", {})
-                    receivers = metadata.get("receivers", [])
-                    
-                    # Collect all channels from all receivers
-                    all_channels = set()
-                    for receiver in receivers:
-                        receiver_channels = receiver.get("channels", [])
-                        all_channels.update(receiver_channels)
-                    
-                    channels = list(all_channels) if all_channels else []
-                    _LOGGER.debug("Automation %s has channels: %s", automation_name, channels)
-                    
-                    # Use automation name as notification type
-                    notification_type = automation_name
-                    
-                    if notification_type not in notification_types:
-                        notification_types[notification_type] = {
-                            "id": automation.id,
-                            "name": notification_type,
-                            "type": notification_type,
-                            "channels": channels.copy() if channels else [],
-                            "automation_id": automation.id
-                        }
-                    else:
-                        # Merge channels if notification type already exists
-                        existing_channels = set(notification_types[notification_type]["channels"])
-                        existing_channels.update(channels)
-                        notification_types[notification_type]["channels"] = list(existing_channels)
+            # Use automation name as notification type
+            notification_type = automation_name
+            
+            if notification_type not in notification_types:
+                notification_types[notification_type] = self._notification_details_from_automation(
+                    automation, channels
+                )
+            else:
+                # Merge channels if notification type already exists
+                existing_channels = set(notification_types[notification_type]["channels"])
+                existing_channels.update(channels)
+                notification_types[notification_type]["channels"] = sorted(existing_channels)
         
         # Create notification objects
+        changes = PyUIProtectChanges()
         for notification_type, notification_data in notification_types.items():
             _LOGGER.debug("Creating notification object for: %s with channels: %s", 
                          notification_type, notification_data["channels"])
-            notification_obj = self._notifications.get(notification_type) or None
+            notification_obj = staged.notifications.get(notification_data["id"]) or None
             if notification_obj is None:
                 notification_obj = PyUIProtectNotification(notification_data, self)
-                self._notifications[notification_obj.id] = notification_obj
+                staged.edit_notifications()[notification_obj.id] = notification_obj
+                changes.added_notifications[notification_obj.id] = notification_obj
             else:
-                notification_obj.handle_server_update_base(notification_data)
+                self._update_notification(notification_obj, notification_data, changes, force)
+        self._remove_notifications_not_in({data["id"] for data in notification_types.values()}, changes)
+        self._notify_changes(changes)
+        self._record_changes(changes)
+        if summary is not None:
+            summary.merge(changes)
         
         _LOGGER.info("Extracted %d notification types from automations: %s", 
                     len(notification_types), list(notification_types.keys()))
         return len(notification_types) > 0
 
-    def _update_last_token_cookie(self, response: requests.Response) -> None:
+    def _remove_notifications_not_in(self, notification_ids: set[str], changes: PyUIProtectChanges) -> None:
+        staged = self._staged
+        for notification_id in [notification_id for notification_id in staged.notifications if notification_id not in notification_ids]:
+            changes.removed_notifications[notification_id] = staged.edit_notifications().pop(notification_id)
+
+    @staticmethod
+    def _get_notification_channels(automation_details: dict) -> list[str] | None:
+        """Return the channels used by the notification actions of an automation.
+
+        Returns None if the automation does not send notifications.
+        """
+        channels = None
+        for action in automation_details.get("actions", []):
+            if action.get("type") != "SEND_NOTIFICATION":
+                continue
+
+            # Collect all channels from all receivers
+            if channels is None:
+                channels = set()
+            for receiver in action.get("metadata", {}).get("receivers", []):
+                channels.update(receiver.get("channels", []))
+
+        # Sorted, so rebuilt details compare equal when nothing changed
+        return sorted(channels) if channels is not None else None
+
+    @staticmethod
+    def _notification_details_from_automation(automation: PyUIProtectAutomation, channels: list[str]) -> dict:
+        """Build the notification details for a notification extracted from an automation."""
+        return {
+            "id": automation.id,
+            "name": automation.name,
+            "type": automation.name,
+            "channels": channels.copy(),
+            "automation_id": automation.id
+        }
+
+    def process_websocket_update(self, action_frame: dict, data_frame: Any) -> bool:
+        """Apply a change pushed over the updates websocket.
+
+        Returns True if the change touched an automation or notification we track.
+        """
+        model_key = action_frame.get("modelKey")
+        action = action_frame.get("action")
+        object_id = action_frame.get("id")
+
+        if model_key == UIProtectModelKey.AUTOMATION:
+            return self._process_automation_update(action, object_id, data_frame)
+        if model_key == UIProtectModelKey.NOTIFICATION:
+            return self._process_notification_update(action, object_id, data_frame)
+        return False
+
+    def _process_automation_update(self, action: str, automation_id: str, data: Any) -> bool:
+        _LOGGER.debug("PyUIProtectAlarms: websocket %s for automation %s", action, automation_id)
+        with self._staging():
+            return self._process_staged_automation_update(action, automation_id, data)
+
+    def _process_staged_automation_update(self, action: str, automation_id: str, data: Any) -> bool:
+        staged = self._staged
+        automation_obj = staged.automations.get(automation_id)
+
+        changes = PyUIProtectChanges()
+        if action == UIProtectWsAction.REMOVE:
+            if automation_obj is None:
+                return False
+            self._remove_automation(automation_id, changes)
+            self._notify_changes(changes)
+            return True
+
+        if not isinstance(data, dict):
+            return False
+
+        if automation_obj is None:
+            if action != UIProtectWsAction.ADD:
+                return False
+            automation_obj = PyUIProtectAutomation(data, self)
+            if (self.automation_rule_prefix is not None and not automation_obj.name.startswith(self.automation_rule_prefix)):
+                return False
+            staged.edit_automations()[automation_obj.id] = automation_obj
+            changes.added_automations[automation_obj.id] = automation_obj
+        else:
+            # Update frames only carry the fields that changed
+            self._update_automation(automation_obj, {**automation_obj.raw_details, **data}, changes)
+
+        self._update_notification_from_automation(automation_obj, changes)
+        self._notify_changes(changes)
+        return True
+
+    def _update_notification_from_automation(self, automation_obj: PyUIProtectAutomation, changes: PyUIProtectChanges) -> None:
+        if not self._notifications_from_automations:
+            return
+
+        staged = self._staged
+        notification_obj = staged.notifications.get(automation_obj.id)
+        channels = self._get_notification_channels(automation_obj.raw_details)
+        if channels is None:
+            return
+
+        notification_details = self._notification_details_from_automation(automation_obj, channels)
+        if notification_obj is None:
+            notification_obj = PyUIProtectNotification(notification_details, self)
+            staged.edit_notifications()[automation_obj.id] = notification_obj
+            changes.added_notifications[automation_obj.id] = notification_obj
+        else:
+            self._update_notification(notification_obj, notification_details, changes)
+
+    def _process_notification_update(self, action: str, notification_id: str, data: Any) -> bool:
+        _LOGGER.debug("PyUIProtectAlarms: websocket %s for notification %s", action, notification_id)
+        with self._staging() as staged:
+            notification_obj = staged.notifications.get(notification_id)
+            if notification_obj is None or not isinstance(data, dict):
+                return False
+
+            # Update frames only carry the fields that changed
+            notification_obj.handle_server_update_base({**notification_obj.raw_details, **data})
+            return True
+
+    def _update_last_token_cookie(self, response: "requests.Response") -> None:
         """Update the last token cookie."""
 
         csrf_token = response.headers.get("x-csrf-token")
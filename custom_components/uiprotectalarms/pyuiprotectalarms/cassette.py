@@ -0,0 +1,216 @@
+"""Record the HTTP exchanges of the library with a console as cassettes, and replay them offline.
+
+A cassette is JSON: every request the shared session sent, in order, with
+the response it got and how long that took. Values of SENSITIVE_KEYS are
+redacted from request and response bodies, the console's address is left
+out, and the login token is replaced with one that never expires, so a
+cassette recorded at a customer's site can be shared and replayed safely.
+
+Mounting a recorder or player affects every PyUIProtectAlarms instance in
+the process, as they share one session.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+import datetime
+import json
+import logging
+import threading
+import time
+from typing import Any, Iterator, Optional, Union
+
+import jwt
+import requests
+from requests.cookies import cookiejar_from_dict
+from requests.structures import CaseInsensitiveDict
+
+from .constants import LOGGER_NAME
+from .exceptions import ClientError
+from .helpers import REDACTED, Helpers
+from .transport import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, TimedHTTPAdapter
+
+_LOGGER = logging.getLogger(LOGGER_NAME)
+
+CASSETTE_VERSION = 1
+# Cookies the console authenticates with
+TOKEN_COOKIES = ("TOKEN", "UOS_TOKEN")
+# Response headers kept in cassettes, the others are dropped
+RECORDED_HEADERS = ("Content-Type", "Retry-After", "X-CSRF-Token")
+# Headers whose values are redacted
+SENSITIVE_HEADERS = ("X-CSRF-Token",)
+# Token returned by replayed logins. It expires in 2100, so replays never log in again.
+REPLAY_TOKEN = jwt.encode({"userId": "cassette", "exp": 4102444800}, "cassette", algorithm="HS256")
+
+
+class CassetteError(ClientError):
+    """A request has no recorded response, or the cassette can't be read."""
+
+
+def _decode_body(content: bytes) -> tuple[Any, Optional[str]]:
+    """Return a body as (redacted JSON, None), or (None, text) if it is not JSON."""
+    if not content:
+        return None, None
+    try:
+        return Helpers.redact_data(json.loads(content)), None
+    except ValueError:
+        return None, content.decode("utf-8", "replace")
+
+
+def _encode_body(body: Any, text: Optional[str]) -> bytes:
+    if body is not None:
+        return json.dumps(body).encode()
+    return text.encode() if text else b""
+
+
+class CassetteRecorder(TimedHTTPAdapter):
+    """Transport adapter that sends requests to the console and records the exchanges."""
+
+    def __init__(self) -> None:
+        super().__init__(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.interactions: list[dict[str, Any]] = []
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        """Send the request, and record it with the response once its body is read."""
+        start = time.perf_counter()
+        response = super().send(request, *args, **kwargs)
+        content = response.content
+        end = time.perf_counter()
+
+        request_body, request_text = _decode_body(request.body or b"")
+        response_body, response_text = _decode_body(content)
+        headers = {
+            name: REDACTED if name in SENSITIVE_HEADERS else response.headers[name]
+            for name in RECORDED_HEADERS
+            if name in response.headers
+        }
+        interaction = {
+            "offset": round(start - self._start, 6),
+            "duration": round(end - start, 6),
+            "elapsed": response.elapsed.total_seconds(),
+            "request": {
+                "method": request.method,
+                "path": request.path_url,
+                "body": request_body,
+                "text": request_text,
+            },
+            "response": {
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": headers,
+                "cookies": {name: REPLAY_TOKEN for name in TOKEN_COOKIES if name in response.cookies},
+                "body": response_body,
+                "text": response_text,
+            },
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+        return response
+
+    def cassette(self) -> dict[str, Any]:
+        """Return the exchanges recorded so far as a cassette."""
+        with self._lock:
+            interactions = list(self.interactions)
+        return {
+            "version": CASSETTE_VERSION,
+            "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "interactions": interactions,
+        }
+
+    def save(self, path: str) -> int:
+        """Write the cassette to path. Returns the number of exchanges written."""
+        cassette = self.cassette()
+        with open(path, "w", encoding="utf-8") as cassette_file:
+            json.dump(cassette, cassette_file, indent=1)
+        return len(cassette["interactions"])
+
+
+class CassettePlayer(requests.adapters.BaseAdapter):
+    """Transport adapter that answers requests from a cassette, without a console.
+
+    Requests are matched on method and path. Each match serves the next
+    recorded response for it, and the last one again once they run out, so
+    a session can be replayed more than once. With realtime, each response
+    takes as long as it did when recorded; otherwise it is served at once.
+    """
+
+    def __init__(self, cassette: dict[str, Any], realtime: bool = False) -> None:
+        super().__init__()
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise CassetteError(f"Unsupported cassette version {cassette.get('version')}")
+        self.realtime = realtime
+        self.played = 0
+        self._lock = threading.Lock()
+        self._recorded: dict[tuple[str, str], deque] = {}
+        self._last: dict[tuple[str, str], dict[str, Any]] = {}
+        for interaction in cassette["interactions"]:
+            key = (interaction["request"]["method"], interaction["request"]["path"])
+            self._recorded.setdefault(key, deque()).append(interaction)
+
+    @classmethod
+    def load(cls, path: str, realtime: bool = False) -> "CassettePlayer":
+        """Return a player for the cassette saved at path."""
+        try:
+            with open(path, encoding="utf-8") as cassette_file:
+                return cls(json.load(cassette_file), realtime)
+        except (OSError, ValueError) as ex:
+            raise CassetteError(f"Unable to read cassette {path}: {ex}") from ex
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        """Return the recorded response for the request."""
+        key = (request.method, request.path_url)
+        with self._lock:
+            recorded = self._recorded.get(key)
+            if recorded:
+                self._last[key] = recorded.popleft()
+            interaction = self._last.get(key)
+            if interaction is not None:
+                self.played += 1
+        if interaction is None:
+            raise CassetteError(f"No recorded response for {request.method} {request.path_url}")
+
+        if self.realtime:
+            time.sleep(interaction["duration"])
+        recorded_response = interaction["response"]
+
+        response = requests.Response()
+        response.status_code = recorded_response["status"]
+        response.reason = recorded_response["reason"]
+        response.headers = CaseInsensitiveDict(recorded_response["headers"])
+        response._content = _encode_body(recorded_response["body"], recorded_response["text"])  # pylint: disable=protected-access
+        response.cookies = cookiejar_from_dict(recorded_response["cookies"])
+        response.encoding = "utf-8"
+        response.elapsed = datetime.timedelta(seconds=interaction["elapsed"])
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+@contextmanager
+def recording(path: Optional[str] = None) -> Iterator[CassetteRecorder]:
+    """Record every exchange of the shared session until the block exits, then save them to path."""
+    recorder = CassetteRecorder()
+    previous = Helpers.mount_adapter(recorder)
+    try:
+        yield recorder
+    finally:
+        Helpers.mount_adapter(previous)
+        recorder.close()
+        if path is not None:
+            count = recorder.save(path)
+            _LOGGER.info("Recorded %d exchanges to %s", count, path)
+
+
+@contextmanager
+def replaying(cassette: Union[str, dict[str, Any]], realtime: bool = False) -> Iterator[CassettePlayer]:
+    """Answer every request of the shared session from a cassette, or its path, until the block exits."""
+    player = CassettePlayer.load(cassette, realtime) if isinstance(cassette, str) else CassettePlayer(cassette, realtime)
+    previous = Helpers.mount_adapter(player)
+    try:
+        yield player
+    finally:
+        Helpers.mount_adapter(previous)
@@ -14,6 +14,7 @@ class UIProtectApi(StrEnum):
     GET_NOTIFICATIONS = "get_notifications"
     UPDATE_NOTIFICATION = "update_notification"
     GET_USERS = "get_users"
+    GET_NVR = "get_nvr"
 
 UIPROTECT_APIS = {
     UIProtectApi.LOGIN: {
@@ -39,5 +40,22 @@ UIPROTECT_APIS = {
     UIProtectApi.GET_USERS: {
         UIPROTECT_API_PATH: "/proxy/protect/api/users",
         UIPROTECT_API_METHOD: "get",
-    }    
+    },
+    UIProtectApi.GET_NVR: {
+        UIPROTECT_API_PATH: "/proxy/protect/api/nvr",
+        UIPROTECT_API_METHOD: "get",
+    },
 }
+
+UIPROTECT_WS_UPDATES_PATH = "/proxy/protect/ws/updates"
+
+class UIProtectModelKey(StrEnum):
+    """Model keys sent in websocket action frames."""
+    AUTOMATION = "automation"
+    NOTIFICATION = "notification"
+
+class UIProtectWsAction(StrEnum):
+    """Actions sent in websocket action frames."""
+    ADD = "add"
+    UPDATE = "update"
+    REMOVE = "remove"
@@ -3,12 +3,17 @@
 import json
 import logging
 import re
-from typing import Optional, Union
-
-import jwt
-import requests
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional, Union
 
 from .exceptions import *
+from .tracing import TRACER
+
+if TYPE_CHECKING:
+    import requests
+
+    from .pyuiprotectstats import PyUIProtectEndpointStats
 
 # Initialize logger using standard Python logging pattern
 _LOGGER = logging.getLogger(__name__)
@@ -19,6 +24,30 @@ API_TIMEOUT = 30
 # Type alias for numeric values
 NUMERIC = Optional[Union[int, float, str]]
 
+# Keys whose values are redacted from logs and cassettes. A key matches if it ends with one of them, ignoring case.
+SENSITIVE_KEYS = (
+    "token",
+    "password",
+    "email",
+    "username",
+    "tk",
+    "accountId",
+    "authKey",
+    "uuid",
+    "cid",
+    "authorization",
+)
+REDACTED = "##_REDACTED_##"
+
+_REDACT_PATTERN = re.compile(
+    "(?i)(" + "|".join(f'(?<={key}": ")' for key in SENSITIVE_KEYS) + ')[^"]+'
+)
+_SENSITIVE_KEY_SUFFIXES = tuple(key.lower() for key in SENSITIVE_KEYS)
+
+
+def _is_sensitive_key(key: str) -> bool:
+    return key.lower().endswith(_SENSITIVE_KEY_SUFFIXES)
+
 
 class Helpers:
     """Helper class providing utility functions for PyUIProtectAlarms library.
@@ -30,6 +59,45 @@ class Helpers:
     # Flag to enable/disable redaction of sensitive information in logs
     shouldredact = False
 
+    _session: Optional["requests.Session"] = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def mount_adapter(cls, adapter: "requests.adapters.BaseAdapter") -> "requests.adapters.BaseAdapter":
+        """Send every call of the shared session through adapter, e.g. to record or replay them.
+
+        Args:
+            adapter: The transport adapter to use from now on
+
+        Returns:
+            The adapter it replaces, to mount again when done
+        """
+        session = cls.get_session()
+        previous = session.get_adapter("https://")
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return previous
+
+    @classmethod
+    def get_session(cls) -> "requests.Session":
+        """Return the HTTP session shared by every PyUIProtectAlarms instance.
+
+        Reusing one session keeps a pool of keep-alive connections per console
+        instead of opening a new connection for every call. The session never
+        stores cookies, as each instance sends its own authentication headers.
+        requests is imported when the session is first created, not with the
+        library, which is usually in an executor job logging in.
+
+        Returns:
+            The shared requests.Session
+        """
+        with cls._session_lock:
+            if cls._session is None:
+                from .transport import new_session  # pylint: disable=C0415
+
+                cls._session = new_session()
+            return cls._session
+
     @classmethod
     def redactor(cls, stringvalue: str) -> str:
         """Redact sensitive information from strings for safe logging.
@@ -44,28 +112,31 @@ class Helpers:
             The string with sensitive values redacted if shouldredact is True
         """
         if cls.shouldredact:
-            stringvalue = re.sub(
-                r"".join(
-                    (
-                        "(?i)",
-                        '((?<=token": ")|',
-                        '(?<=password": ")|',
-                        '(?<=email": ")|',
-                        '(?<=username": ")|',
-                        '(?<=tk": ")|',
-                        '(?<=accountId": ")|',
-                        '(?<=authKey": ")|',
-                        '(?<=uuid": ")|',
-                        '(?<=cid": ")|',
-                        '(?<=authorization": "))',
-                        '[^"]+',
-                    )
-                ),
-                "##_REDACTED_##",
-                stringvalue,
-            )
+            stringvalue = _REDACT_PATTERN.sub(REDACTED, stringvalue)
         return stringvalue
 
+    @staticmethod
+    def redact_data(value: Any) -> Any:
+        """Return a copy of decoded JSON with the string values of sensitive keys redacted.
+
+        Keys match the same way as in redactor: any key ending in one of
+        SENSITIVE_KEYS, ignoring case.
+
+        Args:
+            value: Decoded JSON (dicts, lists and scalars)
+
+        Returns:
+            The redacted copy
+        """
+        if isinstance(value, dict):
+            return {
+                key: REDACTED if isinstance(item, str) and _is_sensitive_key(key) else Helpers.redact_data(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [Helpers.redact_data(item) for item in value]
+        return value
+
     @staticmethod
     def call_api(
         url: str,
@@ -73,10 +144,13 @@ class Helpers:
         method: str,
         json_object: Optional[dict] = None,
         headers: Optional[dict] = None,
-    ) -> requests.Response:
+        stats: Optional["PyUIProtectEndpointStats"] = None,
+    ) -> "requests.Response":
         """Make HTTP API calls to UniFi Protect.
         
         Supports GET, POST, PUT, and PATCH methods. Logs request details at debug level.
+        The time spent connecting, in the TLS handshake, waiting for the server and
+        downloading the body is recorded in stats and in running trace captures.
         
         Args:
             url: Base URL of the API server
@@ -84,6 +158,7 @@ class Helpers:
             method: HTTP method (get, post, put, patch)
             json_object: Optional JSON data to send with the request
             headers: Optional HTTP headers
+            stats: Optional statistics to record the request phases in
             
         Returns:
             requests.Response object from the API call
@@ -91,21 +166,29 @@ class Helpers:
         Raises:
             requests.exceptions.RequestException: If the request fails
         """
+        import requests  # pylint: disable=C0415
+
+        from .transport import reset_connection_phases  # pylint: disable=C0415
+
         response_object = None
         try:
-            _LOGGER.debug("=======call_api=============================")
-            _LOGGER.debug("[%s] calling '%s' api", method, api)
-            _LOGGER.debug("API call URL: \n  %s%s", url, api)
-            _LOGGER.debug(
-                "API call headers: \n  %s", Helpers.redactor(
-                    json.dumps(headers))
-            )
-            _LOGGER.debug(
-                "API call json: \n  %s", Helpers.redactor(
-                    json.dumps(json_object))
-            )
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("=======call_api=============================")
+                _LOGGER.debug("[%s] calling '%s' api", method, api)
+                _LOGGER.debug("API call URL: \n  %s%s", url, api)
+                _LOGGER.debug(
+                    "API call headers: \n  %s", Helpers.redactor(
+                        json.dumps(headers))
+                )
+                _LOGGER.debug(
+                    "API call json: \n  %s", Helpers.redactor(
+                        json.dumps(json_object))
+                )
+            reset_connection_phases()
+            start = time.perf_counter()
+            session = Helpers.get_session()
             if method.lower() == "get":
-                response_object = requests.get(
+                response_object = session.get(
                     url + api,
                     headers=headers,
                     params={**json_object},
@@ -113,7 +196,7 @@ class Helpers:
                     verify = False
                 )
             elif method.lower() == "post":
-                response_object = requests.post(
+                response_object = session.post(
                     url + api,
                     json=json_object,
                     headers=headers,
@@ -122,11 +205,15 @@ class Helpers:
                     verify = False
                 )
             elif method.lower() == "put":
-                response_object = requests.put(
-                    url + api, json=json_object, headers=headers, timeout=API_TIMEOUT
+                response_object = session.put(
+                    url + api, 
+                    json=json_object, 
+                    headers=headers, 
+                    timeout=API_TIMEOUT,
+                    verify=False
                 )
             elif method.lower() == "patch":
-                response_object = requests.patch(
+                response_object = session.patch(
                     url + api, 
                     json=json_object, 
                     headers=headers, 
@@ -137,9 +224,45 @@ class Helpers:
             _LOGGER.debug(exception)
             raise exception
         else:
+            if stats is not None or TRACER.enabled:
+                Helpers._record_request_phases(start, time.perf_counter(), response_object, stats)
             if response_object.status_code != 200:
                 _LOGGER.debug("Unable to fetch %s%s", url, api)
         return response_object
+
+    @staticmethod
+    def _record_request_phases(
+        start: float,
+        end: float,
+        response_object: "requests.Response",
+        stats: Optional["PyUIProtectEndpointStats"],
+    ) -> None:
+        """Split a request into connect, TLS, server and download time.
+
+        requests measures elapsed up to the response headers, so the server
+        time is what is left of it after the connection setup, and the rest of
+        the request was spent reading the body.
+        """
+        from .transport import get_connection_phases  # pylint: disable=C0415
+
+        connect, tls = get_connection_phases()
+        headers_received = min(start + response_object.elapsed.total_seconds(), end)
+        server = max(headers_received - start - connect - tls, 0.0)
+        download = end - headers_received
+
+        if stats is not None:
+            stats.record_phases(connect, tls, server, download)
+        if TRACER.enabled:
+            request = response_object.request
+            TRACER.add_span(
+                f"{request.method} {request.path_url}", start, end, "http",
+                status=response_object.status_code, bytes=len(response_object.content),
+            )
+            phase_start = start
+            for phase, duration in (("connect", connect), ("tls", tls), ("server", server), ("download", download)):
+                if duration:
+                    TRACER.add_span(phase, phase_start, phase_start + duration, "http")
+                    phase_start += duration
     
     @staticmethod
     def call_json_api(
@@ -148,6 +271,7 @@ class Helpers:
         method: str,
         json_object: Optional[dict] = None,
         headers: Optional[dict] = None,
+        stats: Optional["PyUIProtectEndpointStats"] = None,
     ) -> tuple[dict, int]:
         """Make HTTP API calls and parse JSON response.
         
@@ -159,28 +283,44 @@ class Helpers:
             method: HTTP method (get, post, put, patch)
             json_object: Optional JSON data to send with the request
             headers: Optional HTTP headers
+            stats: Optional statistics to record the call's latency and size in
             
         Returns:
-            Tuple of (parsed JSON response dict or None, HTTP status code)
+            Tuple of (parsed JSON response dict or None, HTTP status code or 0 if the
+            request failed)
         """
+        import requests  # pylint: disable=C0415
+
         response_object = None
         response = None
         status_code = 0
+        start = time.perf_counter()
         try:
-            response_object = Helpers.call_api(url, api, method, json_object, headers)
+            response_object = Helpers.call_api(url, api, method, json_object, headers, stats)
         except requests.exceptions.RequestException as exception:
             _LOGGER.debug(exception)
+            if stats is not None:
+                stats.record(time.perf_counter() - start, status_code, 0)
         else:
             if response_object.status_code == 200:
                 status_code = 200
                 if response_object.content:
+                    decode_start = time.perf_counter()
                     response = response_object.json()
-                    _LOGGER.debug(
-                        "API response: \n\n  %s \n ",
-                        Helpers.redactor(json.dumps(response)),
-                    )
+                    decode_end = time.perf_counter()
+                    if stats is not None:
+                        stats.record_phase("decode", decode_end - decode_start)
+                    TRACER.add_span("decode", decode_start, decode_end, "http")
+                    if _LOGGER.isEnabledFor(logging.DEBUG):
+                        _LOGGER.debug(
+                            "API response: \n\n  %s \n ",
+                            Helpers.redactor(json.dumps(response)),
+                        )
             else:
+                status_code = response_object.status_code
                 _LOGGER.debug("Unable to fetch %s%s", url, api)
+            if stats is not None:
+                stats.record(time.perf_counter() - start, response_object.status_code, len(response_object.content))
         return response, status_code
 
     @staticmethod
@@ -195,6 +335,8 @@ class Helpers:
         Returns:
             Decoded token payload as dict if valid, None if expired or invalid
         """
+        import jwt  # pylint: disable=C0415
+
         try:
             return jwt.decode(
                 token_cookie,
@@ -0,0 +1,265 @@
+"""Lightweight in-process metrics: counters, gauges and fixed-bucket histograms.
+
+Metric families hand out one child per set of label values. Callers look the
+child up once (``family.labels(...)``) and keep it, so recording a value is
+a lock and an addition, with no lookups or allocations on the request path.
+Registries render in the Prometheus text exposition format.
+"""
+
+import bisect
+import math
+import threading
+from typing import Iterable, Optional
+
+# Default histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CounterChild:
+    """A value that only goes up."""
+
+    __slots__ = ("_lock", "_value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        """Add amount to the counter."""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        """Return the current value."""
+        return self._value
+
+    def _samples(self, name: str) -> Iterable[tuple[str, str, float]]:
+        yield name + "_total", "", self._value
+
+
+class GaugeChild:
+    """A value that can go up and down."""
+
+    __slots__ = ("_lock", "_value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        """Set the gauge."""
+        self._value = value
+
+    def set_max(self, value: float) -> None:
+        """Raise the gauge to value if it is higher."""
+        with self._lock:
+            if value > self._value:
+                self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        """Add amount to the gauge."""
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        """Subtract amount from the gauge."""
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        """Return the current value."""
+        return self._value
+
+    def _samples(self, name: str) -> Iterable[tuple[str, str, float]]:
+        yield name, "", self._value
+
+
+class HistogramChild:
+    """Counts of observations in fixed buckets, with their sum."""
+
+    __slots__ = ("_lock", "upper_bounds", "_counts", "_sum")
+
+    def __init__(self, upper_bounds: tuple[float, ...]) -> None:
+        self._lock = threading.Lock()
+        self.upper_bounds = upper_bounds
+        # One count per bucket plus the +Inf bucket; not cumulative
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        bucket = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self._counts[bucket] += 1
+            self._sum += value
+
+    @property
+    def counts(self) -> list[int]:
+        """Return the number of observations in each bucket, the last one being +Inf."""
+        with self._lock:
+            return list(self._counts)
+
+    @property
+    def count(self) -> int:
+        """Return the number of observations."""
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        """Return the sum of all observations."""
+        return self._sum
+
+    def _samples(self, name: str) -> Iterable[tuple[str, str, float]]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for upper_bound, bucket_count in zip((*self.upper_bounds, math.inf), counts):
+            cumulative += bucket_count
+            yield name + "_bucket", f'le="{_format_value(upper_bound)}"', cumulative
+        yield name + "_sum", "", total
+        yield name + "_count", "", cumulative
+
+
+class MetricFamily:
+    """A named metric with a child per set of label values."""
+
+    def __init__(
+        self,
+        metric_type: str,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        buckets: Optional[tuple[float, ...]] = None,
+    ) -> None:
+        self.type = metric_type
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], CounterChild | GaugeChild | HistogramChild] = {}
+
+    def labels(self, *labelvalues: str):
+        """Return the child for these label values, creating it on first use."""
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.get(labelvalues)
+                if child is None:
+                    child = self._new_child()
+                    self._children[labelvalues] = child
+        return child
+
+    def _new_child(self):
+        if self.type == "counter":
+            return CounterChild()
+        if self.type == "gauge":
+            return GaugeChild()
+        return HistogramChild(self._buckets)
+
+    def samples(self, const_labels: str) -> Iterable[tuple[str, str, float]]:
+        """Yield (sample name, rendered labels, value) for every child."""
+        with self._lock:
+            children = list(self._children.items())
+        for labelvalues, child in children:
+            labels = ",".join(
+                f'{labelname}="{_escape(labelvalue)}"'
+                for labelname, labelvalue in zip(self.labelnames, labelvalues)
+            )
+            for sample_name, extra_label, value in child._samples(self.name):  # pylint: disable=protected-access
+                yield sample_name, ",".join(part for part in (const_labels, labels, extra_label) if part), value
+
+
+class MetricsRegistry:
+    """A set of metric families, with labels added to every sample (e.g. the console)."""
+
+    def __init__(self, const_labels: Optional[dict[str, str]] = None) -> None:
+        self._lock = threading.Lock()
+        self._families: dict[str, MetricFamily] = {}
+        self._const_labels = ",".join(
+            f'{labelname}="{_escape(labelvalue)}"' for labelname, labelvalue in (const_labels or {}).items()
+        )
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> MetricFamily:
+        """Return the counter family called name, creating it if needed."""
+        return self._get_family("counter", name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> MetricFamily:
+        """Return the gauge family called name, creating it if needed."""
+        return self._get_family("gauge", name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> MetricFamily:
+        """Return the histogram family called name, creating it if needed."""
+        return self._get_family("histogram", name, documentation, labelnames, tuple(sorted(buckets)))
+
+    def _get_family(
+        self,
+        metric_type: str,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        buckets: Optional[tuple[float, ...]] = None,
+    ) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = MetricFamily(metric_type, name, documentation, labelnames, buckets)
+                self._families[name] = family
+            elif family.type != metric_type or family.labelnames != labelnames:
+                raise ValueError(f"Metric {name} is already registered as a {family.type} with labels {family.labelnames}")
+            return family
+
+    def families(self) -> list[MetricFamily]:
+        """Return the registered metric families."""
+        with self._lock:
+            return list(self._families.values())
+
+    @property
+    def const_labels(self) -> str:
+        """Return the constant labels, rendered."""
+        return self._const_labels
+
+
+def render_prometheus(registries: Iterable[MetricsRegistry]) -> str:
+    """Render registries in the Prometheus text format, merging families of the same name."""
+    merged: dict[str, tuple[MetricFamily, list[str]]] = {}
+    for registry in registries:
+        for family in registry.families():
+            lines = merged.setdefault(family.name, (family, []))[1]
+            for sample_name, labels, value in family.samples(registry.const_labels):
+                lines.append(f"{sample_name}{{{labels}}} {_format_value(value)}" if labels
+                             else f"{sample_name} {_format_value(value)}")
+
+    output = []
+    for name, (family, lines) in merged.items():
+        output.append(f"# HELP {name} {_escape_help(family.documentation)}")
+        output.append(f"# TYPE {name} {family.type}")
+        output.extend(lines)
+    return "\n".join(output) + "\n" if output else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
@@ -1,5 +1,6 @@
 """Uiprotectalarms API for controling fans."""
 
+from dataclasses import replace
 import logging
 from typing import TYPE_CHECKING, Dict
 
@@ -8,6 +9,7 @@ from .constants import (
 )
 
 from .pyuiprotectbaseobject import PyUIProtectBaseObject
+from .pyuiprotectstate import PyUIProtectAutomationRecord
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -16,76 +18,105 @@ if TYPE_CHECKING:
 
 
 class PyUIProtectAutomation(PyUIProtectBaseObject):
-    """Class to represent a Unifi Protect Alarm Automation."""
+    """Class to represent a Unifi Protect Alarm Automation.
+
+    Its state is a frozen record, replaced as a whole on every update, so it
+    can be read from any thread without a lock.
+    """
 
     def __init__(self, details: Dict[str, list], PyUIProtectAlarms: "PyUIProtectAlarms"):
         super().__init__(details, PyUIProtectAlarms)
 
-        self._name : str = None
-        self._enabled : bool = None
-        self._id : str = None
-        self._raw_details : dict = None
-
         self.update_state(details)
 
     def __repr__(self):
         # Representation string of object.
-        return f"<{self.__class__.__name__}:{self._id}:{self._name}>"
-    
+        record = self._record
+        return f"<{self.__class__.__name__}:{record.id}:{record.name}>"
+
+    @property
+    def record(self) -> PyUIProtectAutomationRecord:
+        """Return the current state of the automation."""
+        return self._record
+
     @property
     def name(self) -> str:
-        return self._name
+        return self._record.name
 
     @property
     def enabled(self) -> bool:
-        return self._enabled
+        return self._record.enabled
     
     @enabled.setter
     def enabled(self, value: bool):
-        """Enable or disable the automation."""
-
-        # Refresh from the server before updating to avoid overwriting concurrent changes
-        # made directly in UniFi Protect since the integration was last loaded.
-        refresh_response, refresh_status = self._uiProtectAlarms.call_uiprotect_api(
-            UIProtectApi.GET_AUTOMATIONS, self._id
-        )
-        if refresh_status == 200 and refresh_response:
-            _LOGGER.debug("Refreshed automation %s before update", self._id)
-            self._raw_details = refresh_response
-            self._name = refresh_response.get("name", self._name)
-
-        # If the automation is disabled, add (Disabled) to the name, and remove it if enabled.
-        if (value is True):
-            if (self._name.endswith(" (Disabled)")):
-                self._raw_details["name"] = self._name[:-11]
-                self._name = self._name[:-11]
-        else:
-            if (not self._name.endswith(" (Disabled)")):
-                self._raw_details["name"] = self._name + " (Disabled)"
-                self._name = self._name + " (Disabled)"
-
-        self._raw_details["enable"] = value
-        self._enabled = value
-        
-        response, status_code = self._uiProtectAlarms.call_uiprotect_api(UIProtectApi.UPDATE_AUTOMATION, self._id, self._raw_details)
-        if (status_code == 200 and response):
-            self.handle_server_update_base(response)
+        """Enable or disable the automation.
+
+        Updates of the same automation are serialized, so each one starts from
+        what the previous one left on the console.
+        """
+        with self.update_lock:
+            automation_id = self._record.id
+            details = self._record.raw_details
+            manager = self._uiProtectAlarms
+            # Refresh from the server before updating to avoid overwriting concurrent changes
+            # made directly in UniFi Protect since the integration was last loaded. Not needed
+            # when only the changed fields are sent, as the others are left alone.
+            if not manager.capabilities.partial_patch:
+                refresh_response, refresh_status = manager.call_uiprotect_api(
+                    UIProtectApi.GET_AUTOMATIONS, automation_id
+                )
+                if refresh_status == 200 and refresh_response:
+                    _LOGGER.debug("Refreshed automation %s before update", automation_id)
+                    details = refresh_response
+            before = details
+
+            # Published details are never changed, so the update is made on a copy
+            details = {**details}
+            name = details.get("name", self._record.name)
+
+            # If the automation is disabled, add (Disabled) to the name, and remove it if enabled.
+            if (value is True):
+                if (name.endswith(" (Disabled)")):
+                    details["name"] = name[:-11]
+            else:
+                if (not name.endswith(" (Disabled)")):
+                    details["name"] = name + " (Disabled)"
+
+            details["enable"] = value
+            self.update_state(details)
+
+            response, status_code = manager.send_automation_update(automation_id, before, details)
+            if (status_code == 200 and response):
+                manager.apply_automation_response(self, response)
 
     @property
     def id(self):
         """Return the id of the device."""
-        return self._id
+        return self._record.id
 
     @property
     def raw_details(self):
-        """Return the raw details of the device."""
-        return self._raw_details
+        """Return the raw details of the device. They must not be changed."""
+        return self._record.raw_details
+
+    def _record_changes(self, before: PyUIProtectAutomationRecord, after: PyUIProtectAutomationRecord) -> list[str]:
+        fields = super()._record_changes(before, after)
+        # The receivers' cells too, so a switch of one user and channel only wakes for its own
+        if "raw_details" in fields and before.raw_details and after.raw_details:
+            fields.extend(self._uiProtectAlarms.receivers.changed_fields(before.raw_details, after.raw_details))
+        return fields
+
+    def release(self):
+        super().release()
+        self._record = replace(self._record, raw_details=None)
 
     def update_state(self, state: dict):
         _LOGGER.debug("PyUIProtectAutomation:update_state: %s", state.get("id"))
         super().update_state(state)
 
-        self._raw_details = state
-        self._id = state.get("id")
-        self._enabled = state.get("enable")
-        self._name = state.get("name")
\ No newline at end of file
+        self._update_record(PyUIProtectAutomationRecord(
+            id=state.get("id"),
+            name=state.get("name"),
+            enabled=state.get("enable"),
+            raw_details=state,
+        ))
\ No newline at end of file
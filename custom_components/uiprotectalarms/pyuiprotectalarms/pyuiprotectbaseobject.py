@@ -1,9 +1,13 @@
 """Base class for all Uiprotectalarms devices."""
 import threading
 import logging
-from typing import Dict
+from typing import Any, Callable, Dict, Iterable, Optional
 from typing import TYPE_CHECKING
 
+from .pyuiprotectstate import changed_fields
+from .pyuiprotectsubscriptions import PyUIProtectSubscriptions
+from .tracing import TRACER
+
 if TYPE_CHECKING:
     from pyuiprotectalarms import PyUIProtectAlarms
 
@@ -31,8 +35,16 @@ class PyUIProtectBaseObject(object):
         self._feature_key_names: Dict[str, str] = {}
 
         self.raw_state = None
-        self._attr_cbs = []
+        # Frozen record holding the state, set by the subclasses
+        self._record: Any = None
+        # Created with the first callback, as most objects never get one outside HomeAssistant
+        self._subscriptions: Optional[PyUIProtectSubscriptions] = None
+        # Fields of the record changed since the callbacks last ran, tracked once there are callbacks
+        self._changed_fields: set[str] = set()
         self._lock = threading.Lock()
+        # Held across the read-modify-write of an update sent to the console, so
+        # concurrent updates of the same object are applied one after the other
+        self.update_lock = threading.RLock()
 
     def __repr__(self):
         # Representation string of object.
@@ -53,16 +65,52 @@ class PyUIProtectBaseObject(object):
     def update_state(self, state: dict):
         """Process the state dictionary from the REST API."""
 
-    def add_attr_callback(self, cb):
-        """Add a callback to be called by _do_callbacks."""
-        self._attr_cbs.append(cb)
+    def _update_record(self, record: Any) -> None:
+        """Replace the record, noting the fields that changed for the next _do_callbacks."""
+        with self._lock:
+            # The first record is the initial state, not a change
+            if self._record is not None and self._subscriptions:
+                self._changed_fields.update(self._record_changes(self._record, record))
+            self._record = record
+
+    def _record_changes(self, before: Any, after: Any) -> list[str]:
+        """Return the fields callbacks can subscribe to that differ between two records."""
+        return changed_fields(before, after)
+
+    def add_attr_callback(self, cb, fields: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Add a callback to be called by _do_callbacks when one of fields changed.
+
+        fields are names of fields of the object's record, e.g. "enabled". If
+        None, the callback runs on every update. Bound methods are held by weak
+        reference. Returns a function that removes the callback again.
+        """
+        with self._lock:
+            if self._subscriptions is None:
+                self._subscriptions = PyUIProtectSubscriptions()
+        return self._subscriptions.subscribe(cb, fields)
+
+    def remove_attr_callback(self, cb):
+        """Remove a callback added by add_attr_callback, if it is still there."""
+        if self._subscriptions is not None:
+            self._subscriptions.unsubscribe_callback(cb)
+
+    def release(self):
+        """Drop callbacks and cached state once the object is no longer tracked."""
+        if self._subscriptions is not None:
+            self._subscriptions.clear()
+        self.raw_state = None
 
     def _do_callbacks(self):
-        """Run all registered callback"""
-        cbs = []
+        """Run the callbacks subscribed to the fields changed since they last ran"""
+        if self._subscriptions is None:
+            return
         with self._lock:
-            for cb in self._attr_cbs:
-                cbs.append(cb)
-        for cb in cbs:
-            _LOGGER.debug("Running callback %s", cb)
-            cb()
\ No newline at end of file
+            fields, self._changed_fields = self._changed_fields, set()
+        cbs = self._subscriptions.subscribers(fields)
+        if not cbs:
+            return
+        self._uiProtectAlarms.stats.attr_callbacks.inc(len(cbs))
+        with TRACER.span("attr_callbacks", callbacks=len(cbs)):
+            for cb in cbs:
+                _LOGGER.debug("Running callback %s", cb)
+                cb()
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""What a console's firmware supports, found once per Protect version."""
+
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Optional
+
+# Statuses that mean an endpoint doesn't exist on the console, rather than failed this once
+UNAVAILABLE_STATUSES = frozenset({400, 404, 405, 501})
+
+
+def endpoint_available(status_code: int) -> Optional[bool]:
+    """Return whether a status shows an endpoint exists, or None if it doesn't tell, e.g. a 500 or a timeout."""
+    if status_code == 200:
+        return True
+    if status_code in UNAVAILABLE_STATUSES:
+        return False
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class PyUIProtectCapabilities:
+    """What a console was found to support, for the Protect version it ran.
+
+    None where it isn't known yet. Found once, without changing anything on
+    the console, stored with the snapshot, and only found again once the
+    console runs another version.
+    """
+
+    # The Protect version, None if the console doesn't report it
+    version: Optional[str] = None
+    # The notifications endpoint exists, or notifications are extracted from the automations
+    notifications_endpoint: Optional[bool] = None
+    # Updates to an automation may send only the fields that change. Only set once a probe that
+    # can't harm a rule confirms it; until then updates send the whole automation, which is
+    # safe whether the console merges or replaces
+    partial_patch: Optional[bool] = None
+
+    @property
+    def complete(self) -> bool:
+        """Return True if nothing is left to probe."""
+        return self.notifications_endpoint is not None
+
+    def for_version(self, version: Optional[str]) -> "PyUIProtectCapabilities":
+        """Return these capabilities if they were found on version, or unknown ones for it."""
+        return self if self.version == version else PyUIProtectCapabilities(version=version)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the capabilities as a JSON serialisable dict."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PyUIProtectCapabilities":
+        """Return the capabilities stored by as_dict, ignoring unknown keys."""
+        return cls(**{capability.name: data.get(capability.name) for capability in fields(cls)})
@@ -0,0 +1,55 @@
+"""Changes to the set of objects tracked by PyUIProtectAlarms."""
+
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .pyuiprotectautomation import PyUIProtectAutomation
+    from .pyuiprotectnotification import PyUIProtectNotification
+
+
+@dataclass
+class PyUIProtectChanges:
+    """Automations and notifications touched by a refresh, keyed by id.
+
+    Added and removed objects, and automations whose receivers changed, make
+    the changes truthy; updated and unchanged objects are recorded for
+    refresh summaries.
+    """
+
+    added_automations: dict[str, "PyUIProtectAutomation"] = field(default_factory=dict)
+    removed_automations: dict[str, "PyUIProtectAutomation"] = field(default_factory=dict)
+    added_notifications: dict[str, "PyUIProtectNotification"] = field(default_factory=dict)
+    removed_notifications: dict[str, "PyUIProtectNotification"] = field(default_factory=dict)
+    updated_automations: dict[str, "PyUIProtectAutomation"] = field(default_factory=dict)
+    unchanged_automations: dict[str, "PyUIProtectAutomation"] = field(default_factory=dict)
+    updated_notifications: dict[str, "PyUIProtectNotification"] = field(default_factory=dict)
+    unchanged_notifications: dict[str, "PyUIProtectNotification"] = field(default_factory=dict)
+    # Tracked automations that a user started or stopped receiving the notifications of
+    receivers_changed_automations: dict[str, "PyUIProtectAutomation"] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.added_automations
+            or self.removed_automations
+            or self.added_notifications
+            or self.removed_notifications
+            or self.receivers_changed_automations
+        )
+
+    def merge(self, other: "PyUIProtectChanges") -> None:
+        """Add the changes recorded in other to these."""
+        for changes_field in fields(self):
+            getattr(self, changes_field.name).update(getattr(other, changes_field.name))
+
+    def summary(self) -> dict[str, Any]:
+        """Return the ids of touched objects by kind, with counts for unchanged ones."""
+        return {
+            kind: {
+                "added": list(getattr(self, f"added_{kind}")),
+                "updated": list(getattr(self, f"updated_{kind}")),
+                "removed": list(getattr(self, f"removed_{kind}")),
+                "unchanged": len(getattr(self, f"unchanged_{kind}")),
+            }
+            for kind in ("automations", "notifications")
+        }
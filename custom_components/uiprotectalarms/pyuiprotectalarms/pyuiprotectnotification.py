@@ -1,5 +1,6 @@
 """Uiprotectalarms API for controlling notifications."""
 
+from dataclasses import replace
 import logging
 from typing import TYPE_CHECKING
 
@@ -9,6 +10,9 @@ from .constants import (
 )
 
 from .pyuiprotectbaseobject import PyUIProtectBaseObject
+from .pyuiprotectreceivers import with_channel
+from .pyuiprotectstate import PyUIProtectNotificationRecord
+from .tracing import TRACER
 
 _LOGGER = logging.getLogger(LOGGER_NAME)
 
@@ -21,86 +25,91 @@ class PyUIProtectNotification(PyUIProtectBaseObject):
     
     Note: When updating notifications, the changes are applied to all users
     in the UniFi Protect system, not just the authenticated user.
+    Its state is a frozen record, replaced as a whole on every update, so it
+    can be read from any thread without a lock.
     """
 
     def __init__(self, details: dict, PyUIProtectAlarms: "PyUIProtectAlarms"):
         super().__init__(details, PyUIProtectAlarms)
 
-        self._name : str = None
-        self._id : str = None
-        self._push_enabled : bool = None
-        self._email_enabled : bool = None
-        self._raw_details : dict = None
-
         self.update_state(details)
 
     def __repr__(self):
         # Representation string of object.
-        return f"<{self.__class__.__name__}:{self._id}:{self._name}>"
-    
+        record = self._record
+        return f"<{self.__class__.__name__}:{record.id}:{record.name}>"
+
+    @property
+    def record(self) -> PyUIProtectNotificationRecord:
+        """Return the current state of the notification."""
+        return self._record
+
     @property
     def name(self) -> str:
-        return self._name
+        return self._record.name
 
     @property
     def id(self) -> str:
         """Return the id of the notification."""
-        return self._id
+        return self._record.id
+
+    @property
+    def automation_id(self) -> str | None:
+        """Return the id of the automation this notification was extracted from, if any."""
+        return self._record.automation_id
 
     @property
     def push_enabled(self) -> bool:
         """Return if push notifications are enabled."""
-        return self._push_enabled
+        return self._record.push_enabled
     
     @push_enabled.setter
     def push_enabled(self, value: bool):
         """Enable or disable push notifications."""
-        if self._raw_details is None:
+        if self._record.raw_details is None:
             return
         
-        # Update local state first
-        self._push_enabled = value
-        
-        # Update via automation if available
-        self._update_notification_channel("push", value)
+        with self.update_lock:
+            # Update local state first
+            self._update_record(replace(self._record, push_enabled=value))
+
+            # Update via automation if available
+            self._update_notification_channel("push", value)
     
     @property
     def email_enabled(self) -> bool:
         """Return if email notifications are enabled."""
-        return self._email_enabled
+        return self._record.email_enabled
     
     @email_enabled.setter
     def email_enabled(self, value: bool):
         """Enable or disable email notifications."""
-        if self._raw_details is None:
+        if self._record.raw_details is None:
             return
         
-        # Update local state first
-        self._email_enabled = value
-        
-        # Update via automation if available
-        self._update_notification_channel("email", value)
+        with self.update_lock:
+            # Update local state first
+            self._update_record(replace(self._record, email_enabled=value))
+
+            # Update via automation if available
+            self._update_notification_channel("email", value)
 
     def _update_notification_channel(self, channel: str, enabled: bool):
         """Update a specific notification channel (push or email) for all users."""
-        if self._raw_details is None or self._id is None:
+        record = self._record
+        if record.raw_details is None or record.id is None:
             return
         
         # If this notification was extracted from an automation, update the automation instead
-        if hasattr(self, '_automation_id') and self._automation_id:
+        if record.automation_id:
             _LOGGER.debug("Updating notification channel %s=%s via automation %s", 
-                         channel, enabled, self._automation_id)
+                         channel, enabled, record.automation_id)
             self._update_notification_via_automation(channel, enabled)
             return
         
-        # Get list of users
-        users = getattr(self._uiProtectAlarms, '_users', [])
-        
-        if not users:
-            _LOGGER.warning("No users found, trying to load users first")
-            self._uiProtectAlarms.load_users()
-            users = getattr(self._uiProtectAlarms, '_users', [])
-        
+        # The users as loaded by the last refresh. They are not reloaded here, in the middle of a toggle.
+        users = self._uiProtectAlarms.users
+
         if not users:
             _LOGGER.error("Cannot update notifications: no users available")
             # Fallback: update only for current user
@@ -109,34 +118,30 @@ class PyUIProtectNotification(PyUIProtectBaseObject):
         
         # Update notification for each user
         success_count = 0
-        for user in users:
-            user_id = user.get("id")
-            if not user_id:
-                continue
-            
-            # Prepare update payload with user-specific path
-            update_payload = self._raw_details.copy()
+        with TRACER.span("notification_fanout", notification=record.id, users=len(users)):
+            for user_id in users:
+                # Prepare update payload with user-specific path
+                update_payload = record.raw_details.copy()
             
-            # Try to update notification for this specific user
-            response, status_code = self._uiProtectAlarms.call_uiprotect_api(
-                UIProtectApi.UPDATE_NOTIFICATION, 
-                f"{self._id}?userId={user_id}", 
-                update_payload
-            )
+                # Try to update notification for this specific user
+                response, status_code = self._uiProtectAlarms.call_uiprotect_api(
+                    UIProtectApi.UPDATE_NOTIFICATION, 
+                    f"{record.id}?userId={user_id}", 
+                    update_payload
+                )
             
-            if status_code == 200:
-                success_count += 1
-                _LOGGER.debug("Updated notification %s for user %s", self._id, user_id)
-            else:
-                _LOGGER.debug("Failed to update notification %s for user %s, status: %s", 
-                             self._id, user_id, status_code)
+                if status_code == 200:
+                    success_count += 1
+                    _LOGGER.debug("Updated notification %s for user %s", record.id, user_id)
+                else:
+                    _LOGGER.debug("Failed to update notification %s for user %s, status: %s", 
+                                 record.id, user_id, status_code)
         
         if success_count > 0:
             _LOGGER.info("Updated notification %s for %d/%d users", 
-                        self._id, success_count, len(users))
+                        record.id, success_count, len(users))
             # Update local state
-            self._push_enabled = "push" in self._raw_details.get("channels", [])
-            self._email_enabled = "email" in self._raw_details.get("channels", [])
+            self._set_channels_from(record.raw_details.get("channels", []))
         else:
             # If all user-specific updates failed, try single update as fallback
             _LOGGER.warning("All user-specific updates failed, trying single update")
@@ -144,103 +149,57 @@ class PyUIProtectNotification(PyUIProtectBaseObject):
     
     def _update_notification_via_automation(self, channel: str, enabled: bool):
         """Update notification channel by updating the automation that contains it."""
-        if not hasattr(self, '_automation_id') or not self._automation_id:
+        automation_id = self._record.automation_id
+        if not automation_id:
             return
         
-        automation = self._uiProtectAlarms.automations.get(self._automation_id)
+        automation = self._uiProtectAlarms.automations.get(automation_id)
         if not automation or not automation.raw_details:
-            _LOGGER.error("Automation %s not found for notification update", self._automation_id)
+            _LOGGER.error("Automation %s not found for notification update", automation_id)
             return
-        
-        _LOGGER.debug("Updating channel %s to %s in automation %s", channel, enabled, self._automation_id)
-        
-        # Read current state from automation to preserve other channels
-        current_push_state = False
-        current_email_state = False
-        
-        actions = automation.raw_details.get("actions", [])
-        for action in actions:
-            if action.get("type") == "SEND_NOTIFICATION":
-                metadata = action.get("metadata", {})
-                receivers = metadata.get("receivers", [])
-                
-                if receivers:
-                    current_channels = receivers[0].get("channels", [])
-                    if isinstance(current_channels, list):
-                        current_push_state = "push" in current_channels
-                        current_email_state = "email" in current_channels
-                        _LOGGER.debug("Current state from automation: push=%s, email=%s", 
-                                     current_push_state, current_email_state)
-                    break
-        
-        # Update with the new value for the specific channel, preserving the other
-        if channel == "push":
-            new_push_state = enabled
-            new_email_state = current_email_state
-        else:  # channel == "email"
-            new_push_state = current_push_state
-            new_email_state = enabled
-        
-        _LOGGER.debug("New state after update: push=%s, email=%s", new_push_state, new_email_state)
-        
-        # Update channels in all receivers for all users
-        for action in actions:
-            if action.get("type") == "SEND_NOTIFICATION":
-                metadata = action.get("metadata", {})
-                receivers = metadata.get("receivers", [])
-                
-                for receiver in receivers:
-                    channels = []
-                    if new_push_state:
-                        channels.append("push")
-                    if new_email_state:
-                        channels.append("email")
-                    
-                    receiver["channels"] = channels
-                    _LOGGER.debug("Updated receiver %s with channels: %s", receiver.get("user"), channels)
-        
-        # Update the automation
-        response, status_code = self._uiProtectAlarms.call_uiprotect_api(
-            UIProtectApi.UPDATE_AUTOMATION, 
-            self._automation_id, 
-            automation.raw_details
-        )
+
+        # The automation's other updates, e.g. enabling it, must not interleave with this one
+        with automation.update_lock:
+            self._update_automation_channels(automation, channel, enabled)
+
+    def _update_automation_channels(self, automation, channel: str, enabled: bool):
+        """Set one channel for every receiver of the automation, keeping their other channels, and send the update."""
+        automation_id = self._record.automation_id
+        _LOGGER.debug("Updating channel %s to %s in automation %s", channel, enabled, automation_id)
+
+        manager = self._uiProtectAlarms
+        if not manager.receivers.needs_update(automation, channel, enabled):
+            _LOGGER.debug("Automation %s already has %s=%s for every receiver", automation_id, channel, enabled)
+            return
+
+        # The receivers are changed on a copy, as published details are never changed
+        details = with_channel(automation.raw_details, channel, enabled)
+        response, status_code = manager.send_automation_update(automation_id, automation.raw_details, details)
         
         if status_code == 200:
             _LOGGER.info("Successfully updated notification %s (channel %s=%s) via automation %s for all users", 
-                        self._name, channel, enabled, self._automation_id)
+                        self._record.name, channel, enabled, automation_id)
             if response:
-                automation.update_state(response)
-                # Update local notification state from response
-                actions = response.get("actions", [])
-                for action in actions:
-                    if action.get("type") == "SEND_NOTIFICATION":
-                        metadata = action.get("metadata", {})
-                        receivers = metadata.get("receivers", [])
-                        if receivers:
-                            updated_channels = receivers[0].get("channels", [])
-                            self._push_enabled = "push" in updated_channels
-                            self._email_enabled = "email" in updated_channels
-                            _LOGGER.debug("Updated local state: push=%s, email=%s", 
-                                         self._push_enabled, self._email_enabled)
-                            break
+                # Updates this notification from the automation too
+                manager.apply_automation_response(automation, response)
             else:
                 _LOGGER.debug("No response from API, keeping local state: push=%s, email=%s", 
-                             self._push_enabled, self._email_enabled)
+                             self._record.push_enabled, self._record.email_enabled)
         else:
             _LOGGER.error("Failed to update automation %s, status: %s, response: %s", 
-                         self._automation_id, status_code, response)
+                         automation_id, status_code, response)
     
     def _update_notification_single(self):
         """Update notification for current user only (fallback method)."""
-        if self._raw_details is None or self._id is None:
+        record = self._record
+        if record.raw_details is None or record.id is None:
             return
         
-        update_payload = self._raw_details.copy()
+        update_payload = record.raw_details.copy()
         
         response, status_code = self._uiProtectAlarms.call_uiprotect_api(
             UIProtectApi.UPDATE_NOTIFICATION, 
-            self._id, 
+            record.id, 
             update_payload
         )
         if status_code == 200:
@@ -248,26 +207,33 @@ class PyUIProtectNotification(PyUIProtectBaseObject):
                 self.handle_server_update_base(response)
             else:
                 # If response is empty, just update local state
-                self._push_enabled = "push" in self._raw_details.get("channels", [])
-                self._email_enabled = "email" in self._raw_details.get("channels", [])
+                self._set_channels_from(record.raw_details.get("channels", []))
+
+    def _set_channels_from(self, channels: list[str]):
+        """Set push and email from the channels the console holds."""
+        self._update_record(replace(self._record, push_enabled="push" in channels, email_enabled="email" in channels))
 
     @property
     def raw_details(self):
-        """Return the raw details of the notification."""
-        return self._raw_details
+        """Return the raw details of the notification. They must not be changed."""
+        return self._record.raw_details
+
+    def release(self):
+        super().release()
+        self._record = replace(self._record, raw_details=None)
 
     def update_state(self, state: dict):
         _LOGGER.debug("PyUIProtectNotification:update_state: %s", state.get("id"))
         super().update_state(state)
 
-        self._raw_details = state
-        self._id = state.get("id")
-        self._name = state.get("name") or state.get("type", "Unknown")
-        
-        # Store automation_id if this notification was extracted from an automation
-        self._automation_id = state.get("automation_id")
-        
         # Parse channels to determine push and email status
         channels = state.get("channels", [])
-        self._push_enabled = "push" in channels
-        self._email_enabled = "email" in channels
+        self._update_record(PyUIProtectNotificationRecord(
+            id=state.get("id"),
+            name=state.get("name") or state.get("type", "Unknown"),
+            # Set if this notification was extracted from an automation
+            automation_id=state.get("automation_id"),
+            push_enabled="push" in channels,
+            email_enabled="email" in channels,
+            raw_details=state,
+        ))
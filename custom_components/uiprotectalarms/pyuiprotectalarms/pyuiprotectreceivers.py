@@ -0,0 +1,206 @@
+"""Who is notified by which automation, and on which channels, as a compact matrix."""
+
+import threading
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    from .pyuiprotectautomation import PyUIProtectAutomation
+
+# Bits of a cell of the matrix
+CHANNEL_BITS = {"push": 0x01, "email": 0x02}
+# Set if the user is a receiver of the automation, with or without channels
+RECEIVER = 0x80
+
+NOTIFICATION_ACTION = "SEND_NOTIFICATION"
+
+
+def receiver_field(user_id: str, channel: Optional[str] = None) -> str:
+    """Return the field an automation reports a change of a user's cell, or of one channel of it, as."""
+    return f"receivers.{user_id}" if channel is None else f"receivers.{user_id}.{channel}"
+
+
+def notification_receivers(details: dict) -> Iterable[dict]:
+    """Yield the receivers of every notification action of an automation."""
+    for action in details.get("actions", []):
+        if action.get("type") == NOTIFICATION_ACTION:
+            yield from action.get("metadata", {}).get("receivers", [])
+
+
+def receiver_ids(details: Optional[dict]) -> frozenset[str]:
+    """Return the ids of the users who receive the notifications of an automation."""
+    if not details:
+        return frozenset()
+    return frozenset(receiver["user"] for receiver in notification_receivers(details) if receiver.get("user"))
+
+
+class PyUIProtectReceiverMatrix:
+    """The channels each user is notified on by each automation.
+
+    An automation's receivers are compiled into a row of one byte per user,
+    with the RECEIVER bit and a bit per channel in CHANNEL_BITS. A row is
+    cached with the details it was compiled from and compiled again only
+    when the automation holds new details. As published details are never
+    changed, comparing their identity is enough. Users get a column the
+    first time they are seen, and keep it. Rows are read from the event loop
+    and executor threads alike, so the cache and the columns are only changed
+    under a lock.
+    """
+
+    def __init__(self) -> None:
+        # Reentrant, as a row is compiled while the cache is locked
+        self._lock = threading.RLock()
+        # User id -> column, and the user ids in column order
+        self._columns: dict[str, int] = {}
+        self._user_ids: list[str] = []
+        # Automation id -> the details a row was compiled from, and the row
+        self._rows: dict[str, tuple[dict, bytes]] = {}
+
+    @property
+    def user_ids(self) -> list[str]:
+        """Return the ids of the users seen as receivers, in column order."""
+        with self._lock:
+            return list(self._user_ids)
+
+    def row(self, automation: "PyUIProtectAutomation") -> bytes:
+        """Return the cells of an automation, one per user column. Columns past its end aren't receivers."""
+        details = automation.raw_details
+        with self._lock:
+            cached = self._rows.get(automation.id)
+            if cached is not None and cached[0] is details:
+                return cached[1]
+
+            row = self._compile_row(details) if details else b""
+            if details:
+                self._rows[automation.id] = (details, row)
+            return row
+
+    def _compile_row(self, details: dict) -> bytes:
+        cells: dict[int, int] = {}
+        with self._lock:
+            for receiver in notification_receivers(details):
+                user_id = receiver.get("user")
+                if user_id is None:
+                    continue
+                column = self._columns.get(user_id)
+                if column is None:
+                    column = self._columns[user_id] = len(self._user_ids)
+                    self._user_ids.append(user_id)
+                cell = cells.get(column, RECEIVER)
+                for channel in receiver.get("channels") or ():
+                    cell |= CHANNEL_BITS.get(channel, 0)
+                cells[column] = cell
+
+        row = bytearray(max(cells) + 1 if cells else 0)
+        for column, cell in cells.items():
+            row[column] = cell
+        return bytes(row)
+
+    def changed_fields(self, before: dict, after: dict) -> list[str]:
+        """Return the receiver fields, see receiver_field, that differ between two details of an automation."""
+        before_row, after_row = self._compile_row(before), self._compile_row(after)
+        fields = []
+        for column in range(max(len(before_row), len(after_row))):
+            before_cell = before_row[column] if column < len(before_row) else 0
+            after_cell = after_row[column] if column < len(after_row) else 0
+            difference = before_cell ^ after_cell
+            if not difference:
+                continue
+            user_id = self._user_ids[column]
+            if difference & RECEIVER:
+                fields.append(receiver_field(user_id))
+            fields.extend(
+                receiver_field(user_id, channel) for channel, bit in CHANNEL_BITS.items() if difference & bit
+            )
+        return fields
+
+    def forget(self, automation_id: str) -> None:
+        """Drop the row of an automation that is no longer tracked."""
+        with self._lock:
+            self._rows.pop(automation_id, None)
+
+    def cell(self, automation: "PyUIProtectAutomation", user_id: str) -> int:
+        """Return the cell of a user in an automation, 0 if the user isn't a receiver."""
+        # Compiled first, as it gives users seen for the first time their column
+        row = self.row(automation)
+        column = self._columns.get(user_id)
+        return row[column] if column is not None and column < len(row) else 0
+
+    def is_enabled(self, automation: "PyUIProtectAutomation", user_id: str, channel: str) -> bool:
+        """Return True if the automation notifies the user on channel."""
+        return bool(self.cell(automation, user_id) & CHANNEL_BITS[channel])
+
+    def channels(self, automation: "PyUIProtectAutomation") -> int:
+        """Return the bits of the channels the automation notifies any user on."""
+        bits = 0
+        for cell in self.row(automation):
+            bits |= cell
+        return bits & ~RECEIVER
+
+    def _columns_of(self, user_ids: Optional[Iterable[str]]) -> Optional[list[int]]:
+        if user_ids is None:
+            return None
+        return [self._columns[user_id] for user_id in user_ids if user_id in self._columns]
+
+    def needs_update(
+        self,
+        automation: "PyUIProtectAutomation",
+        channel: str,
+        enabled: bool,
+        user_ids: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """Return True if setting channel for the users, or every receiver if None, changes the automation."""
+        row = self.row(automation)
+        return self._needs_update(row, CHANNEL_BITS[channel], enabled, self._columns_of(user_ids))
+
+    @staticmethod
+    def _needs_update(row: bytes, bit: int, enabled: bool, columns: Optional[list[int]]) -> bool:
+        want = bit if enabled else 0
+        cells = row if columns is None else (row[column] for column in columns if column < len(row))
+        return any(cell & RECEIVER and cell & bit != want for cell in cells)
+
+    def compile_update(
+        self,
+        automations: Iterable["PyUIProtectAutomation"],
+        channel: str,
+        enabled: bool,
+        user_ids: Optional[Iterable[str]] = None,
+    ) -> dict[str, dict]:
+        """Compile setting channel for the users, or every receiver if None, across automations.
+
+        Returns the details to send for each automation the change touches, and
+        only for those. Users who aren't receivers of an automation are left out
+        of it, and so are the other channels and fields of the receivers.
+        """
+        bit = CHANNEL_BITS[channel]
+        user_ids = None if user_ids is None else set(user_ids)
+        rows = [(automation, self.row(automation)) for automation in automations]
+        columns = self._columns_of(user_ids)
+        return {
+            automation.id: with_channel(automation.raw_details, channel, enabled, user_ids)
+            for automation, row in rows
+            if self._needs_update(row, bit, enabled, columns)
+        }
+
+
+def with_channel(details: dict, channel: str, enabled: bool, user_ids: Optional[set[str]] = None) -> dict:
+    """Return a copy of an automation's details with channel set for the users, or every receiver if None.
+
+    Only the actions are copied, as the rest of the details are shared with the
+    published ones and not changed.
+    """
+    actions = []
+    for action in details.get("actions", []):
+        if action.get("type") == NOTIFICATION_ACTION:
+            metadata = action.get("metadata", {})
+            receivers = []
+            for receiver in metadata.get("receivers", []):
+                channels = list(receiver.get("channels") or ())
+                if user_ids is None or receiver.get("user") in user_ids:
+                    if enabled and channel not in channels:
+                        channels.append(channel)
+                    elif not enabled and channel in channels:
+                        channels.remove(channel)
+                receivers.append({**receiver, "channels": channels})
+            action = {**action, "metadata": {**metadata, "receivers": receivers}}
+        actions.append(action)
+    return {**details, "actions": actions}
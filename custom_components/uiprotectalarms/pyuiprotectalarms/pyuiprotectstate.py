@@ -0,0 +1,139 @@
+"""Immutable state of a PyUIProtectAlarms manager and of the objects it tracks.
+
+Readers, e.g. entities on the HomeAssistant event loop, never take a lock.
+Writers, the refreshes and websocket updates on executor threads, are
+serialized by the manager and build the next version on copies. Published
+maps, records and the raw details dicts inside them are never changed.
+
+The maps hold the objects, not their records: an object lives across
+versions and an update swaps in its next record. A single state read gives
+a consistent view of which objects are tracked; a single record read, e.g.
+automation.record, gives a consistent view of one object. Reading several
+properties of an object one by one may mix records, so read the record once.
+"""
+
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Optional, Union
+
+from .pyuiprotectusers import EMPTY_USERS, PyUIProtectUserDirectory
+
+if TYPE_CHECKING:
+    from .pyuiprotectautomation import PyUIProtectAutomation
+    from .pyuiprotectchanges import PyUIProtectChanges
+    from .pyuiprotectnotification import PyUIProtectNotification
+
+EMPTY_MAP: Mapping[str, Any] = MappingProxyType({})
+
+
+def changed_fields(before: Any, after: Any) -> list[str]:
+    """Return the names of the fields that differ between two records of the same type."""
+    return [
+        record_field.name for record_field in fields(after)
+        if getattr(before, record_field.name) != getattr(after, record_field.name)
+    ]
+
+
+@dataclass(frozen=True, slots=True)
+class PyUIProtectAutomationRecord:
+    """What an automation holds at one point in time."""
+
+    id: Optional[str] = None
+    name: Optional[str] = None
+    enabled: Optional[bool] = None
+    # None once the automation is no longer tracked
+    raw_details: Optional[dict] = None
+
+
+@dataclass(frozen=True, slots=True)
+class PyUIProtectNotificationRecord:
+    """What a notification setting holds at one point in time."""
+
+    id: Optional[str] = None
+    name: Optional[str] = None
+    # Set when the notification was extracted from an automation
+    automation_id: Optional[str] = None
+    push_enabled: Optional[bool] = None
+    email_enabled: Optional[bool] = None
+    # None once the notification is no longer tracked
+    raw_details: Optional[dict] = None
+
+
+@dataclass(frozen=True, slots=True)
+class PyUIProtectState:
+    """One published version of the automations, notifications and users a manager tracks.
+
+    A new version is published when objects are added or removed, or the
+    users change. Updates of a tracked object swap its record instead.
+    """
+
+    version: int = 0
+    automations: Mapping[str, "PyUIProtectAutomation"] = field(default_factory=lambda: EMPTY_MAP)
+    notifications: Mapping[str, "PyUIProtectNotification"] = field(default_factory=lambda: EMPTY_MAP)
+    users: PyUIProtectUserDirectory = field(default_factory=lambda: EMPTY_USERS)
+
+
+@dataclass
+class PyUIProtectStagedState:
+    """Changes to a published state, held until they are published together as the next version.
+
+    The maps are copied the first time they are edited, so a refresh that
+    changes nothing publishes nothing.
+    """
+
+    base: PyUIProtectState
+    # Changes reported while staging, sent to listeners once published
+    pending_changes: list["PyUIProtectChanges"] = field(default_factory=list)
+    _automations: Optional[dict[str, "PyUIProtectAutomation"]] = None
+    _notifications: Optional[dict[str, "PyUIProtectNotification"]] = None
+    _users: Optional[PyUIProtectUserDirectory] = None
+
+    @property
+    def automations(self) -> Mapping[str, "PyUIProtectAutomation"]:
+        """Return the automations as staged so far."""
+        return self._automations if self._automations is not None else self.base.automations
+
+    @property
+    def notifications(self) -> Mapping[str, "PyUIProtectNotification"]:
+        """Return the notifications as staged so far."""
+        return self._notifications if self._notifications is not None else self.base.notifications
+
+    @property
+    def users(self) -> PyUIProtectUserDirectory:
+        """Return the users as staged so far."""
+        return self._users if self._users is not None else self.base.users
+
+    @users.setter
+    def users(self, users: Union[PyUIProtectUserDirectory, Iterable[dict]]) -> None:
+        """Stage a directory, or build one from users as listed by the users endpoint."""
+        if not isinstance(users, PyUIProtectUserDirectory):
+            users = PyUIProtectUserDirectory.from_response(users)
+        self._users = users
+
+    def edit_automations(self) -> dict[str, "PyUIProtectAutomation"]:
+        """Return the staged automations to change."""
+        if self._automations is None:
+            self._automations = dict(self.base.automations)
+        return self._automations
+
+    def edit_notifications(self) -> dict[str, "PyUIProtectNotification"]:
+        """Return the staged notifications to change."""
+        if self._notifications is None:
+            self._notifications = dict(self.base.notifications)
+        return self._notifications
+
+    @property
+    def changed(self) -> bool:
+        """Return True if anything was staged."""
+        return self._automations is not None or self._notifications is not None or self._users is not None
+
+    def build(self) -> PyUIProtectState:
+        """Return the next version, with the staged changes."""
+        return PyUIProtectState(
+            version=self.base.version + 1,
+            automations=MappingProxyType(self._automations) if self._automations is not None else self.base.automations,
+            notifications=(
+                MappingProxyType(self._notifications) if self._notifications is not None else self.base.notifications
+            ),
+            users=self.users,
+        )
@@ -0,0 +1,192 @@
+"""Operational statistics kept by PyUIProtectAlarms, for diagnostics and metrics."""
+
+from typing import Any
+
+from .constants import UIProtectApi
+from .metrics import MetricsRegistry
+from .tracing import REQUEST_PHASES
+
+# Upper bounds of the latency histogram buckets, in seconds. Anything slower
+# falls in a final overflow bucket.
+LATENCY_BUCKETS_SECONDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Request phases and reconcile loops are often only a few milliseconds
+PHASE_BUCKETS_SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PyUIProtectEndpointStats:
+    """Call count, errors, latency histogram and payload sizes of one API endpoint."""
+
+    __slots__ = ("_calls", "_errors", "_latency", "_bytes", "_bytes_max", "_phases")
+
+    def __init__(self, registry: MetricsRegistry, endpoint: str) -> None:
+        self._calls = registry.counter(
+            "uiprotectalarms_api_requests", "Calls made to the UIProtect API", ("endpoint",)
+        ).labels(endpoint)
+        self._errors = registry.counter(
+            "uiprotectalarms_api_errors", "UIProtect API calls that failed or did not return 200", ("endpoint",)
+        ).labels(endpoint)
+        self._latency = registry.histogram(
+            "uiprotectalarms_api_request_duration_seconds", "Duration of UIProtect API calls", ("endpoint",),
+            buckets=LATENCY_BUCKETS_SECONDS,
+        ).labels(endpoint)
+        self._bytes = registry.counter(
+            "uiprotectalarms_api_response_bytes", "Bytes received from the UIProtect API", ("endpoint",)
+        ).labels(endpoint)
+        self._bytes_max = registry.gauge(
+            "uiprotectalarms_api_response_bytes_max", "Largest response received from the UIProtect API", ("endpoint",)
+        ).labels(endpoint)
+        phases = registry.histogram(
+            "uiprotectalarms_api_phase_duration_seconds",
+            "Time spent in each phase of UIProtect API calls: connect, tls, server, download and decode",
+            ("endpoint", "phase"),
+            buckets=PHASE_BUCKETS_SECONDS,
+        )
+        self._phases = {phase: phases.labels(endpoint, phase) for phase in REQUEST_PHASES}
+
+    def record(self, elapsed: float, status_code: int, size: int) -> None:
+        """Record one call that took elapsed seconds and returned size bytes."""
+        self._calls.inc()
+        if status_code != 200:
+            self._errors.inc()
+        self._latency.observe(elapsed)
+        self._bytes.inc(size)
+        self._bytes_max.set_max(size)
+
+    def record_phases(self, connect: float, tls: float, server: float, download: float) -> None:
+        """Record the phases of one request. Connect and TLS are skipped for reused connections."""
+        if connect:
+            self._phases["connect"].observe(connect)
+        if tls:
+            self._phases["tls"].observe(tls)
+        self._phases["server"].observe(server)
+        self._phases["download"].observe(download)
+
+    def record_phase(self, phase: str, elapsed: float) -> None:
+        """Record the time spent in one phase of a request."""
+        self._phases[phase].observe(elapsed)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as plain data."""
+        return {
+            "calls": int(self._calls.value),
+            "errors": int(self._errors.value),
+            "latency_seconds": {
+                "buckets": dict(zip([*map(str, LATENCY_BUCKETS_SECONDS), "+Inf"], self._latency.counts)),
+                "sum": round(self._latency.sum, 6),
+            },
+            "payload_bytes": {"total": int(self._bytes.value), "max": int(self._bytes_max.value)},
+            "phases_seconds": {
+                phase: {"count": histogram.count, "sum": round(histogram.sum, 6)}
+                for phase, histogram in self._phases.items()
+            },
+        }
+
+
+class PyUIProtectCacheStats:
+    """Hits and misses of a cache."""
+
+    __slots__ = ("_hits", "_misses")
+
+    def __init__(self, registry: MetricsRegistry, cache: str) -> None:
+        self._hits = registry.counter(
+            "uiprotectalarms_cache_hits", "Lookups answered from a cache", ("cache",)
+        ).labels(cache)
+        self._misses = registry.counter(
+            "uiprotectalarms_cache_misses", "Lookups that missed a cache", ("cache",)
+        ).labels(cache)
+
+    def record(self, hits: int = 0, misses: int = 0) -> None:
+        """Record hits and misses."""
+        if hits:
+            self._hits.inc(hits)
+        if misses:
+            self._misses.inc(misses)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as plain data."""
+        hits = int(self._hits.value)
+        misses = int(self._misses.value)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+class PyUIProtectStats:
+    """Statistics of one PyUIProtectAlarms instance, kept in its metrics registry.
+
+    Caches are the reused login token ("auth_token") and the change detection
+    that skips automations and notifications whose details did not change.
+    """
+
+    REFRESHES = ("load_automations", "load_users", "load_notifications")
+    RECONCILES = ("automations", "notifications")
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.endpoints = {api: PyUIProtectEndpointStats(registry, str(api)) for api in UIProtectApi}
+        self.caches = {
+            cache: PyUIProtectCacheStats(registry, cache)
+            for cache in ("auth_token", "automation_details", "notification_details")
+        }
+
+        logins = registry.counter("uiprotectalarms_logins", "Logins to the UIProtect console", ("result",))
+        self._auth_refreshes = logins.labels("success")
+        self._auth_failures = logins.labels("failure")
+
+        refresh_duration = registry.histogram(
+            "uiprotectalarms_refresh_duration_seconds", "Duration of full reloads", ("refresh",),
+            buckets=LATENCY_BUCKETS_SECONDS,
+        )
+        last_refresh_duration = registry.gauge(
+            "uiprotectalarms_last_refresh_duration_seconds", "Duration of the last full reload", ("refresh",)
+        )
+        self._refreshes = {
+            name: (refresh_duration.labels(name), last_refresh_duration.labels(name)) for name in self.REFRESHES
+        }
+        reconcile_duration = registry.histogram(
+            "uiprotectalarms_reconcile_duration_seconds",
+            "Time spent applying a full reload to the tracked objects",
+            ("objects",),
+            buckets=PHASE_BUCKETS_SECONDS,
+        )
+        self._reconciles = {name: reconcile_duration.labels(name) for name in self.RECONCILES}
+
+        callbacks = registry.counter(
+            "uiprotectalarms_callbacks", "Callbacks run for library updates", ("kind",)
+        )
+        self.attr_callbacks = callbacks.labels("attr")
+        self.change_callbacks = callbacks.labels("change")
+
+    def record_auth(self, success: bool) -> None:
+        """Record a login."""
+        (self._auth_refreshes if success else self._auth_failures).inc()
+
+    def record_refresh(self, name: str, elapsed: float) -> None:
+        """Record how long a run of a refresh (e.g. load_automations) took."""
+        duration, last_duration = self._refreshes[name]
+        duration.observe(elapsed)
+        last_duration.set(elapsed)
+
+    def record_reconcile(self, name: str, elapsed: float) -> None:
+        """Record how long applying a full reload of automations or notifications took."""
+        self._reconciles[name].observe(elapsed)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all statistics as plain data."""
+        return {
+            "auth_refreshes": int(self._auth_refreshes.value),
+            "auth_failures": int(self._auth_failures.value),
+            "last_refresh_seconds": {
+                name: round(last_duration.value, 6)
+                for name, (duration, last_duration) in self._refreshes.items() if duration.count
+            },
+            "reconcile_seconds": {
+                name: {"count": histogram.count, "sum": round(histogram.sum, 6)}
+                for name, histogram in self._reconciles.items()
+            },
+            "callbacks": {"attr": int(self.attr_callbacks.value), "change": int(self.change_callbacks.value)},
+            "endpoints": {str(api): endpoint.as_dict() for api, endpoint in self.endpoints.items()},
+            "caches": {name: cache.as_dict() for name, cache in self.caches.items()},
+        }
@@ -0,0 +1,121 @@
+"""Callbacks subscribed to the fields of an object, for PyUIProtectBaseObject."""
+
+from functools import partial
+from itertools import count
+import threading
+from types import MethodType
+from typing import Any, Callable, Iterable, Optional
+import weakref
+
+# Key of the callbacks subscribed to every update, whatever changed
+ALL_FIELDS = None
+
+# Orders the callbacks of an update the way they subscribed
+_ORDER = count()
+
+
+class _Subscription:
+    """A callback and the fields it is subscribed to."""
+
+    __slots__ = ("order", "target", "func", "fields")
+
+    def __init__(self, cb: Callable[[], None], fields: tuple[Optional[str], ...]) -> None:
+        self.order = next(_ORDER)
+        self.fields = fields
+        if isinstance(cb, MethodType):
+            # Weak reference to the instance, so subscribing doesn't keep it alive
+            self.target: Any = weakref.ref(cb.__self__)
+            self.func: Optional[Callable] = cb.__func__
+        else:
+            self.target = cb
+            self.func = None
+
+    def callback(self) -> Optional[Callable[[], None]]:
+        """Return the callback, or None if its instance was garbage collected."""
+        if self.func is None:
+            return self.target
+        instance = self.target()
+        return None if instance is None else MethodType(self.func, instance)
+
+
+class PyUIProtectSubscriptions:
+    """Callbacks subscribed to the fields of an object.
+
+    Callbacks are indexed by field, so an update only looks at the callbacks
+    subscribed to the fields it changed. Bound methods, e.g. those of the
+    HomeAssistant entities, are held by weak reference, so an entity that is
+    gone is dropped without having to unsubscribe. Other callables are held
+    until they are unsubscribed.
+    """
+
+    __slots__ = ("_lock", "_by_field")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Field (or ALL_FIELDS) -> the subscriptions to it. Tuples, as a field
+        # rarely has more than a couple of subscribers.
+        self._by_field: dict[Optional[str], tuple[_Subscription, ...]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._by_field)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len({subscription for subscriptions in self._by_field.values() for subscription in subscriptions})
+
+    def subscribe(self, cb: Callable[[], None], fields: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Subscribe cb to changes of the given fields, or to every update if fields is None.
+
+        Returns a function that unsubscribes it again.
+        """
+        subscription = _Subscription(cb, (ALL_FIELDS,) if fields is None else tuple(fields))
+        with self._lock:
+            for key in subscription.fields:
+                self._by_field[key] = (*self._by_field.get(key, ()), subscription)
+        return partial(self._unsubscribe, subscription)
+
+    def _unsubscribe(self, subscription: _Subscription) -> None:
+        with self._lock:
+            self._drop(subscription)
+
+    def _drop(self, subscription: _Subscription) -> None:
+        for key in subscription.fields:
+            subscriptions = tuple(other for other in self._by_field.get(key, ()) if other is not subscription)
+            if subscriptions:
+                self._by_field[key] = subscriptions
+            else:
+                self._by_field.pop(key, None)
+
+    def unsubscribe_callback(self, cb: Callable[[], None]) -> None:
+        """Drop every subscription of cb."""
+        with self._lock:
+            subscriptions = {
+                subscription for subscriptions in self._by_field.values()
+                for subscription in subscriptions if subscription.callback() == cb
+            }
+            for subscription in subscriptions:
+                self._drop(subscription)
+
+    def clear(self) -> None:
+        """Drop every subscription."""
+        with self._lock:
+            self._by_field = {}
+
+    def subscribers(self, fields: Iterable[str]) -> list[Callable[[], None]]:
+        """Return the callbacks to run for an update changing fields, in the order they subscribed.
+
+        Subscriptions whose callback was garbage collected are dropped on the way.
+        """
+        with self._lock:
+            subscriptions = set(self._by_field.get(ALL_FIELDS, ()))
+            for field in fields:
+                subscriptions.update(self._by_field.get(field, ()))
+
+            callbacks = []
+            for subscription in sorted(subscriptions, key=lambda subscription: subscription.order):
+                cb = subscription.callback()
+                if cb is None:
+                    self._drop(subscription)
+                else:
+                    callbacks.append(cb)
+        return callbacks
@@ -0,0 +1,71 @@
+"""The users of a console, as a compact directory keyed by id."""
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Mapping, Optional
+
+# Seconds loaded users are fresh for, after which a refresh that needs them loads them again
+USERS_TTL = 3600.0
+
+
+@dataclass(frozen=True, slots=True)
+class PyUIProtectUser:
+    """A user of the console, with only what the integration shows or sends."""
+
+    id: str
+    name: str
+
+    @classmethod
+    def from_details(cls, details: dict) -> Optional["PyUIProtectUser"]:
+        """Return the user listed by the users endpoint, or None if it has no id."""
+        user_id = details.get("id")
+        if not user_id:
+            return None
+        full_name = " ".join(part for part in (details.get("firstName"), details.get("lastName")) if part)
+        return cls(user_id, details.get("name") or full_name or details.get("localUsername") or user_id)
+
+    def as_dict(self) -> dict[str, str]:
+        """Return the user as a JSON serialisable dict."""
+        return {"id": self.id, "name": self.name}
+
+
+class PyUIProtectUserDirectory(Mapping[str, PyUIProtectUser]):
+    """The users of a console by id.
+
+    Like the published maps and records, a directory is never changed once
+    built; a reload builds a new one, published only if a user was added,
+    removed or renamed.
+    """
+
+    __slots__ = ("_users",)
+
+    def __init__(self, users: Iterable[PyUIProtectUser] = ()) -> None:
+        self._users: dict[str, PyUIProtectUser] = {user.id: user for user in users}
+
+    @classmethod
+    def from_response(cls, response: Iterable[dict]) -> "PyUIProtectUserDirectory":
+        """Return the directory of the users listed by the users endpoint, or stored in a snapshot."""
+        return cls(user for user in map(PyUIProtectUser.from_details, response) if user is not None)
+
+    def __getitem__(self, user_id: str) -> PyUIProtectUser:
+        return self._users[user_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._users)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def name_of(self, user_id: str) -> str:
+        """Return the name of a user, or the id of one that isn't in the directory."""
+        user = self._users.get(user_id)
+        return user.name if user is not None else user_id
+
+    def changed_ids(self, other: "PyUIProtectUserDirectory") -> set[str]:
+        """Return the ids of the users added, removed or renamed between other and this directory."""
+        return {
+            user_id for user_id in self._users.keys() | other.keys()
+            if self._users.get(user_id) != other.get(user_id)
+        }
+
+
+EMPTY_USERS = PyUIProtectUserDirectory()
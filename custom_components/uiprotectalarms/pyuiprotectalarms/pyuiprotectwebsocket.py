@@ -0,0 +1,171 @@
+"""Uiprotectalarms subscription to the UniFi Protect updates websocket."""
+
+import asyncio
+from contextlib import AbstractContextManager, nullcontext
+import logging
+import random
+import zlib
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+import aiohttp
+
+from .constants import LOGGER_NAME, UIProtectModelKey
+from .exceptions import UnifiProtectError
+from .websocketdecoder import WsDecoder, WsDecodeError
+
+_LOGGER = logging.getLogger(LOGGER_NAME)
+
+if TYPE_CHECKING:
+    from pyuiprotectalarms import PyUIProtectAlarms
+
+WS_HEARTBEAT_SECONDS = 30
+WS_BACKOFF_MIN_SECONDS = 1
+WS_BACKOFF_MAX_SECONDS = 60
+WS_BACKOFF_JITTER = 0.25
+
+
+class PyUIProtectWebsocket:
+    """Push automation and notification changes from the Protect updates websocket.
+
+    Blocking library calls (authentication, resynchronisation and applying
+    updates) are run through ``executor``, which defaults to the event loop's
+    default executor. A resync, and the messages received while the previous
+    ones were applied, run inside ``batch()``, e.g. to write the states they
+    change once.
+    """
+
+    def __init__(
+        self,
+        uiProtectAlarms: "PyUIProtectAlarms",
+        session: aiohttp.ClientSession,
+        executor: Optional[Callable[..., Awaitable[Any]]] = None,
+        url: Optional[str] = None,
+        batch: Callable[[], AbstractContextManager] = nullcontext,
+    ) -> None:
+        self._uiProtectAlarms = uiProtectAlarms
+        self._session = session
+        self._executor = executor or self._run_in_default_executor
+        self._url = url or uiProtectAlarms.ws_url
+        self._batch = batch
+        # Frames received and not applied yet, and the task applying them, if any
+        self._frames: list[tuple[dict, Any]] = []
+        self._apply_task: Optional[asyncio.Task] = None
+
+        self._decoder = WsDecoder(model_keys=list(UIProtectModelKey))
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._stopping = False
+        self._needs_resync = False
+        self._backoff = WS_BACKOFF_MIN_SECONDS
+
+    @property
+    def is_connected(self) -> bool:
+        """Return True while the websocket is open."""
+        return self._ws is not None and not self._ws.closed
+
+    async def async_run(self) -> None:
+        """Listen for updates until stopped, reconnecting with backoff."""
+        while not self._stopping:
+            try:
+                await self._async_listen()
+            # OSError covers the blocking requests calls made to authenticate, e.g. a refused connection
+            except (aiohttp.ClientError, asyncio.TimeoutError, UnifiProtectError, OSError) as ex:
+                _LOGGER.debug("PyUIProtectWebsocket: connection failed: %s", ex)
+
+            if self._stopping:
+                break
+
+            # Whatever was sent while we were away is lost, so do a full
+            # reload once we are connected again.
+            self._needs_resync = True
+            # Jitter keeps consoles that dropped together from resyncing together
+            delay = self._backoff * (1 + random.uniform(0, WS_BACKOFF_JITTER))
+            _LOGGER.debug("PyUIProtectWebsocket: reconnecting in %.1f seconds", delay)
+            await asyncio.sleep(delay)
+            self._backoff = min(self._backoff * 2, WS_BACKOFF_MAX_SECONDS)
+
+    def request_resync(self) -> None:
+        """Do a full reload the next time the websocket connects."""
+        self._needs_resync = True
+
+    async def async_stop(self) -> None:
+        """Stop listening and close the websocket."""
+        self._stopping = True
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def _async_listen(self) -> None:
+        headers = await self._executor(self._uiProtectAlarms.get_auth_headers)
+
+        async with self._session.ws_connect(
+            self._url, headers=headers, ssl=False, heartbeat=WS_HEARTBEAT_SECONDS
+        ) as ws:
+            self._ws = ws
+            _LOGGER.info("Connected to UIProtect updates websocket")
+
+            if self._needs_resync:
+                await self._async_resync()
+            self._backoff = WS_BACKOFF_MIN_SECONDS
+
+            try:
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.BINARY:
+                        self._handle_message(msg.data)
+                    elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSE):
+                        break
+            finally:
+                # Apply what was received before a resync can load anything newer
+                if self._apply_task is not None:
+                    await asyncio.wait([self._apply_task])
+
+        self._ws = None
+        _LOGGER.info("Disconnected from UIProtect updates websocket")
+
+    async def _async_resync(self) -> None:
+        _LOGGER.debug("PyUIProtectWebsocket: resynchronising after a gap")
+        with self._batch():
+            await self._executor(self._uiProtectAlarms.load_automations)
+            if self._uiProtectAlarms.notifications:
+                await self._executor(self._uiProtectAlarms.load_notifications)
+        self._needs_resync = False
+
+    def _handle_message(self, data: bytes) -> None:
+        try:
+            message = self._decoder.decode(data)
+            if message is None:
+                return
+            action_frame = message.action
+            data_frame = message.data
+        except (WsDecodeError, zlib.error, ValueError) as ex:
+            _LOGGER.debug("PyUIProtectWebsocket: unable to decode message: %s", ex)
+            return
+
+        if not isinstance(action_frame, dict):
+            return
+
+        self._frames.append((action_frame, data_frame))
+        # Messages already received are read without yielding, so a burst is
+        # queued before the task started by its first message runs
+        if self._apply_task is None:
+            self._apply_task = asyncio.get_running_loop().create_task(self._async_apply_frames())
+
+    async def _async_apply_frames(self) -> None:
+        # Applied in the executor, as publishing waits for the refreshes running there
+        try:
+            while self._frames:
+                frames, self._frames = self._frames, []
+                with self._batch():
+                    await self._executor(self._apply_frames, frames)
+        finally:
+            self._apply_task = None
+
+    def _apply_frames(self, frames: list[tuple[dict, Any]]) -> None:
+        for action_frame, data_frame in frames:
+            # One bad update mustn't stop the ones after it, or the websocket
+            try:
+                self._uiProtectAlarms.process_websocket_update(action_frame, data_frame)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("PyUIProtectWebsocket: unable to apply update %s", action_frame)
+
+    @staticmethod
+    async def _run_in_default_executor(func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
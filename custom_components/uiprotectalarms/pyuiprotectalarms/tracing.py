@@ -0,0 +1,124 @@
+"""Spans for per-request phase timing, exported as Chrome trace-event JSON.
+
+Nothing is recorded unless a capture is running, and with no capture a span
+is a shared no-op context manager. Captured traces load in chrome://tracing
+or https://ui.perfetto.dev for flame views.
+"""
+
+from contextlib import nullcontext
+import json
+import os
+import threading
+import time
+from typing import Any
+
+_NULL_SPAN = nullcontext()
+
+# Phases of an HTTP request, in the order they happen
+REQUEST_PHASES = ("connect", "tls", "server", "download", "decode")
+
+
+class TraceCapture:
+    """Spans recorded between start_capture() and stop_capture()."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.spans: list[tuple[str, str, float, float, int, dict[str, Any]]] = []
+
+    def add(self, name: str, category: str, start: float, end: float, thread_id: int, args: dict[str, Any]) -> None:
+        """Record a span. start and end are time.perf_counter() values."""
+        with self._lock:
+            self.spans.append((name, category, start, end, thread_id, args))
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Return the spans as a Chrome trace-event document."""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        events = [
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round(start * 1_000_000, 3),
+                "dur": round((end - start) * 1_000_000, 3),
+                "pid": pid,
+                "tid": thread_id,
+                "args": args,
+            }
+            for name, category, start, end, thread_id, args in spans
+        ]
+        events.extend(
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_names[thread_id]}}
+            for thread_id in {span[4] for span in spans} if thread_id in thread_names
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        """Write the spans to path as Chrome trace-event JSON."""
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_category", "_args", "_start")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._tracer.add_span(self._name, self._start, time.perf_counter(), self._category, **self._args)
+
+
+class Tracer:
+    """Hand spans to every running capture."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._captures: tuple[TraceCapture, ...] = ()
+
+    @property
+    def enabled(self) -> bool:
+        """Return True while a capture is running."""
+        return bool(self._captures)
+
+    def start_capture(self) -> TraceCapture:
+        """Start recording spans."""
+        capture = TraceCapture()
+        with self._lock:
+            self._captures = (*self._captures, capture)
+        return capture
+
+    def stop_capture(self, capture: TraceCapture) -> TraceCapture:
+        """Stop recording spans into capture, and return it."""
+        with self._lock:
+            self._captures = tuple(running for running in self._captures if running is not capture)
+        return capture
+
+    def span(self, name: str, category: str = "uiprotectalarms", **args: Any):
+        """Return a context manager that records the time spent in its block."""
+        if not self._captures:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def add_span(self, name: str, start: float, end: float, category: str = "uiprotectalarms", **args: Any) -> None:
+        """Record a span with known start and end times (time.perf_counter() values)."""
+        captures = self._captures
+        if not captures:
+            return
+        thread_id = threading.get_ident()
+        for capture in captures:
+            capture.add(name, category, start, end, thread_id, args)
+
+
+TRACER = Tracer()
@@ -0,0 +1,108 @@
+"""HTTP transport of the shared session: pooled keep-alive connections that record their setup times.
+
+Only imported when the first session is created, so importing the library
+doesn't load requests and urllib3.
+"""
+
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional
+
+import requests
+import urllib3
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Connection pools kept by the shared session, one per console host
+HTTP_POOL_CONNECTIONS = 32
+# Keep-alive connections kept per console host
+HTTP_POOL_MAXSIZE = 4
+
+# Connection setup times of the request running on this thread
+_connection_phases = threading.local()
+
+
+def reset_connection_phases() -> None:
+    """Forget the connection setup times recorded on this thread."""
+    _connection_phases.connect = 0.0
+    _connection_phases.tls = 0.0
+
+
+def get_connection_phases() -> tuple[float, float]:
+    """Return the (TCP connect, TLS handshake) seconds spent on this thread since the last reset.
+
+    Both are 0 when the request reused a keep-alive connection.
+    """
+    return getattr(_connection_phases, "connect", 0.0), getattr(_connection_phases, "tls", 0.0)
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """HTTPConnection that records how long the TCP connect took."""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _connection_phases.connect = getattr(_connection_phases, "connect", 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """HTTPSConnection that records how long the TCP connect and the TLS handshake took."""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _connection_phases.connect = getattr(_connection_phases, "connect", 0.0) + time.perf_counter() - start
+
+    def connect(self):
+        connect_before = getattr(_connection_phases, "connect", 0.0)
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            elapsed = time.perf_counter() - start
+            tcp = getattr(_connection_phases, "connect", 0.0) - connect_before
+            _connection_phases.tls = getattr(_connection_phases, "tls", 0.0) + max(elapsed - tcp, 0.0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    """Connection pool creating TimedHTTPConnections."""
+
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    """Connection pool creating TimedHTTPSConnections."""
+
+    ConnectionCls = TimedHTTPSConnection
+
+
+TIMED_POOL_CLASSES_BY_SCHEME = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+def use_timed_connections(pool_manager: Optional[urllib3.PoolManager]) -> None:
+    """Make a urllib3 pool manager open connections that record their setup times."""
+    if pool_manager is not None:
+        pool_manager.pool_classes_by_scheme = TIMED_POOL_CLASSES_BY_SCHEME
+
+
+class TimedHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter whose connections record their TCP connect and TLS handshake times."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        use_timed_connections(self.poolmanager)
+
+
+def new_session() -> requests.Session:
+    """Return a session that never stores cookies, with timed keep-alive connection pools."""
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = TimedHTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,177 @@
+"""Decoder for the binary update frames sent on the Protect updates websocket.
+
+Every message is an action packet followed by a data packet. Each packet
+starts with an 8 byte header: packet type (1 = action, 2 = data), payload
+format (1 = JSON, 2 = UTF-8 string, 3 = raw buffer), a deflated flag, one
+unused byte and the payload size as a big endian uint32.
+
+Packets are kept as offsets into the received buffer and read through
+memoryviews, so nothing is copied until a payload is actually decoded. The action packet is only scanned for its
+``modelKey`` before anything is parsed, which lets camera and event traffic we
+do not care about be dropped without touching its JSON at all. The data packet
+is decompressed and parsed the first time it is read.
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, Iterable, Optional, Union
+
+WS_HEADER_SIZE = 8
+WS_HEADER_STRUCT = struct.Struct(">BBBxI")
+
+WS_PACKET_TYPE_ACTION = 1
+WS_PACKET_TYPE_DATA = 2
+
+WS_PAYLOAD_FORMAT_JSON = 1
+WS_PAYLOAD_FORMAT_UTF8 = 2
+WS_PAYLOAD_FORMAT_BUFFER = 3
+
+_MODEL_KEY_TOKEN = b'"modelKey"'
+_JSON_WHITESPACE = b" \t\r\n"
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class WsDecodeError(ValueError):
+    """Raised when a websocket message is malformed."""
+
+
+class WsPacket:
+    """One packet of a websocket message, decoded on first access."""
+
+    __slots__ = ("packet_type", "payload_format", "deflated", "_buffer", "_start", "_end", "_value", "_decoded")
+
+    def __init__(
+        self, packet_type: int, payload_format: int, deflated: bool, buffer: BytesLike, start: int, end: int
+    ) -> None:
+        self.packet_type = packet_type
+        self.payload_format = payload_format
+        self.deflated = deflated
+        self._buffer = buffer
+        self._start = start
+        self._end = end
+        self._value: Any = None
+        self._decoded = False
+
+    @property
+    def payload(self) -> BytesLike:
+        """Return the payload bytes, inflating them if needed."""
+        view = memoryview(self._buffer)[self._start:self._end]
+        if self.deflated:
+            return zlib.decompress(view)
+        return view
+
+    @property
+    def value(self) -> Any:
+        """Return the decoded payload: parsed JSON, a string or raw bytes."""
+        if not self._decoded:
+            self._value = self._decode()
+            self._decoded = True
+        return self._value
+
+    def scan_model_key(self) -> Optional[str]:
+        """Return the modelKey of a JSON payload without parsing it."""
+        if self.deflated:
+            payload = zlib.decompress(memoryview(self._buffer)[self._start:self._end])
+            model_key = scan_model_key(payload, 0, len(payload))
+        else:
+            model_key = scan_model_key(self._buffer, self._start, self._end)
+        return model_key.decode("utf-8") if model_key is not None else None
+
+    def _decode(self) -> Any:
+        payload = self.payload
+        if self.payload_format == WS_PAYLOAD_FORMAT_JSON:
+            return json.loads(str(payload, "utf-8"))
+        if self.payload_format == WS_PAYLOAD_FORMAT_UTF8:
+            return str(payload, "utf-8")
+        return bytes(payload)
+
+
+class WsMessage:
+    """An action packet and its data packet."""
+
+    __slots__ = ("model_key", "action_packet", "data_packet")
+
+    def __init__(self, model_key: Optional[str], action_packet: WsPacket, data_packet: WsPacket) -> None:
+        self.model_key = model_key
+        self.action_packet = action_packet
+        self.data_packet = data_packet
+
+    @property
+    def action(self) -> dict:
+        """Return the action frame."""
+        return self.action_packet.value
+
+    @property
+    def data(self) -> Any:
+        """Return the data frame."""
+        return self.data_packet.value
+
+
+class WsDecoder:
+    """Decode websocket messages, dropping model keys we are not interested in.
+
+    If ``model_keys`` is None every message is returned.
+    """
+
+    def __init__(self, model_keys: Optional[Iterable[str]] = None) -> None:
+        self._model_keys = frozenset(model_keys) if model_keys is not None else None
+        self.messages_decoded = 0
+        self.messages_dropped = 0
+
+    def decode(self, data: BytesLike) -> Optional[WsMessage]:
+        """Split a message into its packets, returning None if its model key is filtered out."""
+        buffer = data
+        if isinstance(data, memoryview):
+            # bytes.find needs the underlying object, so only unwrap whole buffers
+            buffer = data.obj if data.nbytes == len(data.obj) and isinstance(data.obj, bytes) else data.tobytes()
+
+        action_packet, offset = read_packet(buffer, 0)
+        model_key = None
+        if self._model_keys is not None:
+            model_key = action_packet.scan_model_key()
+            if model_key not in self._model_keys:
+                self.messages_dropped += 1
+                return None
+
+        data_packet, _ = read_packet(buffer, offset)
+        self.messages_decoded += 1
+        return WsMessage(model_key, action_packet, data_packet)
+
+
+def read_packet(buffer: BytesLike, offset: int) -> tuple[WsPacket, int]:
+    """Read the packet starting at ``offset`` and return it with the next offset."""
+    if len(buffer) - offset < WS_HEADER_SIZE:
+        raise WsDecodeError("Truncated packet header")
+
+    packet_type, payload_format, deflated, payload_size = WS_HEADER_STRUCT.unpack_from(buffer, offset)
+    start = offset + WS_HEADER_SIZE
+    end = start + payload_size
+    if end > len(buffer):
+        raise WsDecodeError("Truncated packet payload")
+
+    return WsPacket(packet_type, payload_format, bool(deflated), buffer, start, end), end
+
+
+def scan_model_key(payload: BytesLike, start: int, end: int) -> Optional[bytes]:
+    """Return the raw value of the "modelKey" string in payload[start:end], or None."""
+    index = payload.find(_MODEL_KEY_TOKEN, start, end)
+    if index < 0:
+        return None
+
+    index += len(_MODEL_KEY_TOKEN)
+    while index < end and payload[index] in _JSON_WHITESPACE:
+        index += 1
+    if index >= end or payload[index] != 0x3A:  # ":"
+        return None
+    index += 1
+    while index < end and payload[index] in _JSON_WHITESPACE:
+        index += 1
+    if index >= end or payload[index] != 0x22:  # '"'
+        return None
+
+    value_end = payload.find(b'"', index + 1, end)
+    if value_end < 0:
+        return None
+    return payload[index + 1:value_end]
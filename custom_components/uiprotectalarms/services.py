@@ -0,0 +1,419 @@
+"""Services for the Uiprotectalarms HomeAssistant Integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, entity_platform
+
+from .executor import UIProtectAlarmsExecutor
+from .pyuiprotectalarms import PyUIProtectAlarms
+from .pyuiprotectalarms.pyuiprotectautomation import PyUIProtectAutomation
+from .pyuiprotectalarms.pyuiprotectchanges import PyUIProtectChanges
+from .pyuiprotectalarms.tracing import TRACER
+from .const import (
+    LOGGER,
+    DOMAIN,
+    PYUIPROTECTALARMS_MANAGER,
+    UIPROTECTALARMS_DISPATCHER,
+    UIPROTECTALARMS_EXECUTOR,
+    SERVICE_REFRESH_ALARMS,
+    SERVICE_CAPTURE_TRACES,
+    SERVICE_PROFILE,
+    SERVICE_RECORD_CASSETTE,
+    SERVICE_SET_NOTIFICATION_CHANNEL,
+    ATTR_SCOPE,
+    ATTR_AUTOMATION_IDS,
+    ATTR_FORCE,
+    ATTR_DURATION,
+    ATTR_SORT,
+    ATTR_TOP,
+    ATTR_REFRESH,
+    ATTR_CHANNEL,
+    ATTR_ENABLED,
+    ATTR_USER_IDS,
+    NOTIFICATION_CHANNELS,
+    REFRESH_SCOPE_AUTOMATIONS,
+    REFRESH_SCOPE_USERS,
+    REFRESH_SCOPE_NOTIFICATIONS,
+    REFRESH_SCOPES,
+    PROFILE_SORT_KEYS,
+)
+
+_LOGGER = logging.getLogger(LOGGER)
+
+REFRESH_ALARMS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SCOPE): vol.All(cv.ensure_list, [vol.In(REFRESH_SCOPES)]),
+        vol.Optional(ATTR_AUTOMATION_IDS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_FORCE, default=False): cv.boolean,
+    }
+)
+
+CAPTURE_TRACES_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=10): vol.All(vol.Coerce(float), vol.Range(min=1, max=300)),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SCOPE): vol.All(cv.ensure_list, [vol.In(REFRESH_SCOPES)]),
+        vol.Optional(ATTR_FORCE, default=True): cv.boolean,
+        vol.Optional(ATTR_SORT, default=PROFILE_SORT_KEYS[0]): vol.In(PROFILE_SORT_KEYS),
+        vol.Optional(ATTR_TOP, default=40): vol.All(vol.Coerce(int), vol.Range(min=5, max=500)),
+    }
+)
+
+RECORD_CASSETTE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=10): vol.All(vol.Coerce(float), vol.Range(min=1, max=300)),
+        vol.Optional(ATTR_REFRESH, default=True): cv.boolean,
+    }
+)
+
+SET_NOTIFICATION_CHANNEL_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CHANNEL): vol.In(NOTIFICATION_CHANNELS),
+        vol.Required(ATTR_ENABLED): cv.boolean,
+        vol.Optional(ATTR_USER_IDS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_AUTOMATION_IDS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+# Set in hass.data[DOMAIN] while the profile service runs
+PROFILE_RUNNING = "profile_running"
+# Set in hass.data[DOMAIN] while the record_cassette service runs
+CASSETTE_RECORDING = "cassette_recording"
+
+
+@callback
+def async_get_loaded_entry_data(hass: HomeAssistant) -> dict[str, dict]:
+    """Return the data of every config entry that is set up, keyed by entry id."""
+    domain_data = hass.data.get(DOMAIN, {})
+    return {
+        entry.entry_id: domain_data[entry.entry_id]
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.entry_id in domain_data
+    }
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services, once for all consoles."""
+    if hass.services.has_service(DOMAIN, SERVICE_REFRESH_ALARMS):
+        return
+
+    async def async_refresh_alarms(service: ServiceCall) -> ServiceResponse:
+        return await async_handle_refresh_alarms(hass, service.data)
+
+    async def async_capture_traces(service: ServiceCall) -> ServiceResponse:
+        return await async_handle_capture_traces(hass, service.data)
+
+    async def async_profile(service: ServiceCall) -> ServiceResponse:
+        return await async_handle_profile(hass, service.data)
+
+    async def async_record_cassette(service: ServiceCall) -> ServiceResponse:
+        return await async_handle_record_cassette(hass, service.data)
+
+    async def async_set_notification_channel(service: ServiceCall) -> ServiceResponse:
+        return await async_handle_set_notification_channel(hass, service.data)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REFRESH_ALARMS,
+        async_refresh_alarms,
+        schema=REFRESH_ALARMS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CAPTURE_TRACES,
+        async_capture_traces,
+        schema=CAPTURE_TRACES_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RECORD_CASSETTE,
+        async_record_cassette,
+        schema=RECORD_CASSETTE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_NOTIFICATION_CHANNEL,
+        async_set_notification_channel,
+        schema=SET_NOTIFICATION_CHANNEL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+@callback
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the services once the last console is unloaded."""
+    hass.services.async_remove(DOMAIN, SERVICE_REFRESH_ALARMS)
+    hass.services.async_remove(DOMAIN, SERVICE_CAPTURE_TRACES)
+    hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
+    hass.services.async_remove(DOMAIN, SERVICE_RECORD_CASSETTE)
+    hass.services.async_remove(DOMAIN, SERVICE_SET_NOTIFICATION_CHANNEL)
+
+
+class RefreshTargets:
+    """What a refresh call asks for on one console."""
+
+    def __init__(self) -> None:
+        self.automation_ids: set[str] = set()
+        self.notifications = False
+
+
+@callback
+def async_resolve_entity_targets(hass: HomeAssistant, entity_ids: list[str]) -> dict[str, RefreshTargets]:
+    """Map entity ids to the automations (and notifications) behind them, by config entry id."""
+    targets: dict[str, RefreshTargets] = {}
+    if not entity_ids:
+        return targets
+
+    for platform in entity_platform.async_get_platforms(hass, DOMAIN):
+        if platform.config_entry is None:
+            continue
+        for entity_id in entity_ids:
+            entity = platform.entities.get(entity_id)
+            if entity is None:
+                continue
+
+            entry_targets = targets.setdefault(platform.config_entry.entry_id, RefreshTargets())
+            base_obj = entity.pyuiprotect_base_obj
+            if isinstance(base_obj, PyUIProtectAutomation):
+                entry_targets.automation_ids.add(base_obj.id)
+            elif base_obj.automation_id is not None:
+                # Notifications extracted from an automation are refreshed with it
+                entry_targets.automation_ids.add(base_obj.automation_id)
+            else:
+                entry_targets.notifications = True
+
+    return targets
+
+
+async def async_handle_refresh_alarms(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+    """Refresh what the service call asked for on every console, and summarise the changes.
+
+    With no scope and no targets, everything is reloaded. With automation ids
+    or entity targets, only those automations are fetched, one GET per id, in
+    parallel. Unchanged objects are skipped unless force is set.
+    """
+    executor: UIProtectAlarmsExecutor = hass.data[DOMAIN][UIPROTECTALARMS_EXECUTOR]
+    force = data.get(ATTR_FORCE, False)
+    automation_ids = set(data.get(ATTR_AUTOMATION_IDS, []))
+    entity_targets = async_resolve_entity_targets(hass, data.get(ATTR_ENTITY_ID, []))
+    targeted = bool(automation_ids or data.get(ATTR_ENTITY_ID))
+    scope = set(data.get(ATTR_SCOPE, () if targeted else REFRESH_SCOPES))
+
+    entries = async_get_loaded_entry_data(hass)
+    tracked_ids = {
+        automation_id
+        for entry_data in entries.values()
+        for automation_id in entry_data[PYUIPROTECTALARMS_MANAGER].automations
+    }
+
+    def make_refresh(entry_id: str, entry_data: dict):
+        pyuiprotectalarms_manager: PyUIProtectAlarms = entry_data[PYUIPROTECTALARMS_MANAGER]
+        targets = entity_targets.get(entry_id, RefreshTargets())
+        # Ids no console knows yet may be new, so every console is asked for them
+        refresh_ids = {
+            automation_id for automation_id in automation_ids
+            if automation_id in pyuiprotectalarms_manager.automations or automation_id not in tracked_ids
+        } | targets.automation_ids
+
+        async def async_refresh() -> dict[str, Any]:
+            _LOGGER.debug("Refreshing %s on %s", sorted(scope) or sorted(refresh_ids), pyuiprotectalarms_manager.host)
+            summary = PyUIProtectChanges()
+            result: dict[str, Any] = {}
+
+            # Write the state of everything the refresh touched in one go
+            with entry_data[UIPROTECTALARMS_DISPATCHER].batch():
+                if REFRESH_SCOPE_AUTOMATIONS in scope:
+                    await executor.async_run(pyuiprotectalarms_manager.load_automations, force, summary)
+                elif refresh_ids:
+                    refreshed = await asyncio.gather(
+                        *(
+                            executor.async_run(pyuiprotectalarms_manager.refresh_automation, automation_id, force, summary)
+                            for automation_id in refresh_ids
+                        ),
+                        return_exceptions=True,
+                    )
+                    failed = [automation_id for automation_id, ok in zip(refresh_ids, refreshed) if ok is not True]
+                    if failed:
+                        result["failed_automations"] = failed
+
+                if REFRESH_SCOPE_USERS in scope:
+                    if await executor.async_run(pyuiprotectalarms_manager.load_users):
+                        result["users"] = len(pyuiprotectalarms_manager.users)
+
+                if REFRESH_SCOPE_NOTIFICATIONS in scope or targets.notifications:
+                    await executor.async_run(pyuiprotectalarms_manager.load_notifications, force, summary)
+
+            return {**summary.summary(), **result}
+
+        return async_refresh
+
+    # Stagger the consoles so they don't all queue up on the executor at once
+    hosts = [entry_data[PYUIPROTECTALARMS_MANAGER].host for entry_data in entries.values()]
+    results = await executor.async_run_staggered(
+        [make_refresh(entry_id, entry_data) for entry_id, entry_data in entries.items()]
+    )
+
+    consoles = {}
+    for host, result in zip(hosts, results):
+        if isinstance(result, Exception):
+            _LOGGER.warning("Unable to refresh UIProtect console %s: %s", host, result)
+            result = {"error": str(result)}
+        consoles[host] = result
+    return {"consoles": consoles}
+
+
+async def async_handle_set_notification_channel(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+    """Turn a notification channel on or off for users across the automations of every console.
+
+    Each console only sends an update for the automations the change touches.
+    """
+    executor: UIProtectAlarmsExecutor = hass.data[DOMAIN][UIPROTECTALARMS_EXECUTOR]
+    channel = data[ATTR_CHANNEL]
+    enabled = data[ATTR_ENABLED]
+    user_ids = data.get(ATTR_USER_IDS)
+    automation_ids = data.get(ATTR_AUTOMATION_IDS)
+
+    entries = async_get_loaded_entry_data(hass)
+
+    def make_update(entry_data: dict):
+        pyuiprotectalarms_manager: PyUIProtectAlarms = entry_data[PYUIPROTECTALARMS_MANAGER]
+
+        async def async_update() -> dict[str, Any]:
+            with entry_data[UIPROTECTALARMS_DISPATCHER].batch():
+                updated = await executor.async_run(
+                    pyuiprotectalarms_manager.set_notification_channel, channel, enabled, user_ids, automation_ids
+                )
+            return {"updated": updated}
+
+        return async_update
+
+    hosts = [entry_data[PYUIPROTECTALARMS_MANAGER].host for entry_data in entries.values()]
+    results = await executor.async_run_staggered([make_update(entry_data) for entry_data in entries.values()])
+
+    consoles = {}
+    for host, result in zip(hosts, results):
+        if isinstance(result, Exception):
+            _LOGGER.warning("Unable to set %s notifications on UIProtect console %s: %s", channel, host, result)
+            result = {"error": str(result)}
+        consoles[host] = result
+    return {"consoles": consoles}
+
+
+async def async_handle_capture_traces(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+    """Record spans for a while and write them to the config dir as Chrome trace-event JSON."""
+    capture = TRACER.start_capture()
+    try:
+        await asyncio.sleep(data.get(ATTR_DURATION, 10))
+    finally:
+        TRACER.stop_capture(capture)
+
+    path = hass.config.path(f"uiprotectalarms_trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    await hass.async_add_executor_job(capture.write_chrome_trace, path)
+    _LOGGER.info("Wrote %d spans to %s", len(capture.spans), path)
+    return {"path": path, "spans": len(capture.spans)}
+
+
+async def async_handle_profile(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+    """Refresh every console under cProfile and tracemalloc, and write the reports to the config dir.
+
+    The consoles are refreshed one after the other, so the reports are not
+    skewed by refreshes waiting on each other for executor slots.
+    """
+    domain_data = hass.data[DOMAIN]
+    if domain_data.get(PROFILE_RUNNING):
+        raise HomeAssistantError("A UIProtect alarms profile is already running")
+
+    scope = set(data.get(ATTR_SCOPE, REFRESH_SCOPES))
+    force = data.get(ATTR_FORCE, True)
+    # cProfile and tracemalloc are only loaded once a profile is asked for
+    from .profiling import UIProtectAlarmsProfiler, run_refresh  # pylint: disable=C0415
+
+    profiler = UIProtectAlarmsProfiler(domain_data[UIPROTECTALARMS_EXECUTOR])
+
+    domain_data[PROFILE_RUNNING] = True
+    try:
+        # Starting tracemalloc walks every live object, so keep it off the event loop
+        await hass.async_add_executor_job(profiler.start)
+        try:
+            for entry_data in async_get_loaded_entry_data(hass).values():
+                pyuiprotectalarms_manager: PyUIProtectAlarms = entry_data[PYUIPROTECTALARMS_MANAGER]
+                _LOGGER.debug("Profiling a refresh of %s on %s", sorted(scope), pyuiprotectalarms_manager.host)
+                with entry_data[UIPROTECTALARMS_DISPATCHER].batch():
+                    await profiler.async_run(run_refresh, pyuiprotectalarms_manager, scope, force)
+                await profiler.async_settle()
+        finally:
+            await hass.async_add_executor_job(profiler.stop)
+    finally:
+        domain_data.pop(PROFILE_RUNNING, None)
+
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    cpu_path = hass.config.path(f"uiprotectalarms_profile_{timestamp}.txt")
+    memory_path = hass.config.path(f"uiprotectalarms_memory_{timestamp}.txt")
+
+    def write_reports() -> None:
+        with open(cpu_path, "w", encoding="utf-8") as report:
+            report.write(profiler.cpu_report(data.get(ATTR_SORT, "cumulative"), data.get(ATTR_TOP, 40)))
+        with open(memory_path, "w", encoding="utf-8") as report:
+            report.write(profiler.memory_report(data.get(ATTR_TOP, 40)))
+
+    await hass.async_add_executor_job(write_reports)
+    _LOGGER.info("Wrote the profile to %s and the allocations to %s", cpu_path, memory_path)
+    return {
+        "profile": cpu_path,
+        "allocations": memory_path,
+        "seconds": round(profiler.elapsed, 3),
+        "peak_memory_bytes": profiler.peak_memory,
+    }
+
+
+async def async_handle_record_cassette(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+    """Record every exchange with the consoles for a while, redacted, and write them to the config dir as a cassette.
+
+    With refresh set, everything is reloaded first, so the cassette holds a
+    full load of every console that can be replayed offline.
+    """
+    domain_data = hass.data[DOMAIN]
+    if domain_data.get(CASSETTE_RECORDING):
+        raise HomeAssistantError("A UIProtect alarms cassette is already being recorded")
+
+    path = hass.config.path(f"uiprotectalarms_cassette_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    domain_data[CASSETTE_RECORDING] = True
+    try:
+        from .pyuiprotectalarms.cassette import recording  # pylint: disable=C0415
+
+        # Every console shares one session, so one recorder sees them all
+        with recording() as recorder:
+            if data.get(ATTR_REFRESH, True):
+                await async_handle_refresh_alarms(hass, {ATTR_FORCE: True})
+            await asyncio.sleep(data.get(ATTR_DURATION, 10))
+    finally:
+        domain_data.pop(CASSETTE_RECORDING, None)
+
+    interactions = await hass.async_add_executor_job(recorder.save, path)
+    _LOGGER.info("Recorded %d exchanges to %s", interactions, path)
+    return {"path": path, "interactions": interactions}
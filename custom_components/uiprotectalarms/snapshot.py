@@ -0,0 +1,53 @@
+"""Persisted snapshot of the last known UIProtect state, used to warm start."""
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .pyuiprotectalarms import PyUIProtectAlarms
+from .const import DOMAIN, LOGGER
+
+_LOGGER = logging.getLogger(LOGGER)
+
+SNAPSHOT_STORAGE_VERSION = 1
+SNAPSHOT_SAVE_DELAY_SECONDS = 30
+
+
+class UIProtectAlarmsSnapshotStore:
+    """Save the manager's state to HA storage and restore it on boot."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, pyuiprotectalarms_manager: PyUIProtectAlarms) -> None:
+        self._hass = hass
+        self._manager = pyuiprotectalarms_manager
+        self._store = _get_store(hass, entry_id)
+
+    async def async_restore(self) -> bool:
+        """Load the last snapshot into the manager. Returns True if there was one."""
+        snapshot = await self._store.async_load()
+        if snapshot is None:
+            return False
+
+        return self._manager.restore_snapshot(snapshot)
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save a fresh snapshot after a short delay, coalescing repeated requests."""
+        self._store.async_delay_save(self._manager.export_snapshot, SNAPSHOT_SAVE_DELAY_SECONDS)
+
+    def schedule_save(self) -> None:
+        """Thread safe version of async_schedule_save."""
+        self._hass.loop.call_soon_threadsafe(self.async_schedule_save)
+
+    async def async_save(self) -> None:
+        """Save a snapshot now."""
+        await self._store.async_save(self._manager.export_snapshot())
+
+
+def _get_store(hass: HomeAssistant, entry_id: str) -> Store:
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+
+async def async_remove_snapshot(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the stored snapshot of a config entry."""
+    await _get_store(hass, entry_id).async_remove()
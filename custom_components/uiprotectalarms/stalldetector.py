@@ -0,0 +1,224 @@
+"""Opt-in detection of executor and event loop stalls caused by the integration."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable
+
+from homeassistant.core import HomeAssistant, callback
+
+from .pyuiprotectalarms.metrics import MetricsRegistry
+
+from .const import LOGGER
+
+_LOGGER = logging.getLogger(LOGGER)
+
+# How often the watchdog thread sends a heartbeat to the event loop
+WATCHDOG_INTERVAL_SECONDS = 0.5
+# A heartbeat this late means the loop is stalled, and its stack is sampled
+LOOP_LAG_WARNING_SECONDS = 0.1
+# Jobs waiting this long for an executor thread are logged
+EXECUTOR_QUEUE_WARNING_SECONDS = 1.0
+# Jobs running this long have the stack of their thread sampled
+EXECUTOR_RUN_WARNING_SECONDS = 10.0
+
+WAIT_BUCKETS_SECONDS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RUN_BUCKETS_SECONDS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def sample_stack(thread_id: int) -> tuple[str, bool]:
+    """Return the current stack of a thread as text, and whether the integration's code is on it."""
+    frame = sys._current_frames().get(thread_id)  # pylint: disable=protected-access
+    if frame is None:
+        return "", False
+    stack = traceback.extract_stack(frame)
+    ours = any(entry.filename.startswith(_PACKAGE_DIR) for entry in stack)
+    return "".join(stack.format()), ours
+
+
+class UIProtectAlarmsStallDetector:
+    """Time the executor jobs the integration submits, and watch the event loop for stalls.
+
+    Every job records how long it waited for a slot of the integration's own
+    limiter, how long it then queued for an HA executor thread, and how long
+    it ran. A watchdog thread sends the event loop a heartbeat every half
+    second. When one is late, it samples the stack of the loop thread while
+    the loop is still blocked. It warns if the integration's code is on that
+    stack, as it then caused the stall, and only logs at debug level
+    otherwise. Jobs running too long get their thread's stack sampled the
+    same way.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        loop_lag_warning: float = LOOP_LAG_WARNING_SECONDS,
+        queue_warning: float = EXECUTOR_QUEUE_WARNING_SECONDS,
+        run_warning: float = EXECUTOR_RUN_WARNING_SECONDS,
+        interval: float = WATCHDOG_INTERVAL_SECONDS,
+    ) -> None:
+        self._hass = hass
+        self._loop_lag_warning = loop_lag_warning
+        self._queue_warning = queue_warning
+        self._run_warning = run_warning
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loop_thread_id = 0
+        self._lock = threading.Lock()
+        # Jobs running now, by thread id: (name, start, already reported)
+        self._running: dict[int, list[Any]] = {}
+
+        self.metrics = MetricsRegistry()
+        self._jobs = self.metrics.counter(
+            "uiprotectalarms_executor_jobs", "Blocking calls the integration ran in the executor"
+        ).labels()
+        waits = self.metrics.histogram(
+            "uiprotectalarms_executor_wait_seconds",
+            "Time executor jobs waited: for the integration's limiter, then for an executor thread",
+            ("queue",),
+            buckets=WAIT_BUCKETS_SECONDS,
+        )
+        self._limiter_wait = waits.labels("limiter")
+        self._queue_wait = waits.labels("executor")
+        self._run_time = self.metrics.histogram(
+            "uiprotectalarms_executor_run_seconds", "Time executor jobs ran for", buckets=RUN_BUCKETS_SECONDS
+        ).labels()
+        self._max_queue_wait = self.metrics.gauge(
+            "uiprotectalarms_executor_wait_seconds_max", "Longest wait for an executor thread"
+        ).labels()
+        slow_jobs = self.metrics.counter(
+            "uiprotectalarms_executor_slow_jobs", "Executor jobs that queued or ran past their threshold", ("phase",)
+        )
+        self._slow_queue = slow_jobs.labels("queue")
+        self._slow_run = slow_jobs.labels("run")
+        stalls = self.metrics.counter(
+            "uiprotectalarms_loop_stalls", "Event loop heartbeats that were late", ("cause",)
+        )
+        self._stalls_ours = stalls.labels("uiprotectalarms")
+        self._stalls_other = stalls.labels("other")
+        self._max_loop_lag = self.metrics.gauge(
+            "uiprotectalarms_loop_lag_seconds_max", "Longest event loop stall seen"
+        ).labels()
+
+    @property
+    def running(self) -> bool:
+        """Return True while the watchdog is running."""
+        return self._thread is not None
+
+    @callback
+    def async_start(self) -> None:
+        """Start the watchdog thread. Must be called from the event loop."""
+        if self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="uiprotectalarms_watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the watchdog thread."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(self._interval + self._loop_lag_warning)
+
+    def wrap(self, func: Callable[..., Any], submitted: float, acquired: float) -> Callable[..., Any]:
+        """Return func, timed, for a job submitted to the limiter at submitted and let through at acquired."""
+        name = getattr(func, "__qualname__", repr(func))
+
+        def timed(*args: Any) -> Any:
+            start = time.perf_counter()
+            thread_id = threading.get_ident()
+            self._record_wait(name, acquired - submitted, start - acquired)
+            with self._lock:
+                self._running[thread_id] = [name, start, False]
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running.pop(thread_id, None)
+                self._run_time.observe(time.perf_counter() - start)
+
+        return timed
+
+    def _record_wait(self, name: str, limiter_wait: float, queue_wait: float) -> None:
+        self._jobs.inc()
+        self._limiter_wait.observe(limiter_wait)
+        self._queue_wait.observe(queue_wait)
+        self._max_queue_wait.set_max(queue_wait)
+        if queue_wait > self._queue_warning:
+            self._slow_queue.inc()
+            _LOGGER.warning(
+                "%s waited %.2f s for an executor thread; the HomeAssistant executor is saturated",
+                name, queue_wait,
+            )
+
+    def _watch(self) -> None:
+        loop = self._hass.loop
+        while not self._stop.wait(self._interval):
+            self._check_running_jobs()
+
+            heartbeat = threading.Event()
+            sent = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(heartbeat.set)
+            except RuntimeError:
+                # The loop is closed
+                return
+            if heartbeat.wait(self._loop_lag_warning):
+                continue
+
+            # Sample while the loop is still blocked, then wait for it to recover
+            stack, ours = sample_stack(self._loop_thread_id)
+            while not heartbeat.wait(self._interval):
+                if self._stop.is_set():
+                    return
+            self._record_stall(time.perf_counter() - sent, stack, ours)
+
+    def _record_stall(self, lag: float, stack: str, ours: bool) -> None:
+        self._max_loop_lag.set_max(lag)
+        if ours:
+            self._stalls_ours.inc()
+            _LOGGER.warning("The event loop was blocked for %.3f s by uiprotectalarms:\n%s", lag, stack)
+        else:
+            self._stalls_other.inc()
+            _LOGGER.debug("The event loop was blocked for %.3f s:\n%s", lag, stack)
+
+    def _check_running_jobs(self) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            slow = [
+                (thread_id, job) for thread_id, job in self._running.items()
+                if not job[2] and now - job[1] > self._run_warning
+            ]
+            for _, job in slow:
+                job[2] = True
+
+        for thread_id, (name, start, _) in slow:
+            self._slow_run.inc()
+            stack, _ = sample_stack(thread_id)
+            _LOGGER.warning("%s has been running in the executor for %.1f s:\n%s", name, now - start, stack)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as plain data, for diagnostics."""
+        return {
+            "jobs": int(self._jobs.value),
+            "limiter_wait_seconds": {"count": self._limiter_wait.count, "sum": round(self._limiter_wait.sum, 6)},
+            "executor_wait_seconds": {
+                "count": self._queue_wait.count,
+                "sum": round(self._queue_wait.sum, 6),
+                "max": round(self._max_queue_wait.value, 6),
+            },
+            "run_seconds": {"count": self._run_time.count, "sum": round(self._run_time.sum, 6)},
+            "slow_jobs": {"queue": int(self._slow_queue.value), "run": int(self._slow_run.value)},
+            "loop_stalls": {"uiprotectalarms": int(self._stalls_ours.value), "other": int(self._stalls_other.value)},
+            "max_loop_lag_seconds": round(self._max_loop_lag.value, 6),
+        }
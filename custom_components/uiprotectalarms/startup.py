@@ -0,0 +1,107 @@
+"""Startup pipeline for the Uiprotectalarms HomeAssistant Integration."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from .const import LOGGER
+
+_LOGGER = logging.getLogger(LOGGER)
+
+
+@dataclass
+class StartupStage:
+    """One step of the startup pipeline.
+
+    A stage starts as soon as every stage it depends on has succeeded and every
+    stage it runs after has finished. A stage succeeds if its function returns
+    a truthy value. If a required stage fails, the pipeline fails; stages that
+    depend on a failed stage are skipped.
+    """
+
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    depends_on: tuple[str, ...] = ()
+    required: bool = True
+    runs_after: tuple[str, ...] = ()
+
+
+class StartupPipeline:
+    """Run startup stages concurrently, following their dependencies."""
+
+    def __init__(self, stages: list[StartupStage]) -> None:
+        self._stages = {stage.name: stage for stage in stages}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.timings: dict[str, float] = {}
+        self.results: dict[str, Any] = {}
+
+        for stage in stages:
+            for dependency in (*stage.depends_on, *stage.runs_after):
+                if dependency not in self._stages:
+                    raise ValueError(f"Startup stage {stage.name} depends on unknown stage {dependency}")
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        visiting: set[str] = set()
+        done: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Startup stage {name} is part of a dependency cycle")
+            visiting.add(name)
+            for dependency in (*self._stages[name].depends_on, *self._stages[name].runs_after):
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self._stages:
+            visit(name)
+
+    async def async_run(self) -> bool:
+        """Run all stages. Returns False if a required stage failed or was skipped."""
+        start = time.monotonic()
+        self._tasks = {
+            name: asyncio.create_task(self._async_run_stage(stage), name=f"uiprotectalarms_startup_{name}")
+            for name, stage in self._stages.items()
+        }
+        try:
+            succeeded = await asyncio.gather(*self._tasks.values())
+        finally:
+            for task in self._tasks.values():
+                task.cancel()
+
+        _LOGGER.info(
+            "Startup finished in %.3fs (%s)",
+            time.monotonic() - start,
+            ", ".join(f"{name}={elapsed:.3f}s" for name, elapsed in self.timings.items()),
+        )
+
+        return all(
+            stage_succeeded or not self._stages[name].required
+            for name, stage_succeeded in zip(self._tasks, succeeded)
+        )
+
+    async def _async_run_stage(self, stage: StartupStage) -> bool:
+        for dependency in stage.depends_on:
+            if not await asyncio.shield(self._tasks[dependency]):
+                _LOGGER.debug("Skipping startup stage %s: %s did not succeed", stage.name, dependency)
+                return False
+        for predecessor in stage.runs_after:
+            await asyncio.shield(self._tasks[predecessor])
+
+        start = time.monotonic()
+        result = await stage.func()
+        self.timings[stage.name] = time.monotonic() - start
+        self.results[stage.name] = result
+
+        _LOGGER.debug("Startup stage %s finished in %.3fs", stage.name, self.timings[stage.name])
+        if not result:
+            log = _LOGGER.error if stage.required else _LOGGER.warning
+            log("Startup stage %s failed", stage.name)
+        return bool(result)
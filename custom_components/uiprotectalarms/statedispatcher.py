@@ -0,0 +1,111 @@
+"""Coalesced HA state writes for updates coming from the PyUIProtectAlarms library."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+import logging
+import threading
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import Entity
+
+from .pyuiprotectalarms.metrics import MetricsRegistry
+from .pyuiprotectalarms.tracing import TRACER
+
+from .const import LOGGER
+
+_LOGGER = logging.getLogger(LOGGER)
+
+
+class UIProtectAlarmsStateDispatcher:
+    """Collect entities whose state changed and write them in one loop callback.
+
+    Library callbacks can fire from executor threads, where refreshes and
+    websocket updates run, or from the event loop. Every mark is recorded in a
+    dirty set, and only the first mark of a burst hops to the event loop. Marking the same
+    entity again before the flush is a no-op. ``on_flush`` is called on the
+    event loop after each flush. Marks, flushes and writes are counted in
+    ``metrics`` if given.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        on_flush: Callable[[], None] | None = None,
+        metrics: MetricsRegistry | None = None,
+    ) -> None:
+        self._hass = hass
+        self._on_flush = on_flush
+        self._lock = threading.Lock()
+        self._dirty: dict[Entity, None] = {}
+        self._flush_scheduled = False
+        self._holds = 0
+
+        metrics = metrics or MetricsRegistry()
+        self._marks = metrics.counter(
+            "uiprotectalarms_state_marks", "Entity state changes reported by the library"
+        ).labels()
+        self._flushes = metrics.counter(
+            "uiprotectalarms_state_flushes", "Batches of entity state writes"
+        ).labels()
+        self._writes = metrics.counter(
+            "uiprotectalarms_state_writes", "Entity states written to HomeAssistant"
+        ).labels()
+
+    def mark_dirty(self, entity: Entity) -> None:
+        """Queue a state write for the entity. Safe to call from any thread."""
+        self._marks.inc()
+        with self._lock:
+            self._dirty[entity] = None
+            if self._holds or self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        self._schedule_flush()
+
+    @contextmanager
+    def batch(self):
+        """Hold back state writes until the end of the block, e.g. a whole refresh."""
+        with self._lock:
+            self._holds += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holds -= 1
+                schedule = not self._holds and self._dirty and not self._flush_scheduled
+                if schedule:
+                    self._flush_scheduled = True
+            if schedule:
+                self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        loop = self._hass.loop
+        if loop is None or loop.is_closed():
+            _LOGGER.warning("Cannot schedule state update: event loop not available")
+            with self._lock:
+                self._flush_scheduled = False
+            return
+        loop.call_soon_threadsafe(self._async_flush)
+
+    @callback
+    def _async_flush(self) -> None:
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = {}
+            self._flush_scheduled = False
+
+        _LOGGER.debug("Writing state for %d entities", len(dirty))
+        written = 0
+        with TRACER.span("state_flush", entities=len(dirty)):
+            for entity in dirty:
+                # Skip entities removed since they were marked
+                if entity.hass is not None:
+                    entity.async_write_ha_state()
+                    written += 1
+        self._flushes.inc()
+        self._writes.inc(written)
+
+        if self._on_flush is not None:
+            self._on_flush()
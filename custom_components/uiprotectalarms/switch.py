@@ -6,16 +6,26 @@
 # pylint: disable=W0613
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import Future
 from typing import Any, Callable
 from dataclasses import dataclass
 import logging
 
-from .haimports import *  # pylint: disable=W0401,W0614
+from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
 from .pyuiprotectalarms import PyUIProtectAlarms
 from .pyuiprotectalarms.pyuiprotectautomation import PyUIProtectAutomation
+from .pyuiprotectalarms.pyuiprotectnotification import PyUIProtectNotification
+from .pyuiprotectalarms.pyuiprotectchanges import PyUIProtectChanges
+from .pyuiprotectalarms.pyuiprotectreceivers import RECEIVER
 from .baseentity import UIProtectAlarmsBaseEntityHA
 
-from .const import LOGGER, DOMAIN, PYUIPROTECTALARMS_MANAGER
+from .const import LOGGER, DOMAIN, PYUIPROTECTALARMS_MANAGER, UIPROTECTALARMS_EXECUTOR, CONF_PER_USER_NOTIFICATIONS
 
 _LOGGER = logging.getLogger(LOGGER)
 
@@ -68,22 +78,129 @@ async def async_setup_entry(
     """Set up the Uiprotectalarms Switch platform."""
     _LOGGER.info("Starting Uiprotectalarms Switch Platform")
 
-    pyuiprotectalarms_manager: PyUIProtectAlarms = hass.data[DOMAIN][PYUIPROTECTALARMS_MANAGER]
+    pyuiprotectalarms_manager: PyUIProtectAlarms = hass.data[DOMAIN][config_entry.entry_id][
+        PYUIPROTECTALARMS_MANAGER
+    ]
+    from .notification_switch import get_notification_entries  # pylint: disable=C0415
+
+    # Users who get a switch per automation and channel, as asked for in the options
+    per_user_ids : list[str] = config_entry.options.get(CONF_PER_USER_NOTIFICATIONS) or []
+    if per_user_ids:
+        from .user_notification_switch import get_user_notification_entries  # pylint: disable=C0415
+
+    # Entities created for each automation / notification, keyed by object type
+    # and id, so they can be removed again when the object is deleted on the console.
+    entities_by_object : dict[tuple[str, str], list[SwitchEntity]] = {}
+    # Per-user switches, keyed by automation id and user id, so they can follow
+    # the users who start or stop receiving the notifications of an automation.
+    user_entities : dict[str, dict[str, list[SwitchEntity]]] = {}
+
+    def track_new(objects: dict, kind: str) -> dict:
+        # A change can race with the initial add, so skip anything already tracked
+        return {object_id: obj for object_id, obj in objects.items() if (kind, object_id) not in entities_by_object}
+
+    @callback
+    def async_track_user_switches(automations: dict[PyUIProtectAutomation]) -> list[SwitchEntity]:
+        # Only the users who aren't tracked for an automation yet get new switches
+        tracked = {
+            (automation_id, user_id)
+            for automation_id in automations for user_id in user_entities.get(automation_id, {})
+        }
+        new_entities : list[SwitchEntity] = []
+        for switch_entity in get_user_notification_entries(pyuiprotectalarms_manager, automations, per_user_ids):
+            automation_id = switch_entity.pyuiprotect_base_obj.id
+            if (automation_id, switch_entity.user_id) in tracked:
+                continue
+            user_entities.setdefault(automation_id, {}).setdefault(switch_entity.user_id, []).append(switch_entity)
+            new_entities.append(switch_entity)
+        return new_entities
+
+    @callback
+    def async_add_switches(
+        automations: dict[PyUIProtectAutomation], notifications: dict[PyUIProtectNotification]
+    ) -> None:
+        switch_entities_ha : list[SwitchEntity] = []
+
+        automations = track_new(automations, "automation")
+        for switch_entity in get_entries(automations):
+            entities_by_object.setdefault(("automation", switch_entity.pyuiprotect_base_obj.id), []).append(switch_entity)
+            switch_entities_ha.append(switch_entity)
+        if per_user_ids:
+            switch_entities_ha.extend(async_track_user_switches(automations))
+
+        notifications = track_new(notifications, "notification")
+        if notifications:
+            notification_switches = get_notification_entries(notifications)
+            for switch_entity in notification_switches:
+                entities_by_object.setdefault(("notification", switch_entity.pyuiprotect_base_obj.id), []).append(switch_entity)
+            switch_entities_ha.extend(notification_switches)
+            _LOGGER.info("Added %d notification switches", len(notification_switches))
 
-    switch_entities_ha : list[SwitchEntity] = []
-    
-    # Add automation switches
-    switch_entities_to_add = get_entries(pyuiprotectalarms_manager.automations)
-    switch_entities_ha.extend(switch_entities_to_add)
-    
-    # Add notification switches if available
-    if pyuiprotectalarms_manager.notifications:
-        from .notification_switch import get_notification_entries, UIProtectAlarmsNotificationSwitchHA
-        notification_switches = get_notification_entries(pyuiprotectalarms_manager.notifications)
-        switch_entities_ha.extend(notification_switches)
-        _LOGGER.info("Added %d notification switches", len(notification_switches))
+        if switch_entities_ha:
+            async_add_entities(switch_entities_ha)
 
-    async_add_entities(switch_entities_ha)
+    @callback
+    def async_unregister_switches(switch_entities: list[SwitchEntity]) -> list[SwitchEntity]:
+        entity_registry = er.async_get(hass)
+        for switch_entity in switch_entities:
+            _LOGGER.info("Removing switch %s", switch_entity.entity_id)
+            if switch_entity.registry_entry is not None:
+                entity_registry.async_remove(switch_entity.entity_id)
+        return switch_entities
+
+    @callback
+    def async_remove_switches(objects: list[tuple[str, str]]) -> list[SwitchEntity]:
+        removed_entities : list[SwitchEntity] = []
+        for object_key in objects:
+            removed_entities.extend(entities_by_object.pop(object_key, []))
+            if object_key[0] == "automation":
+                for entities in user_entities.pop(object_key[1], {}).values():
+                    removed_entities.extend(entities)
+        return async_unregister_switches(removed_entities)
+
+    @callback
+    def async_update_user_switches(automations: dict[PyUIProtectAutomation]) -> list[SwitchEntity]:
+        # Drop the switches of the users who no longer receive an automation's
+        # notifications, and add them for the users who started to.
+        receivers = pyuiprotectalarms_manager.receivers
+        removed_entities : list[SwitchEntity] = []
+        for automation in automations.values():
+            automation_entities = user_entities.get(automation.id, {})
+            for user_id in [user_id for user_id in automation_entities
+                            if not receivers.cell(automation, user_id) & RECEIVER]:
+                removed_entities.extend(automation_entities.pop(user_id))
+        new_entities = async_track_user_switches(automations)
+        if new_entities:
+            async_add_entities(new_entities)
+        return async_unregister_switches(removed_entities)
+
+    async def async_handle_changes(changes: PyUIProtectChanges) -> None:
+        removed_entities = async_remove_switches([
+            *(("automation", object_id) for object_id in changes.removed_automations),
+            *(("notification", object_id) for object_id in changes.removed_notifications),
+        ])
+        async_add_switches(changes.added_automations, changes.added_notifications)
+        if per_user_ids:
+            # Only automations that are still tracked, and were tracked before this change
+            removed_entities.extend(async_update_user_switches({
+                automation_id: automation for automation_id, automation in changes.receivers_changed_automations.items()
+                if ("automation", automation_id) in entities_by_object and automation_id not in changes.added_automations
+            }))
+        # Removal is shared with the one the registry started, so this returns once the entities are gone.
+        # Disabled entities were never added, so there is nothing to remove.
+        await asyncio.gather(*(
+            switch_entity.async_remove(force_remove=True)
+            for switch_entity in removed_entities if switch_entity.hass is not None
+        ))
+
+    def handle_changes(changes: PyUIProtectChanges) -> Future:
+        # Refreshes run in the executor, so hop back to the event loop. The
+        # removed objects are released once the future is done.
+        return asyncio.run_coroutine_threadsafe(async_handle_changes(changes), hass.loop)
+
+    config_entry.async_on_unload(pyuiprotectalarms_manager.add_change_callback(handle_changes))
+
+    async_add_switches(pyuiprotectalarms_manager.automations, pyuiprotectalarms_manager.notifications)
 
 class UIProtectAlarmsSwitchHA(UIProtectAlarmsBaseEntityHA, SwitchEntity):
 
@@ -106,6 +223,11 @@ class UIProtectAlarmsSwitchHA(UIProtectAlarmsBaseEntityHA, SwitchEntity):
         self._attr_unique_id = f"{pyuiprotectalarms_automation.id}-{description.key}"
         self._attr_should_poll = False
 
+    @property
+    def subscribed_fields(self) -> tuple[str, ...]:
+        """Return the fields of the record the switch shows."""
+        return (self.entity_description.attr_name, "name")
+
     @property
     def is_on(self) -> bool:
         """Return True if device is on."""
@@ -118,7 +240,7 @@ class UIProtectAlarmsSwitchHA(UIProtectAlarmsBaseEntityHA, SwitchEntity):
         
         return getattr(self.pyuiprotectalarms_automation, self.entity_description.attr_name)
 
-    def turn_on(
+    async def async_turn_on(
         self,
         percentage: int | None = None,
         preset_mode: str | None = None,
@@ -126,11 +248,23 @@ class UIProtectAlarmsSwitchHA(UIProtectAlarmsBaseEntityHA, SwitchEntity):
     ) -> None:
         """Turn the device on."""
         _LOGGER.debug("Turning on %s %s", self.pyuiprotectalarms_automation.name, self.entity_description.key)
-        setattr(self.pyuiprotectalarms_automation, self.entity_description.attr_name, True)
+        # The setter calls the console, so it runs in the executor. The new
+        # state is written by the dispatcher once the update is applied.
+        await self.hass.data[DOMAIN][UIPROTECTALARMS_EXECUTOR].async_run(
+            setattr,
+            self.pyuiprotectalarms_automation,
+            self.entity_description.attr_name,
+            True
+        )
 
-    def turn_off(self, **kwargs: Any) -> None:
+    async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the device off."""
         _LOGGER.debug(
             "Turning off %s %s", self.pyuiprotectalarms_automation.name, self.entity_description.key
         )
-        setattr(self.pyuiprotectalarms_automation, self.entity_description.attr_name, False)
+        await self.hass.data[DOMAIN][UIPROTECTALARMS_EXECUTOR].async_run(
+            setattr,
+            self.pyuiprotectalarms_automation,
+            self.entity_description.attr_name,
+            False
+        )
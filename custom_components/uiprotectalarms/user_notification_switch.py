@@ -0,0 +1,140 @@
+"""Support per-user notification switches for Uiprotectalarms automations"""
+# Suppress warnings about DataClass constructors
+# pylint: disable=E1123
+
+# Suppress warnings about unused function arguments
+# pylint: disable=W0613
+from __future__ import annotations
+
+from typing import Any, Iterable
+from dataclasses import dataclass
+import logging
+
+from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
+
+from .pyuiprotectalarms import PyUIProtectAlarms
+from .pyuiprotectalarms.pyuiprotectautomation import PyUIProtectAutomation
+from .pyuiprotectalarms.pyuiprotectreceivers import RECEIVER, receiver_field
+from .baseentity import UIProtectAlarmsBaseEntityHA
+
+from .const import LOGGER, DOMAIN, UIPROTECTALARMS_EXECUTOR
+
+_LOGGER = logging.getLogger(LOGGER)
+
+
+@dataclass
+class UIProtectAlarmsUserNotificationSwitchHAEntityDescription(SwitchEntityDescription):
+    """Describe UIProtectAlarms per-user Notification Switch entity."""
+
+    icon: str = None
+    channel_type: str = None  # "push" or "email"
+
+USER_NOTIFICATION_SWITCHES: list[UIProtectAlarmsUserNotificationSwitchHAEntityDescription] = [
+    UIProtectAlarmsUserNotificationSwitchHAEntityDescription(
+        key="Push",
+        translation_key="user_notification_push",
+        icon="mdi:bell",
+        channel_type="push"
+    ),
+    UIProtectAlarmsUserNotificationSwitchHAEntityDescription(
+        key="Email",
+        translation_key="user_notification_email",
+        icon="mdi:email",
+        channel_type="email"
+    )
+]
+
+def get_user_notification_entries(
+    pyuiprotectalarms_manager: PyUIProtectAlarms,
+    pyuiprotectalarms_automations: dict[str, PyUIProtectAutomation],
+    user_ids: Iterable[str],
+) -> list[UIProtectAlarmsUserNotificationSwitchHA]:
+    """Get a push and an email switch for each of the users who receive the notifications of each automation.
+
+    Only the users asked for get switches, and only for the automations they
+    already receive, read from the receiver matrix without walking the payloads.
+    """
+    users = pyuiprotectalarms_manager.users
+    user_ids = [user_id for user_id in user_ids if user_id in users]
+    receivers = pyuiprotectalarms_manager.receivers
+    switch_ha_collection : list[UIProtectAlarmsUserNotificationSwitchHA] = []
+
+    for pyuiprotectalarms_automation in pyuiprotectalarms_automations.values():
+        for user_id in user_ids:
+            if not receivers.cell(pyuiprotectalarms_automation, user_id) & RECEIVER:
+                continue
+            for switch_definition in USER_NOTIFICATION_SWITCHES:
+                switch_ha_collection.append(UIProtectAlarmsUserNotificationSwitchHA(
+                    pyuiprotectalarms_manager, pyuiprotectalarms_automation, user_id, users.name_of(user_id), switch_definition
+                ))
+
+    _LOGGER.debug("UserNotificationSwitch:get_entries: %d switches for %d users",
+                  len(switch_ha_collection), len(user_ids))
+    return switch_ha_collection
+
+
+class UIProtectAlarmsUserNotificationSwitchHA(UIProtectAlarmsBaseEntityHA, SwitchEntity):
+    """Whether one user is notified on one channel by one automation."""
+
+    def __init__(
+        self,
+        pyuiprotectalarms_manager: PyUIProtectAlarms,
+        pyuiprotectalarms_automation: PyUIProtectAutomation,
+        user_id: str,
+        user_name: str,
+        description: UIProtectAlarmsUserNotificationSwitchHAEntityDescription
+    ) -> None:
+        super().__init__(pyuiprotectalarms_automation)
+
+        self.pyuiprotectalarms_manager = pyuiprotectalarms_manager
+        self.user_id = user_id
+
+        # Note this is a "magic" HA property.  Don't rename
+        self.entity_description = description
+
+        automation_name = pyuiprotectalarms_automation.name.removesuffix(" (Disabled)")
+        self._attr_name = f"{automation_name} {user_name} {description.key}"
+        self._attr_unique_id = f"{pyuiprotectalarms_automation.id}-{user_id}-{description.channel_type}"
+        self._attr_should_poll = False
+        if description.icon:
+            self._attr_icon = description.icon
+
+    @property
+    def subscribed_fields(self) -> tuple[str, ...]:
+        """Return the cell of the user, for it becoming or no longer being a receiver, and the channel."""
+        return (receiver_field(self.user_id), receiver_field(self.user_id, self.entity_description.channel_type))
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the user, with the name as the directory holds it now."""
+        return {"user_id": self.user_id, "user": self.pyuiprotectalarms_manager.users.name_of(self.user_id)}
+
+    @property
+    def available(self) -> bool:
+        """Return True while the user receives the automation's notifications."""
+        return bool(self.pyuiprotectalarms_manager.receivers.cell(self.pyuiprotect_base_obj, self.user_id) & RECEIVER)
+
+    @property
+    def is_on(self) -> bool:
+        """Return True if the user is notified on the channel."""
+        return self.pyuiprotectalarms_manager.receivers.is_enabled(
+            self.pyuiprotect_base_obj, self.user_id, self.entity_description.channel_type
+        )
+
+    async def _async_set(self, enabled: bool) -> None:
+        _LOGGER.debug("Setting %s to %s", self._attr_name, enabled)
+        await self.hass.data[DOMAIN][UIPROTECTALARMS_EXECUTOR].async_run(
+            self.pyuiprotectalarms_manager.set_notification_channel,
+            self.entity_description.channel_type,
+            enabled,
+            [self.user_id],
+            [self.pyuiprotect_base_obj.id],
+        )
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Notify the user on the channel."""
+        await self._async_set(True)
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Stop notifying the user on the channel."""
+        await self._async_set(False)
@@ -0,0 +1,37 @@
+"""Fixtures for the benchmarks: synthetic consoles and managers loaded from them."""
+import os
+
+import pytest
+
+from custom_components.uiprotectalarms.pyuiprotectalarms import PyUIProtectAlarms
+from tests.pyuiprotectalarms.synthetic import SyntheticConsole
+
+# Console sizes as "automations:users", e.g. UIPROTECTALARMS_BENCHMARK_SIZES=5000:50
+BENCHMARK_SIZES = [
+    tuple(int(part) for part in size.split(":"))
+    for size in os.environ.get("UIPROTECTALARMS_BENCHMARK_SIZES", "500:10").split(",")
+]
+
+
+def make_manager(console: SyntheticConsole) -> PyUIProtectAlarms:
+    """Return a manager whose API calls are answered by the synthetic console."""
+    manager = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+    manager.call_uiprotect_api = console
+    return manager
+
+
+@pytest.fixture(params=BENCHMARK_SIZES, ids=lambda size: f"{size[0]}rules-{size[1]}users")
+def console(request) -> SyntheticConsole:
+    """Return a synthetic console of each configured size."""
+    automations, users = request.param
+    return SyntheticConsole(automations=automations, users=users)
+
+
+@pytest.fixture
+def loaded_manager(console) -> PyUIProtectAlarms:
+    """Return a manager that has loaded the console's automations, users and notifications."""
+    manager = make_manager(console)
+    manager.load_automations()
+    manager.load_users()
+    manager.load_notifications()
+    return manager
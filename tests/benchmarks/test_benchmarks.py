@@ -0,0 +1,137 @@
+"""Benchmarks of loading, reloading and toggling a large console."""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+# pylint: disable=wrong-import-position
+from custom_components.uiprotectalarms.pyuiprotectalarms import PyUIProtectAlarms
+from custom_components.uiprotectalarms.pyuiprotectalarms.cassette import recording, replaying
+from custom_components.uiprotectalarms.pyuiprotectalarms.websocketdecoder import WsDecoder
+from custom_components.uiprotectalarms.switch import get_entries
+from custom_components.uiprotectalarms.user_notification_switch import get_user_notification_entries
+from tests.pyuiprotectalarms.nvrsimulator import SIMULATOR_PASSWORD, SIMULATOR_USERNAME, NvrSimulator
+from tests.pyuiprotectalarms.ws_frames import decode_in_full, synthetic_stream
+from .conftest import make_manager
+
+
+def load_everything(manager: PyUIProtectAlarms) -> None:
+    """Load automations, users and notifications."""
+    manager.load_automations()
+    manager.load_users()
+    manager.load_notifications()
+
+# Rounds of the benchmarks that need a fresh response or manager each round
+ROUNDS = 10
+
+
+class TestLoadBenchmarks:
+    """Benchmark full loads and reloads of the automations."""
+
+    def test_load_automations(self, benchmark, console):
+        """Benchmark the first load, which creates every automation."""
+        def setup():
+            console.prepare()
+            return (make_manager(console),), {}
+
+        benchmark.pedantic(lambda manager: manager.load_automations(), setup=setup, rounds=ROUNDS)
+
+    def test_reload_unchanged(self, benchmark, console, loaded_manager):
+        """Benchmark a reload where nothing changed on the console."""
+        benchmark.pedantic(loaded_manager.load_automations, setup=console.prepare, rounds=ROUNDS)
+
+    def test_reload_one_percent_changed(self, benchmark, console, loaded_manager):
+        """Benchmark a reload where 1% of the automations changed on the console."""
+        def setup():
+            console.mutate(0.01)
+            console.prepare()
+
+        benchmark.pedantic(loaded_manager.load_automations, setup=setup, rounds=ROUNDS)
+
+
+class TestNotificationBenchmarks:
+    """Benchmark extracting notifications from the automations."""
+
+    def test_extract_notifications(self, benchmark, loaded_manager):
+        """Benchmark the first extraction, which creates every notification."""
+        def setup():
+            with loaded_manager._staging() as staged:  # pylint: disable=protected-access
+                staged.edit_notifications().clear()
+
+        benchmark.pedantic(loaded_manager._extract_notifications_from_automations, setup=setup, rounds=ROUNDS)  # pylint: disable=protected-access
+
+    def test_extract_notifications_unchanged(self, benchmark, loaded_manager):
+        """Benchmark an extraction where no notification changed."""
+        benchmark(loaded_manager._extract_notifications_from_automations)  # pylint: disable=protected-access
+
+
+class TestEntityBenchmarks:
+    """Benchmark building the switches and toggling them."""
+
+    def test_get_entries(self, benchmark, loaded_manager):
+        """Benchmark creating the switch entities for every automation."""
+        benchmark(get_entries, loaded_manager.automations)
+
+    def test_get_user_notification_entries(self, benchmark, loaded_manager):
+        """Benchmark creating the per-user notification switches for every user."""
+        user_ids = list(loaded_manager.users)
+        benchmark(get_user_notification_entries, loaded_manager, loaded_manager.automations, user_ids)
+
+    def test_bulk_toggle(self, benchmark, loaded_manager):
+        """Benchmark disabling and enabling 100 automations, one read and one write each."""
+        automations = list(loaded_manager.automations.values())[:100]
+
+        def toggle():
+            for automation in automations:
+                automation.enabled = not automation.enabled
+
+        benchmark.pedantic(toggle, rounds=5)
+
+
+# Messages in the websocket stream decoded per round
+WS_STREAM_SIZE = 5000
+
+
+class TestWebsocketBenchmarks:
+    """Benchmark decoding a busy console's websocket stream, filtered and in full."""
+
+    def test_decode_filtered(self, benchmark):
+        """Benchmark decoding the stream, keeping and parsing only the automation messages."""
+        stream = synthetic_stream(WS_STREAM_SIZE)
+
+        def decode():
+            decoder = WsDecoder(model_keys=["automation"])
+            for raw in stream:
+                message = decoder.decode(raw)
+                if message is not None:
+                    _ = message.data
+
+        benchmark(decode)
+
+    def test_decode_full(self, benchmark):
+        """Benchmark parsing every message of the stream, the baseline for the filtered decode."""
+        stream = synthetic_stream(WS_STREAM_SIZE)
+
+        def decode():
+            for raw in stream:
+                decode_in_full(raw)
+
+        benchmark(decode)
+
+
+class TestReplayBenchmarks:
+    """Benchmark the whole HTTP path, replayed from a cassette instead of a console."""
+
+    def test_load_replayed(self, benchmark, console):
+        """Benchmark logging in and loading everything, responses included, from a cassette recorded with the simulator."""
+        simulator = NvrSimulator(console).start()
+        try:
+            with recording() as recorder:
+                load_everything(PyUIProtectAlarms(simulator.address, SIMULATOR_USERNAME, SIMULATOR_PASSWORD))
+        finally:
+            simulator.stop()
+
+        def setup():
+            return (PyUIProtectAlarms(simulator.address, SIMULATOR_USERNAME, SIMULATOR_PASSWORD),), {}
+
+        with replaying(recorder.cassette()):
+            benchmark.pedantic(load_everything, setup=setup, rounds=ROUNDS)
@@ -0,0 +1 @@
+"""Memory footprint tests."""
@@ -0,0 +1,38 @@
+"""Fixtures for the memory tests: console sizes, tracemalloc and quiet logging."""
+import gc
+import logging
+import os
+import tracemalloc
+
+import pytest
+
+from custom_components.uiprotectalarms.pyuiprotectalarms import UIProtectApi
+from tests.pyuiprotectalarms.synthetic import SyntheticConsole
+
+# Console sizes as "automations:users", e.g. UIPROTECTALARMS_MEMORY_SIZES=200:5,5000:50
+MEMORY_SIZES = [
+    tuple(int(part) for part in size.split(":"))
+    for size in os.environ.get("UIPROTECTALARMS_MEMORY_SIZES", "500:10").split(",")
+]
+
+
+@pytest.fixture(params=MEMORY_SIZES, ids=lambda size: f"{size[0]}rules-{size[1]}users")
+def console(request) -> SyntheticConsole:
+    """Return a synthetic console of each configured size, its responses already encoded."""
+    automations, users = request.param
+    console = SyntheticConsole(automations=automations, users=users)
+    # Encode the responses now, so only what the library keeps is traced
+    console(UIProtectApi.GET_AUTOMATIONS)
+    console(UIProtectApi.GET_USERS)
+    return console
+
+
+@pytest.fixture(autouse=True)
+def traced():
+    """Trace allocations for the test, with logging off so captured records don't count."""
+    logging.disable(logging.WARNING)
+    tracemalloc.start()
+    gc.collect()
+    yield
+    tracemalloc.stop()
+    logging.disable(logging.NOTSET)
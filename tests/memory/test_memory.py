@@ -0,0 +1,230 @@
+"""Memory budgets per automation, notification and entity, and leak checks across refreshes and entity churn.
+
+Sizes are what tracemalloc sees retained after a gc.collect(). The budgets
+are the library's own overhead per object; the decoded payload it keeps is
+measured separately and left out, as it grows with the console (e.g. one
+receiver per user). The leak checks only count memory allocated by the
+integration and HomeAssistant, as the payloads of a changing console vary
+in size from one cycle to the next.
+"""
+import asyncio
+import gc
+from types import SimpleNamespace
+import tracemalloc
+from typing import Any, Awaitable, Callable
+
+import pytest
+from homeassistant.helpers.entity import DATA_ENTITY_SOURCE
+
+from custom_components.uiprotectalarms.const import DOMAIN, UIPROTECTALARMS_DISPATCHER
+from custom_components.uiprotectalarms.notification_switch import get_notification_entries
+from custom_components.uiprotectalarms.pyuiprotectalarms import PyUIProtectAlarms, UIProtectApi
+from custom_components.uiprotectalarms.switch import get_entries
+from tests.benchmarks.conftest import make_manager
+
+# Bytes each object may add on top of the payload it keeps
+AUTOMATION_OVERHEAD_BUDGET = 768
+NOTIFICATION_BUDGET = 1024
+ENTITY_BUDGET = 512
+# Bytes an entity may add once added to hass, for the callback it registers on its object
+ENTITY_CALLBACK_BUDGET = 1024
+
+# Refreshes and churn cycles run before measuring, so caches and counters settle
+WARMUP_CYCLES = 3
+MEASURED_CYCLES = 20
+# Bytes a cycle may leave behind, for dicts resized as objects come and go
+LEAK_BUDGET_PER_CYCLE = 2048
+# Where the allocations counted by the leak checks are made
+LEAK_FILTERS = [tracemalloc.Filter(True, "*/custom_components/*"), tracemalloc.Filter(True, "*/homeassistant/*")]
+
+ENTRY_ID = "memory"
+
+
+def retained(func: Callable[[], Any]) -> tuple[Any, int]:
+    """Run func and return its result and the bytes still allocated afterwards."""
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+async def leaked(cycle: Callable[[int], Awaitable[None]]) -> int:
+    """Run WARMUP_CYCLES then MEASURED_CYCLES cycles, and return the bytes the measured ones left behind."""
+    await cycle(WARMUP_CYCLES)
+    gc.collect()
+    before = tracemalloc.take_snapshot().filter_traces(LEAK_FILTERS)
+    await cycle(MEASURED_CYCLES)
+    gc.collect()
+    after = tracemalloc.take_snapshot().filter_traces(LEAK_FILTERS)
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def load_everything(manager: PyUIProtectAlarms) -> None:
+    """Load automations, users and notifications."""
+    manager.load_automations()
+    manager.load_users()
+    manager.load_notifications()
+
+
+class FakeHass(SimpleNamespace):
+    """Just enough of hass for entities to be added and removed."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            loop=asyncio.get_running_loop(),
+            data={DATA_ENTITY_SOURCE: {}, DOMAIN: {ENTRY_ID: {}}},
+            states=SimpleNamespace(async_remove=lambda entity_id, context=None: None),
+        )
+        self.marks = 0
+        self.platform = SimpleNamespace(config_entry=SimpleNamespace(entry_id=ENTRY_ID))
+        self.data[DOMAIN][ENTRY_ID][UIPROTECTALARMS_DISPATCHER] = SimpleNamespace(mark_dirty=self._mark_dirty)
+
+    def _mark_dirty(self, entity) -> None:
+        self.marks += 1
+
+    def attach(self, entities: list) -> None:
+        """Set what the entity platform sets on entities before adding them."""
+        for entity in entities:
+            entity.hass = self
+            entity.platform = self.platform
+            entity.entity_id = f"switch.{entity.unique_id}"
+            self.data[DATA_ENTITY_SOURCE][entity.entity_id] = ENTRY_ID
+
+    async def async_add(self, entities: list, attach: bool = True) -> None:
+        """Add entities the way the entity platform does, as far as the integration sees it."""
+        if attach:
+            self.attach(entities)
+        for entity in entities:
+            await entity.async_added_to_hass()
+
+    async def async_remove(self, entities: list) -> None:
+        """Remove entities, running what they registered with async_on_remove."""
+        for entity in entities:
+            await entity.async_remove(force_remove=True)
+
+
+class TestFootprint:
+    """Bytes per object, against budgets, at every console size."""
+
+    def test_automations(self, console):
+        """Test an automation costs little more than its decoded payload."""
+        payload, payload_bytes = retained(lambda: console(UIProtectApi.GET_AUTOMATIONS))
+        manager = make_manager(console)
+        _, loaded_bytes = retained(manager.load_automations)
+
+        count = len(manager.automations)
+        overhead = (loaded_bytes - payload_bytes) / count
+        assert count == len(console.automations)
+        assert overhead <= AUTOMATION_OVERHEAD_BUDGET, (
+            f"{overhead:.0f} bytes per automation on top of {payload_bytes / count:.0f} bytes of payload"
+        )
+        del payload
+
+    def test_notifications(self, console):
+        """Test the notifications extracted from the automations stay within budget."""
+        manager = make_manager(console)
+        manager.load_automations()
+        _, notification_bytes = retained(manager.load_notifications)
+
+        per_notification = notification_bytes / len(manager.notifications)
+        assert per_notification <= NOTIFICATION_BUDGET, f"{per_notification:.0f} bytes per notification"
+
+    @pytest.mark.asyncio
+    async def test_entities(self, console):
+        """Test switch entities, and the callbacks they register once added, stay within budget."""
+        manager = make_manager(console)
+        load_everything(manager)
+        hass = FakeHass()
+
+        def create():
+            return get_entries(manager.automations) + get_notification_entries(manager.notifications)
+
+        entities, entity_bytes = retained(create)
+        hass.attach(entities)
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        await hass.async_add(entities, attach=False)
+        gc.collect()
+        callback_bytes = tracemalloc.get_traced_memory()[0] - before
+
+        per_entity = entity_bytes / len(entities)
+        per_callback = callback_bytes / len(entities)
+        assert per_entity <= ENTITY_BUDGET, f"{per_entity:.0f} bytes per entity"
+        assert per_callback <= ENTITY_CALLBACK_BUDGET, f"{per_callback:.0f} bytes per entity added"
+
+
+class TestLeaks:
+    """Memory must not grow with repeated refreshes or entity churn."""
+
+    @pytest.mark.asyncio
+    async def test_refresh_cycles(self, console):
+        """Test refreshes with a few changes each don't accumulate memory."""
+        manager = make_manager(console)
+        load_everything(manager)
+        hass = FakeHass()
+        # Held like the entity platform does, as objects only hold their entities weakly
+        entities = get_entries(manager.automations)
+        await hass.async_add(entities)
+
+        async def refresh(cycles: int) -> None:
+            for _ in range(cycles):
+                console.mutate(0.01)
+                load_everything(manager)
+
+        growth = await leaked(refresh)
+
+        assert hass.marks
+        assert growth <= LEAK_BUDGET_PER_CYCLE * MEASURED_CYCLES, f"{growth} bytes left by {MEASURED_CYCLES} refreshes"
+
+    @pytest.mark.asyncio
+    async def test_automation_churn(self, console):
+        """Test automations deleted and created on the console, with their entities, don't accumulate memory."""
+        manager = make_manager(console)
+        hass = FakeHass()
+        entities_by_id: dict[str, list] = {}
+
+        def handle_changes(changes) -> None:
+            # What the switch platform does with the changes, minus the registry
+            removed = [entity for object_id in changes.removed_automations for entity in entities_by_id.pop(object_id)]
+            added = get_entries(changes.added_automations)
+            for entity in added:
+                entities_by_id.setdefault(entity.pyuiprotect_base_obj.id, []).append(entity)
+            pending.append((removed, added))
+
+        pending: list[tuple[list, list]] = []
+        manager.add_change_callback(handle_changes)
+
+        async def churn(cycles: int) -> None:
+            for cycle in range(cycles):
+                if manager.automations or cycle:
+                    console.replace(0.05)
+                manager.load_automations()
+                while pending:
+                    removed, added = pending.pop(0)
+                    await hass.async_remove(removed)
+                    await hass.async_add(added)
+
+        growth = await leaked(churn)
+
+        assert len(entities_by_id) == len(manager.automations) == len(console.automations)
+        assert growth <= LEAK_BUDGET_PER_CYCLE * MEASURED_CYCLES, f"{growth} bytes left by {MEASURED_CYCLES} churns"
+
+    @pytest.mark.asyncio
+    async def test_entity_churn(self, console):
+        """Test entities removed and added again for the same automations release their callbacks."""
+        manager = make_manager(console)
+        manager.load_automations()
+        automations = dict(list(manager.automations.items())[:50])
+        hass = FakeHass()
+
+        async def churn(cycles: int) -> None:
+            for _ in range(cycles):
+                entities = get_entries(automations)
+                await hass.async_add(entities)
+                await hass.async_remove(entities)
+
+        growth = await leaked(churn)
+
+        assert all(not automation._subscriptions for automation in automations.values())  # pylint: disable=protected-access
+        assert growth <= LEAK_BUDGET_PER_CYCLE * MEASURED_CYCLES, f"{growth} bytes left by {MEASURED_CYCLES} churns"
@@ -0,0 +1,17 @@
+"""Fixtures for the PyUIProtectAlarms tests."""
+import pytest
+
+from .nvrsimulator import NvrSimulator
+from .synthetic import SyntheticConsole
+
+
+@pytest.fixture
+def nvr_simulator():
+    """Serve a small synthetic console over HTTPS for the duration of a test.
+
+    Tweak latency, error_rate, rate_limit or token_lifetime on the returned
+    simulator to change how it behaves.
+    """
+    simulator = NvrSimulator(SyntheticConsole(automations=50, users=3)).start()
+    yield simulator
+    simulator.stop()
@@ -0,0 +1,340 @@
+"""A local stand-in for the UniFi Protect endpoints the library calls, for offline and load tests.
+
+The simulator serves the endpoints in UIPROTECT_APIS over HTTPS with a
+self-signed certificate, from a SyntheticConsole holding the state, so
+everything in Helpers runs for real: the shared session, the TOKEN cookie
+(a JWT), the X-CSRF-Token header and JSON encoding. Latency, random
+errors, 429 throttling and token lifetime are configurable.
+
+In tests, use the ``nvr_simulator`` fixture, or start one with
+``NvrSimulator(...).start()``, which serves from a background thread.
+For soak tests run it as a process::
+
+    python -m tests.pyuiprotectalarms.nvrsimulator --port 8443 --automations 5000 --users 50 --latency 0.05
+
+and point the integration at ``127.0.0.1:8443``.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import secrets
+import ssl
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from aiohttp import web
+import jwt
+
+from custom_components.uiprotectalarms.pyuiprotectalarms.constants import (
+    UIPROTECT_APIS,
+    UIPROTECT_API_PATH,
+    UIProtectApi,
+)
+from .synthetic import SyntheticConsole
+
+_LOGGER = logging.getLogger(__name__)
+
+SIMULATOR_USERNAME = "USERNAME"
+SIMULATOR_PASSWORD = "PASSWORD"
+TOKEN_COOKIE = "TOKEN"
+CSRF_HEADER = "X-CSRF-Token"
+
+
+def make_self_signed_cert(directory: str) -> tuple[str, str]:
+    """Write a self-signed certificate for 127.0.0.1 and its key to directory. Returns their paths."""
+    # pylint: disable=import-outside-toplevel
+    import ipaddress
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "nvr-simulator")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=30))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False)
+        .sign(key, hashes.SHA256())
+    )
+
+    cert_path = os.path.join(directory, "nvr-simulator.crt")
+    key_path = os.path.join(directory, "nvr-simulator.key")
+    with open(cert_path, "wb") as cert_file:
+        cert_file.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as key_file:
+        key_file.write(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    return cert_path, key_path
+
+
+class NvrSimulator:
+    """HTTPS server answering the UniFi Protect API from a SyntheticConsole.
+
+    latency: seconds added to every response, plus up to latency_jitter more.
+    error_rate: share of API calls (not logins) answered with a 500.
+    rate_limit: requests per second allowed before answering 429, 0 for no limit.
+    token_lifetime: seconds a login token is valid for.
+    """
+
+    def __init__(
+        self,
+        console: Optional[SyntheticConsole] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: int = 0,
+        token_lifetime: float = 3600,
+        seed: int = 0,
+    ) -> None:
+        self.console = console or SyntheticConsole()
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.token_lifetime = token_lifetime
+        self._rng = random.Random(seed)
+        self._secret = secrets.token_hex(16)
+        # Valid CSRF tokens, by the token cookie they were issued with
+        self._csrf_tokens: dict[str, str] = {}
+        self._window_start = 0.0
+        self._window_requests = 0
+        # Responses sent, by (method, route, status)
+        self.requests: dict[tuple[str, str, int], int] = {}
+
+        self._runner: Optional[web.AppRunner] = None
+        self._tempdir: Optional[tempfile.TemporaryDirectory] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        """Return host:port, the host to give PyUIProtectAlarms."""
+        return f"{self.host}:{self.port}"
+
+    def count(self, method: str, route: str, status: Optional[int] = None) -> int:
+        """Return how many responses were sent for a route, optionally only those with status."""
+        return sum(
+            count for (sent_method, sent_route, sent_status), count in self.requests.items()
+            if sent_method == method and sent_route == route and (status is None or sent_status == status)
+        )
+
+    def expire_tokens(self) -> None:
+        """Invalidate every token handed out so far, as if the console had restarted."""
+        self._secret = secrets.token_hex(16)
+        self._csrf_tokens.clear()
+
+    def _make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        automations_path = UIPROTECT_APIS[UIProtectApi.GET_AUTOMATIONS][UIPROTECT_API_PATH]
+        notifications_path = UIPROTECT_APIS[UIProtectApi.GET_NOTIFICATIONS][UIPROTECT_API_PATH]
+        app.router.add_post(UIPROTECT_APIS[UIProtectApi.LOGIN][UIPROTECT_API_PATH], self._handle_login)
+        app.router.add_get(automations_path, self._handle_api(UIProtectApi.GET_AUTOMATIONS))
+        app.router.add_get(automations_path + "/{id}", self._handle_api(UIProtectApi.GET_AUTOMATIONS))
+        app.router.add_patch(automations_path + "/{id}", self._handle_api(UIProtectApi.UPDATE_AUTOMATION))
+        app.router.add_get(notifications_path, self._handle_api(UIProtectApi.GET_NOTIFICATIONS))
+        app.router.add_patch(notifications_path + "/{id}", self._handle_api(UIProtectApi.UPDATE_NOTIFICATION))
+        app.router.add_get(UIPROTECT_APIS[UIProtectApi.GET_USERS][UIPROTECT_API_PATH],
+                           self._handle_api(UIProtectApi.GET_USERS))
+        app.router.add_get(UIPROTECT_APIS[UIProtectApi.GET_NVR][UIPROTECT_API_PATH],
+                           self._handle_api(UIProtectApi.GET_NVR))
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        response = await self._respond(request, handler)
+        key = (request.method, route, response.status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        return response
+
+    async def _respond(self, request: web.Request, handler) -> web.StreamResponse:
+        if self.latency or self.latency_jitter:
+            await asyncio.sleep(self.latency + self._rng.random() * self.latency_jitter)
+
+        if self.rate_limit:
+            now = time.monotonic()
+            if now - self._window_start >= 1:
+                self._window_start = now
+                self._window_requests = 0
+            self._window_requests += 1
+            if self._window_requests > self.rate_limit:
+                return web.json_response({"error": "Too many requests"}, status=429, headers={"Retry-After": "1"})
+
+        return await handler(request)
+
+    async def _handle_login(self, request: web.Request) -> web.Response:
+        credentials = await request.json()
+        if credentials.get("username") != SIMULATOR_USERNAME or credentials.get("password") != SIMULATOR_PASSWORD:
+            return web.json_response({"error": "Invalid username or password"}, status=401)
+
+        token = jwt.encode(
+            {"userId": self.console.users[0]["id"] if self.console.users else "admin",
+             "exp": int(time.time() + self.token_lifetime)},
+            self._secret,
+            algorithm="HS256",
+        )
+        csrf_token = secrets.token_hex(16)
+        self._csrf_tokens[token] = csrf_token
+        response = web.json_response({"username": SIMULATOR_USERNAME}, headers={CSRF_HEADER: csrf_token})
+        response.set_cookie(TOKEN_COOKIE, token, path="/", httponly=True, secure=True)
+        return response
+
+    def _is_authorized(self, request: web.Request) -> bool:
+        token = request.cookies.get(TOKEN_COOKIE)
+        if not token:
+            return False
+        try:
+            jwt.decode(token, self._secret, algorithms=["HS256"])
+        except jwt.PyJWTError:
+            return False
+        # Like the console, only reads are allowed without the CSRF token
+        return request.method == "GET" or request.headers.get(CSRF_HEADER) == self._csrf_tokens.get(token)
+
+    def _handle_api(self, api: UIProtectApi):
+        async def handle(request: web.Request) -> web.Response:
+            if not self._is_authorized(request):
+                return web.json_response({"error": "Unauthorized"}, status=401)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return web.json_response({"error": "Internal server error"}, status=500)
+
+            path = request.match_info.get("id")
+            if path is not None and request.query_string:
+                path = f"{path}?{request.query_string}"
+            body = await request.json() if request.can_read_body else None
+            response, status_code = self.console(api, path, body)
+            if response is None:
+                return web.json_response({"error": "Not found"}, status=status_code)
+            return web.Response(body=json.dumps(response).encode(), status=status_code,
+                                content_type="application/json")
+
+        return handle
+
+    async def async_start(self) -> None:
+        """Start serving on the running event loop."""
+        self._tempdir = tempfile.TemporaryDirectory()
+        cert_path, key_path = make_self_signed_cert(self._tempdir.name)
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(cert_path, key_path)
+
+        self._runner = web.AppRunner(self._make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, ssl_context=ssl_context)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        _LOGGER.info("NVR simulator serving %d automations and %d users on https://%s",
+                     len(self.console.automations), len(self.console.users), self.address)
+
+    async def async_stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._tempdir is not None:
+            self._tempdir.cleanup()
+            self._tempdir = None
+
+    def start(self) -> "NvrSimulator":
+        """Start serving from a background thread with its own event loop."""
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        failure: list[BaseException] = []
+
+        def run() -> None:
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.async_start())
+            except BaseException as ex:  # pylint: disable=broad-except
+                failure.append(ex)
+                return
+            finally:
+                started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="nvr-simulator", daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            raise failure[0]
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread started by start()."""
+        if self._loop is None or self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.async_stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    simulator = NvrSimulator(
+        SyntheticConsole(
+            automations=args.automations,
+            users=args.users,
+            dedicated_notifications=args.dedicated_notifications,
+            seed=args.seed,
+        ),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        token_lifetime=args.token_lifetime,
+        seed=args.seed,
+    )
+    await simulator.async_start()
+    print(f"Serving on https://{simulator.address} as {SIMULATOR_USERNAME} / {SIMULATOR_PASSWORD}, Ctrl+C to stop")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.async_stop()
+
+
+def main() -> None:
+    """Run the simulator until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--automations", type=int, default=500)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--dedicated-notifications", action="store_true",
+                        help="Serve the notifications endpoint instead of answering 404")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Up to this many more seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of API calls answered with a 500")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per second before answering 429")
+    parser.add_argument("--token-lifetime", type=float, default=3600, help="Seconds a login token is valid")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_async_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
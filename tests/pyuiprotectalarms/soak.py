@@ -0,0 +1,301 @@
+"""Concurrency soak test: many threads changing automations at once through the library, against the NVR simulator.
+
+Each operation is what a HomeAssistant automation flipping a switch does:
+enable or disable an automation, or turn its push or email notifications
+on or off. Operations go to a small set of automations so many of them
+race on the same object. The harness reports throughput and latency, then
+checks the console ended up where the writes, in the order the console
+received them, say it should:
+
+- enabled matches the last enable or disable written,
+- the name carries exactly one " (Disabled)" suffix when disabled, none otherwise,
+- the channels of every receiver match the last push and email writes,
+- the library's objects agree with the console.
+
+Run it on its own with::
+
+    python -m tests.pyuiprotectalarms.soak --operations 5000 --workers 32 --latency 0.005
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from urllib3.exceptions import InsecureRequestWarning
+
+from .imports import PyUIProtectAlarms, UIProtectApi
+from .nvrsimulator import SIMULATOR_PASSWORD, SIMULATOR_USERNAME, NvrSimulator
+from .synthetic import SyntheticConsole
+
+OPERATION_ENABLE = "enable"
+OPERATION_PUSH = "push"
+OPERATION_EMAIL = "email"
+DISABLED_SUFFIX = " (Disabled)"
+
+
+@dataclass(frozen=True)
+class SoakOperation:
+    """One change: set kind (enable, push or email) of an automation to value."""
+
+    automation_id: str
+    kind: str
+    value: bool
+
+
+@dataclass
+class SoakReport:
+    """What a soak run did and how the console ended up."""
+
+    operations: int = 0
+    errors: int = 0
+    # Operations whose update the console didn't accept
+    unwritten: int = 0
+    # Operations the console already held, so no update was sent, e.g. turning on push where it is on
+    skipped: int = 0
+    # Connections opened to the console, TLS handshake included
+    connections: int = 0
+    seconds: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    inconsistencies: list[str] = field(default_factory=list)
+    requests: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """Return the operations completed per second."""
+        return self.operations / self.seconds if self.seconds else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Return the latency, in seconds, below which percent of the operations completed."""
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+    def format(self) -> str:
+        """Return the report as text."""
+        lines = [
+            f"{self.operations} operations in {self.seconds:.2f} s, {self.throughput:.1f} per second",
+            f"Latency p50 {self.percentile(50) * 1000:.1f} ms, p99 {self.percentile(99) * 1000:.1f} ms,"
+            f" max {max(self.latencies, default=0) * 1000:.1f} ms",
+            f"{self.errors} raised, {self.unwritten} not written, {self.skipped} already held,"
+            f" {self.connections} connections opened",
+            "Responses: " + ", ".join(f"{key} {count}" for key, count in sorted(self.requests.items())),
+        ]
+        if self.inconsistencies:
+            lines.append(f"{len(self.inconsistencies)} inconsistencies:")
+            lines.extend(f"  {inconsistency}" for inconsistency in self.inconsistencies)
+        else:
+            lines.append("Final state consistent")
+        return "\n".join(lines)
+
+
+def receivers_of(details: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return the notification receivers of an automation."""
+    return [
+        receiver
+        for action in details.get("actions", [])
+        if action.get("type") == "SEND_NOTIFICATION"
+        for receiver in action.get("metadata", {}).get("receivers", [])
+    ]
+
+
+def generate_operations(
+    console: SyntheticConsole, operations: int, automations: int, channel_share: float, seed: int
+) -> list[SoakOperation]:
+    """Return operations spread over the first automations that notify someone."""
+    rng = random.Random(seed)
+    targets = [
+        automation_id for automation_id, details in console.automations.items() if receivers_of(details)
+    ][:automations]
+    return [
+        SoakOperation(
+            rng.choice(targets),
+            rng.choice((OPERATION_PUSH, OPERATION_EMAIL)) if rng.random() < channel_share else OPERATION_ENABLE,
+            rng.random() < 0.5,
+        )
+        for _ in range(operations)
+    ]
+
+
+class SoakRunner:
+    """Run operations from a pool of threads and check the result against the console."""
+
+    def __init__(self, simulator: NvrSimulator, workers: int = 16) -> None:
+        self.simulator = simulator
+        self.workers = workers
+        self.manager = PyUIProtectAlarms(simulator.address, SIMULATOR_USERNAME, SIMULATOR_PASSWORD)
+        self._current = threading.local()
+        # Operations whose update the console accepted, per automation, in the order it accepted them
+        self._written: dict[str, list[SoakOperation]] = {}
+        self._rejected: list[SoakOperation] = []
+        self._initial: dict[str, dict[str, Any]] = {}
+
+        call_uiprotect_api = self.manager.call_uiprotect_api
+
+        def recording_call(api: str, path: Optional[str] = None, json_object: Optional[dict] = None):
+            response, status_code = call_uiprotect_api(api, path, json_object)
+            operation = getattr(self._current, "operation", None)
+            if api == UIProtectApi.UPDATE_AUTOMATION and operation is not None:
+                if status_code == 200:
+                    # Recorded before the update lock is released, so in the order the console applied them
+                    self._written.setdefault(path, []).append(operation)
+                else:
+                    self._rejected.append(operation)
+            return response, status_code
+
+        self.manager.call_uiprotect_api = recording_call
+
+    def load(self) -> None:
+        """Load the console, and keep its starting state to check against."""
+        self.manager.load_automations()
+        self.manager.load_users()
+        self.manager.load_notifications()
+        self._initial = {
+            automation_id: {
+                "enable": details["enable"],
+                "channels": set(receivers[0]["channels"]) if (receivers := receivers_of(details)) else set(),
+            }
+            for automation_id, details in self.simulator.console.automations.items()
+        }
+
+    def _run_one(self, operation: SoakOperation) -> tuple[float, bool]:
+        self._current.operation = operation
+        start = time.perf_counter()
+        try:
+            if operation.kind == OPERATION_ENABLE:
+                self.manager.automations[operation.automation_id].enabled = operation.value
+            else:
+                notification = self.manager.notifications[operation.automation_id]
+                setattr(notification, f"{operation.kind}_enabled", operation.value)
+            return time.perf_counter() - start, True
+        except Exception:  # pylint: disable=broad-except
+            logging.getLogger(__name__).exception("%s failed", operation)
+            return time.perf_counter() - start, False
+        finally:
+            self._current.operation = None
+
+    def run(self, operations: list[SoakOperation]) -> SoakReport:
+        """Run the operations, workers at a time, and return the report."""
+        report = SoakReport(operations=len(operations))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="soak") as pool:
+            results = list(pool.map(self._run_one, operations))
+        report.seconds = time.perf_counter() - start
+
+        report.latencies = [latency for latency, _ in results]
+        report.errors = sum(1 for _, succeeded in results if not succeeded)
+        written = sum(len(writes) for writes in self._written.values())
+        report.unwritten = len(self._rejected)
+        report.skipped = report.operations - report.errors - written - report.unwritten
+        report.requests = {
+            f"{method} {route.rsplit('/', 1)[-1]} {status}": count
+            for (method, route, status), count in self.simulator.requests.items()
+        }
+        report.connections = sum(
+            endpoint["phases_seconds"]["tls"]["count"]
+            for endpoint in self.manager.stats.as_dict()["endpoints"].values()
+            if "tls" in endpoint.get("phases_seconds", {})
+        )
+        report.inconsistencies = self.check(compare_library=report.unwritten == 0 and report.errors == 0)
+        return report
+
+    def check(self, compare_library: bool = True) -> list[str]:
+        """Return how the console differs from what the accepted writes say it should hold.
+
+        The library's objects are only compared with the console when every
+        write was accepted, as a rejected one leaves them ahead of it.
+        """
+        inconsistencies = []
+        for automation_id, writes in self._written.items():
+            expected = self._initial[automation_id]
+            enable = expected["enable"]
+            channels = set(expected["channels"])
+            channels_written = False
+            for operation in writes:
+                if operation.kind == OPERATION_ENABLE:
+                    enable = operation.value
+                else:
+                    channels_written = True
+                    (channels.add if operation.value else channels.discard)(operation.kind)
+
+            details = self.simulator.console.automations[automation_id]
+            name = details["name"]
+            if details["enable"] is not enable:
+                inconsistencies.append(f"{automation_id}: enable is {details['enable']}, last write was {enable}")
+            if name.count(DISABLED_SUFFIX) != (0 if enable else 1) or (not enable and not name.endswith(DISABLED_SUFFIX)):
+                inconsistencies.append(f"{automation_id}: name {name!r} with enable {details['enable']}")
+            if channels_written:
+                for receiver in receivers_of(details):
+                    if set(receiver["channels"]) != channels:
+                        inconsistencies.append(
+                            f"{automation_id}: receiver {receiver['user']} has {sorted(receiver['channels'])},"
+                            f" writes left {sorted(channels)}"
+                        )
+
+            automation = self.manager.automations[automation_id]
+            if compare_library and (automation.enabled is not details["enable"] or automation.name != name):
+                inconsistencies.append(
+                    f"{automation_id}: library has {automation.name!r} enabled {automation.enabled},"
+                    f" console has {name!r} enabled {details['enable']}"
+                )
+        return inconsistencies
+
+
+def run_soak(
+    simulator: NvrSimulator,
+    operations: int = 2000,
+    workers: int = 16,
+    automations: int = 10,
+    channel_share: float = 0.3,
+    seed: int = 0,
+) -> SoakReport:
+    """Load the simulator's console, run operations on it from workers threads, and return the report."""
+    runner = SoakRunner(simulator, workers)
+    runner.load()
+    return runner.run(generate_operations(simulator.console, operations, automations, channel_share, seed))
+
+
+def main() -> None:
+    """Run a soak test against a simulator in this process and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=32, help="Threads changing automations at once")
+    parser.add_argument("--automations", type=int, default=10, help="Automations the operations are spread over")
+    parser.add_argument("--channel-share", type=float, default=0.3, help="Share of push and email changes")
+    parser.add_argument("--console-automations", type=int, default=500)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Up to this many more seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of API calls answered with a 500")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per second before answering 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    # The simulator's certificate is self-signed
+    warnings.simplefilter("ignore", InsecureRequestWarning)
+    simulator = NvrSimulator(
+        SyntheticConsole(automations=args.console_automations, users=args.users, seed=args.seed),
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    ).start()
+    try:
+        report = run_soak(
+            simulator, args.operations, args.workers, args.automations, args.channel_share, args.seed
+        )
+    finally:
+        simulator.stop()
+    print(report.format())
+    raise SystemExit(1 if report.inconsistencies else 0)
+
+
+if __name__ == "__main__":
+    main()
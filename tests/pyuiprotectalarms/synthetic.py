@@ -0,0 +1,250 @@
+"""Synthetic UIProtect console payloads at any size, for benchmarks and load tests.
+
+The payloads follow the shape of the automations, users and notifications a
+real console returns (see api_responses/automations_1.json), with names,
+conditions, schedules and receivers drawn from a seeded random generator, so
+the same sizes and seed always give the same console.
+"""
+import json
+import random
+from typing import Any, Optional
+
+from .imports import UIProtectApi
+
+CONDITION_SOURCES = (
+    "audio_alarm_co", "audio_alarm_smoke", "audio_alarm_siren", "audio_alarm_baby_cry",
+    "person", "vehicle", "animal", "package", "face_known", "face_unknown",
+    "license_plate_known", "license_plate_unknown", "line_crossed", "doorbell_ring", "motion",
+)
+LOCATIONS = ("Driveway", "Garage", "Front Door", "Back Yard", "Porch", "Side Gate", "Office", "Warehouse", "Lobby")
+SCHEDULE_VALUES = ("allAway", "someoneHome", "night", "weekdays", "weekends")
+CHANNEL_CHOICES = ((), ("push",), ("email",), ("push", "email"))
+FIRST_NAMES = ("Alex", "Sam", "Jordan", "Taylor", "Casey", "Morgan", "Riley", "Jamie", "Avery", "Quinn")
+LAST_NAMES = ("Smith", "Jones", "Garcia", "Chen", "Patel", "Kim", "Nguyen", "Lopez", "Brown", "Silva")
+
+
+def object_id(rng: random.Random) -> str:
+    """Return a random 24 hex digit id, like the console's object ids."""
+    return f"{rng.getrandbits(96):024x}"
+
+
+def generate_user(rng: random.Random, index: int) -> dict[str, Any]:
+    """Return a user as listed by the users endpoint."""
+    first_name = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last_name = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    return {
+        "id": object_id(rng),
+        "name": f"{first_name} {last_name}",
+        "firstName": first_name,
+        "lastName": last_name,
+        "email": f"{first_name.lower()}.{last_name.lower()}{index}@example.com",
+        "localUsername": f"{first_name.lower()}{index}",
+        "enableNotifications": True,
+        "role": "admin" if index == 0 else "viewer",
+        "modelKey": "user",
+    }
+
+
+def generate_automation(
+    rng: random.Random, index: int, user_ids: list[str], notification_ratio: float = 0.8
+) -> dict[str, Any]:
+    """Return an automation as listed by the automations endpoint.
+
+    notification_ratio of them send notifications to a random subset of the
+    users, the others trigger an alarm only.
+    """
+    source = CONDITION_SOURCES[index % len(CONDITION_SOURCES)]
+    location = LOCATIONS[(index // len(CONDITION_SOURCES)) % len(LOCATIONS)]
+    enabled = rng.random() > 0.1
+    name = f"{location} {source.replace('_', ' ').title()} {index}"
+
+    actions: list[dict[str, Any]] = []
+    if rng.random() < notification_ratio:
+        channels = list(rng.choice(CHANNEL_CHOICES))
+        receivers = [
+            {
+                "user": user_id,
+                "channels": channels,
+                "schedules": [
+                    {"schedule": {"type": "is", "unit": "location", "values": [rng.choice(SCHEDULE_VALUES)]}}
+                ] if rng.random() < 0.3 else [],
+            }
+            for user_id in rng.sample(user_ids, rng.randint(1, len(user_ids)))
+        ] if user_ids else []
+        actions.append({"type": "SEND_NOTIFICATION", "metadata": {"receivers": receivers}, "order": -1})
+    else:
+        actions.append({"type": "TRIGGER_ALARM", "metadata": {"duration": rng.choice((30, 60, 300))}, "order": 0})
+
+    return {
+        "name": name if enabled else f"{name} (Disabled)",
+        "enable": enabled,
+        "isCreatedBySystem": index < len(CONDITION_SOURCES),
+        "editable": True,
+        "sources": [{"device": object_id(rng), "type": "include"} for _ in range(rng.randint(0, 3))],
+        "conditions": [{"condition": {"type": "is", "source": source}}],
+        "schedules": [],
+        "actions": actions,
+        "userId": user_ids[0] if user_ids else None,
+        "status": {"lastExecutedAt": None, "total": rng.randint(0, 500)},
+        "cooldown": {"enable": rng.random() < 0.5, "timeout": 600000},
+        "id": object_id(rng),
+        "deleted": False,
+        "createdAt": 1730796185243 + index * 1000,
+    }
+
+
+class SyntheticConsole:
+    """A UIProtect console held in memory, answering calls like PyUIProtectAlarms.call_uiprotect_api.
+
+    Responses are decoded from JSON on every call, as from the network, so
+    the library never sees the console's own objects. prepare() decodes the
+    next list responses ahead of time, so benchmarks can leave the decoding
+    out. Updates are applied and echoed back. With dedicated_notifications
+    False, the notifications endpoint returns 404 and the library extracts
+    them from the automations. With partial_patch, an update of an automation
+    is merged into it, like Protect does; without, updates missing the name
+    or actions are rejected. version is what the NVR endpoint reports, None
+    for a console without it.
+    """
+
+    def __init__(
+        self,
+        automations: int = 500,
+        users: int = 10,
+        notification_ratio: float = 0.8,
+        dedicated_notifications: bool = False,
+        partial_patch: bool = True,
+        version: Optional[str] = "5.1.200",
+        seed: int = 0,
+    ) -> None:
+        self._rng = random.Random(seed)
+        self.partial_patch = partial_patch
+        self.version = version
+        self._notification_ratio = notification_ratio
+        self._next_index = automations
+        self.users = [generate_user(self._rng, index) for index in range(users)]
+        user_ids = [user["id"] for user in self.users]
+        self.automations = {
+            automation["id"]: automation
+            for automation in (
+                generate_automation(self._rng, index, user_ids, notification_ratio) for index in range(automations)
+            )
+        }
+        self.notifications: Optional[dict[str, dict[str, Any]]] = None
+        if dedicated_notifications:
+            self.notifications = {
+                automation_id: {
+                    "id": automation_id,
+                    "type": automation["name"],
+                    "name": automation["name"],
+                    "channels": list(self._rng.choice(CHANNEL_CHOICES)),
+                }
+                for automation_id, automation in self.automations.items()
+            }
+        self.calls: dict[str, int] = {}
+        self._encoded: dict[str, bytes] = {}
+        self._prepared: dict[str, Any] = {}
+
+    def mutate(self, fraction: float) -> list[str]:
+        """Change the name or enabled state of a fraction of the automations. Returns their ids."""
+        count = max(1, round(len(self.automations) * fraction))
+        changed = self._rng.sample(sorted(self.automations), count)
+        for automation_id in changed:
+            automation = self.automations[automation_id]
+            if self._rng.random() < 0.5:
+                automation["enable"] = not automation["enable"]
+            else:
+                automation["name"] = f"{automation['name']} *"
+        self._encoded.pop("automations", None)
+        self._prepared.pop("automations", None)
+        return changed
+
+    def replace(self, fraction: float) -> tuple[list[str], list[str]]:
+        """Delete a fraction of the automations and create as many new ones. Returns the removed and added ids."""
+        count = max(1, round(len(self.automations) * fraction))
+        removed = self._rng.sample(sorted(self.automations), count)
+        for automation_id in removed:
+            del self.automations[automation_id]
+            if self.notifications is not None:
+                self.notifications.pop(automation_id, None)
+
+        user_ids = [user["id"] for user in self.users]
+        added = []
+        for index in range(self._next_index, self._next_index + count):
+            automation = generate_automation(self._rng, index, user_ids, self._notification_ratio)
+            self.automations[automation["id"]] = automation
+            added.append(automation["id"])
+        self._next_index += count
+
+        self._encoded.clear()
+        self._prepared.clear()
+        return removed, added
+
+    def prepare(self) -> None:
+        """Decode the next automations, users and notifications responses now."""
+        self._prepared = {
+            "automations": self._decoded("automations", list(self.automations.values())),
+            "users": self._decoded("users", self.users),
+        }
+        if self.notifications is not None:
+            self._prepared["notifications"] = self._decoded("notifications", list(self.notifications.values()))
+
+    def _response(self, key: str, value: Any) -> Any:
+        prepared = self._prepared.pop(key, None)
+        return prepared if prepared is not None else self._decoded(key, value)
+
+    def _decoded(self, key: str, value: Any) -> Any:
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            encoded = self._encoded[key] = json.dumps(value).encode()
+        return json.loads(encoded)
+
+    def __call__(self, api: str, path: Optional[str] = None, json_object: Optional[dict] = None) -> tuple[Any, int]:
+        self.calls[api] = self.calls.get(api, 0) + 1
+
+        if api == UIProtectApi.GET_AUTOMATIONS:
+            if path is None:
+                return self._response("automations", list(self.automations.values())), 200
+            automation = self.automations.get(path)
+            return (json.loads(json.dumps(automation)), 200) if automation is not None else (None, 404)
+
+        if api == UIProtectApi.UPDATE_AUTOMATION:
+            if path not in self.automations:
+                return None, 404
+            if self.partial_patch:
+                automation = {**self.automations[path], **json.loads(json.dumps(json_object))}
+            elif "name" in json_object and "actions" in json_object:
+                automation = json.loads(json.dumps(json_object))
+            else:
+                return None, 400
+            self.automations[path] = automation
+            self._encoded.pop("automations", None)
+            self._prepared.pop("automations", None)
+            return json.loads(json.dumps(automation)), 200
+
+        if api == UIProtectApi.GET_NVR:
+            if self.version is None:
+                return None, 404
+            return {"id": "nvr", "name": "Synthetic NVR", "version": self.version}, 200
+
+        if api == UIProtectApi.GET_USERS:
+            return self._response("users", self.users), 200
+
+        if api == UIProtectApi.GET_NOTIFICATIONS:
+            if self.notifications is None:
+                return None, 404
+            return self._response("notifications", list(self.notifications.values())), 200
+
+        if api == UIProtectApi.UPDATE_NOTIFICATION:
+            notification_id = path.split("?", 1)[0] if path else None
+            if self.notifications is None or notification_id not in self.notifications:
+                return None, 404
+            self.notifications[notification_id] = json.loads(json.dumps(json_object))
+            self._encoded.pop("notifications", None)
+            self._prepared.pop("notifications", None)
+            return json.loads(json.dumps(json_object)), 200
+
+        if api == UIProtectApi.LOGIN:
+            return {"username": "USERNAME"}, 200
+
+        return None, 404
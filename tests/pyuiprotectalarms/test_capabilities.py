@@ -0,0 +1,113 @@
+"""Test probing what a console supports, and routing calls by it."""
+from dataclasses import replace
+
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectcapabilities import PyUIProtectCapabilities
+from .imports import PyUIProtectAlarms, UIProtectApi
+from .synthetic import SyntheticConsole
+
+
+def make_manager(console: SyntheticConsole) -> PyUIProtectAlarms:
+    manager = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+    manager.call_uiprotect_api = console
+    manager.load_automations()
+    return manager
+
+
+class TestProbe:
+    def test_probed_once_per_version(self):
+        """Test the probe runs once, only the version is read again, and a new version probes again."""
+        console = SyntheticConsole(automations=20, users=3)
+        manager = make_manager(console)
+        console.calls.clear()
+
+        capabilities = manager.probe_capabilities()
+        assert capabilities == PyUIProtectCapabilities("5.1.200", notifications_endpoint=False)
+        assert console.calls == {UIProtectApi.GET_NVR: 1, UIProtectApi.GET_NOTIFICATIONS: 1}
+
+        console.calls.clear()
+        assert manager.probe_capabilities() is capabilities
+        assert console.calls == {UIProtectApi.GET_NVR: 1}
+
+        console.version = "5.2.0"
+        console.notifications = {}
+        assert manager.probe_capabilities() == PyUIProtectCapabilities("5.2.0", notifications_endpoint=True)
+
+    def test_probe_only_reads(self):
+        """Test the probe sends no update, whatever the console runs."""
+        for version in ("5.1.200", "4.0.21", None):
+            console = SyntheticConsole(automations=5, users=3, version=version)
+            manager = make_manager(console)
+            console.calls.clear()
+
+            manager.probe_capabilities()
+
+            assert UIProtectApi.UPDATE_AUTOMATION not in console.calls
+
+    def test_partial_patch_never_guessed(self):
+        """Test partial updates are left unconfirmed whatever the version, so updates send the whole automation."""
+        for version in ("5.0.34", "6.1.0-beta.2", "4.9.3", None):
+            console = SyntheticConsole(automations=5, users=3, version=version)
+            assert make_manager(console).probe_capabilities().partial_patch is None
+
+    def test_cached_in_snapshot(self):
+        """Test a manager restored from a snapshot only reads the version while the console runs the same one."""
+        console = SyntheticConsole(automations=10, users=3)
+        manager = make_manager(console)
+        manager.probe_capabilities()
+
+        restored = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+        restored.call_uiprotect_api = console
+        assert restored.restore_snapshot(manager.export_snapshot())
+        console.calls.clear()
+
+        assert restored.probe_capabilities() == manager.capabilities
+        assert console.calls == {UIProtectApi.GET_NVR: 1}
+
+
+class TestRouting:
+    def test_missing_notifications_endpoint_skipped(self):
+        """Test a console known not to have the notifications endpoint isn't asked for it again."""
+        console = SyntheticConsole(automations=10, users=3)
+        manager = make_manager(console)
+        manager.load_users()
+        assert manager.load_notifications()
+        assert manager.capabilities.notifications_endpoint is False
+        notifications = manager.notifications.keys()
+        console.calls.clear()
+
+        assert manager.load_notifications()
+        assert UIProtectApi.GET_NOTIFICATIONS not in console.calls
+        assert notifications and manager.notifications.keys() == notifications
+
+    def test_full_updates_by_default(self):
+        """Test an update sends the whole automation, read first, as that is safe on a console replacing it."""
+        console = SyntheticConsole(automations=10, users=3, partial_patch=False)
+        manager = make_manager(console)
+        manager.probe_capabilities()
+        automation = next(iter(manager.automations.values()))
+        actions = console.automations[automation.id]["actions"]
+        console.calls.clear()
+
+        automation.enabled = not automation.enabled
+
+        assert console.calls == {UIProtectApi.GET_AUTOMATIONS: 1, UIProtectApi.UPDATE_AUTOMATION: 1}
+        assert console.automations[automation.id]["enable"] is automation.enabled
+        assert console.automations[automation.id]["actions"] == actions
+
+    def test_partial_updates_once_confirmed(self):
+        """Test a console confirmed to take partial updates is sent only the changed fields, without a read first."""
+        console = SyntheticConsole(automations=10, users=3)
+        manager = make_manager(console)
+        manager.capabilities = replace(manager.probe_capabilities(), partial_patch=True)
+        automation = next(iter(manager.automations.values()))
+        sent = []
+        manager.call_uiprotect_api = lambda api, path=None, json_object=None: (
+            sent.append((api, json_object)) or console(api, path, json_object)
+        )
+
+        automation.enabled = not automation.enabled
+
+        assert [api for api, _ in sent] == [UIProtectApi.UPDATE_AUTOMATION]
+        assert set(sent[0][1]) == {"enable", "name"}
+        assert console.automations[automation.id]["enable"] is automation.enabled
+        assert console.automations[automation.id]["actions"] == automation.raw_details["actions"]
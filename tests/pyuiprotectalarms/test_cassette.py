@@ -0,0 +1,102 @@
+"""Test recording exchanges with the NVR simulator as cassettes, and replaying them without it."""
+import json
+import time
+
+import pytest
+
+from custom_components.uiprotectalarms.pyuiprotectalarms.cassette import (
+    REPLAY_TOKEN,
+    CassetteError,
+    recording,
+    replaying,
+)
+from custom_components.uiprotectalarms.pyuiprotectalarms.helpers import REDACTED, Helpers
+from custom_components.uiprotectalarms.pyuiprotectalarms.transport import TimedHTTPAdapter
+from .imports import PyUIProtectAlarms
+from .nvrsimulator import SIMULATOR_PASSWORD, SIMULATOR_USERNAME
+
+REPLAY_HOST = "192.168.1.123"
+
+
+def load_everything(manager: PyUIProtectAlarms) -> None:
+    """Load automations, users and notifications."""
+    manager.load_automations()
+    manager.load_users()
+    manager.load_notifications()
+
+
+@pytest.fixture
+def cassette_path(nvr_simulator, tmp_path):
+    """Record a full load and one toggle against the simulator, then stop it."""
+    nvr_simulator.latency = 0.02
+    path = str(tmp_path / "cassette.json")
+    manager = PyUIProtectAlarms(nvr_simulator.address, SIMULATOR_USERNAME, SIMULATOR_PASSWORD)
+    with recording(path):
+        load_everything(manager)
+        automation = next(iter(manager.automations.values()))
+        automation.enabled = not automation.enabled
+    nvr_simulator.stop()
+    return path
+
+
+class TestCassette:
+    """Test recording, redaction and replay."""
+
+    def test_record_redacts(self, cassette_path, nvr_simulator):
+        """Test the cassette holds every exchange, without credentials, tokens, emails or the console's address."""
+        with open(cassette_path, encoding="utf-8") as cassette_file:
+            text = cassette_file.read()
+        cassette = json.loads(text)
+
+        exchanges = [(item["request"]["method"], item["response"]["status"]) for item in cassette["interactions"]]
+        assert exchanges[0] == ("POST", 200)
+        assert len(exchanges) == 6
+        assert SIMULATOR_PASSWORD not in text
+        assert "@example.com" not in text
+        assert nvr_simulator.address not in text
+
+        login = cassette["interactions"][0]
+        assert login["request"]["body"]["password"] == REDACTED
+        assert login["response"]["cookies"] == {"TOKEN": REPLAY_TOKEN}
+        assert login["response"]["headers"]["X-CSRF-Token"] == REDACTED
+        assert all(item["duration"] >= 0.02 for item in cassette["interactions"])
+
+    def test_replay(self, cassette_path, nvr_simulator):
+        """Test a new manager loads and toggles from the cassette alone, logging in once."""
+        recorded = {automation_id: dict(details) for automation_id, details in nvr_simulator.console.automations.items()}
+        manager = PyUIProtectAlarms(REPLAY_HOST, SIMULATOR_USERNAME, SIMULATOR_PASSWORD)
+
+        with replaying(cassette_path) as player:
+            load_everything(manager)
+            assert player.played == 4
+            assert set(manager.automations) == set(recorded)
+            assert len(manager.users) == 3
+            assert manager.is_authenticated()
+
+            automation = next(iter(manager.automations.values()))
+            automation.enabled = not automation.enabled
+            assert player.played == 6
+
+        # The session goes back to the network afterwards
+        assert isinstance(Helpers.get_session().get_adapter("https://"), TimedHTTPAdapter)
+
+    def test_replay_timing(self, cassette_path):
+        """Test realtime replay takes as long as the recording, and fast replay doesn't."""
+        for realtime in (True, False):
+            manager = PyUIProtectAlarms(REPLAY_HOST, SIMULATOR_USERNAME, SIMULATOR_PASSWORD)
+            start = time.perf_counter()
+            with replaying(cassette_path, realtime=realtime):
+                load_everything(manager)
+            elapsed = time.perf_counter() - start
+            if realtime:
+                assert elapsed >= 0.08
+            else:
+                assert elapsed < 0.08
+
+    def test_unrecorded_request(self, cassette_path):
+        """Test a request the cassette has no response for raises CassetteError."""
+        manager = PyUIProtectAlarms(REPLAY_HOST, SIMULATOR_USERNAME, SIMULATOR_PASSWORD)
+        with replaying(cassette_path):
+            manager.authenticate()
+            with pytest.raises(CassetteError):
+                manager.refresh_automation("unknown")
@@ -5,10 +5,13 @@ All tests inherit from the TestBase class which contains the fixtures
 and methods needed to run the tests.
 """
 # import utils
+import json
 import logging
+from concurrent.futures import Future
 from unittest.mock import call
 from .testbase import TestBase
-from .imports import UIProtectApi
+from .imports import UIProtectApi, PyUIProtectAlarms, PyUIProtectChanges
+from .call_json import get_response_from_file
 
 
 logger = logging.getLogger(__name__)
@@ -35,7 +38,7 @@ class TestGeneralAPI(TestBase):
 
         # Simulate a server-side change by modifying the raw_details locally
         # (as if they drifted from what the server actually holds).
-        original_raw = automation._raw_details.copy()
+        original_raw = automation.raw_details.copy()
 
         # Disable the automation via the setter
         automation.enabled = False
@@ -88,3 +91,119 @@ class TestGeneralAPI(TestBase):
                      if c[0][0] == UIProtectApi.GET_AUTOMATIONS
                      and len(c[0]) > 1 and c[0][1] == co_alarm_id]
         assert len(get_calls) >= 1, "Expected a GET refresh call when re-enabling"
+
+    def test_reload_reports_added_and_removed_automations(self):
+        """Test a refresh reports new and deleted rules and releases deleted ones."""
+
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+
+        co_alarm_id = "6729da9901584d03e4001889"
+        removed_automation = self.uiProtectApiClient.automations[co_alarm_id]
+        removed_automation.add_attr_callback(lambda: None)
+
+        reported_changes = []
+        remove_callback = self.uiProtectApiClient.add_change_callback(reported_changes.append)
+
+        automations = [automation for automation in get_response_from_file("automations_1.json")
+                       if automation["id"] != co_alarm_id]
+        automations.append({"id": "new_rule", "name": "New Rule", "enable": True, "actions": []})
+        self.mock_api.side_effect = lambda *args, **kwargs: (automations, 200)
+        self.uiProtectApiClient.load_automations()
+
+        assert len(reported_changes) == 1
+        assert list(reported_changes[0].added_automations) == ["new_rule"]
+        assert list(reported_changes[0].removed_automations) == [co_alarm_id]
+        assert co_alarm_id not in self.uiProtectApiClient.automations
+        assert removed_automation.raw_details is None
+        assert not removed_automation._subscriptions
+
+        # Nothing changed, so nothing is reported
+        self.uiProtectApiClient.load_automations()
+        assert len(reported_changes) == 1
+
+        remove_callback()
+        automations.pop()
+        self.uiProtectApiClient.load_automations()
+        assert len(reported_changes) == 1
+
+    def test_removed_automation_released_once_listener_done(self):
+        """Test a removed rule is only released once the future a change callback returned is done."""
+
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+
+        co_alarm_id = "6729da9901584d03e4001889"
+        removed_automation = self.uiProtectApiClient.automations[co_alarm_id]
+        listener_done = Future()
+        self.uiProtectApiClient.add_change_callback(lambda changes: listener_done)
+
+        automations = [automation for automation in get_response_from_file("automations_1.json")
+                       if automation["id"] != co_alarm_id]
+        self.mock_api.side_effect = lambda *args, **kwargs: (automations, 200)
+        self.uiProtectApiClient.load_automations()
+
+        assert co_alarm_id not in self.uiProtectApiClient.automations
+        assert removed_automation.raw_details is not None
+
+        listener_done.set_result(None)
+        assert removed_automation.raw_details is None
+
+    def test_snapshot_round_trip(self):
+        """Test a snapshot restores automations and notifications without API calls."""
+
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        self.uiProtectApiClient.load_notifications()
+
+        snapshot = json.loads(json.dumps(self.uiProtectApiClient.export_snapshot()))
+        assert snapshot["users"] == [{"id": "**USERID1**", "name": "User 1"}]
+        assert all("status" not in automation for automation in snapshot["automations"])
+
+        restored = PyUIProtectAlarms(username='USERNAME', password='PASSWORD', host='192.168.1.123')
+        self.mock_api.reset_mock()
+        assert restored.restore_snapshot(snapshot)
+        assert not self.mock_api.called
+
+        assert restored.automations.keys() == self.uiProtectApiClient.automations.keys()
+        assert restored.notifications.keys() == self.uiProtectApiClient.notifications.keys()
+        co_alarm = restored.automations["6729da9901584d03e4001889"]
+        assert co_alarm.name == "CO Alarm"
+        assert co_alarm.enabled is True
+
+        assert not restored.restore_snapshot({"version": 0, "automations": snapshot["automations"]})
+
+    def test_refresh_automation(self):
+        """Test refreshing single automations skips unchanged ones and drops deleted ones."""
+
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+
+        co_alarm_id = "6729da9901584d03e4001889"
+        co_alarm = self.uiProtectApiClient.automations[co_alarm_id]
+        callbacks = []
+        co_alarm.add_attr_callback(lambda: callbacks.append(co_alarm_id))
+
+        summary = PyUIProtectChanges()
+        assert self.uiProtectApiClient.refresh_automation(co_alarm_id, summary=summary)
+        assert list(summary.unchanged_automations) == [co_alarm_id]
+        assert not callbacks
+
+        assert self.uiProtectApiClient.refresh_automation(co_alarm_id, force=True, summary=summary)
+        assert list(summary.updated_automations) == [co_alarm_id]
+        assert callbacks == [co_alarm_id]
+
+        changed = {**co_alarm.raw_details, "enable": False}
+        self.mock_api.side_effect = lambda *args, **kwargs: (changed, 200)
+        summary = PyUIProtectChanges()
+        assert self.uiProtectApiClient.refresh_automation(co_alarm_id, summary=summary)
+        assert summary.summary()["automations"] == {"added": [], "updated": [co_alarm_id], "removed": [], "unchanged": 0}
+        assert co_alarm.enabled is False
+
+        self.mock_api.side_effect = lambda *args, **kwargs: (None, 404)
+        assert self.uiProtectApiClient.refresh_automation(co_alarm_id, summary=summary)
+        assert list(summary.removed_automations) == [co_alarm_id]
+        assert co_alarm_id not in self.uiProtectApiClient.automations
+
+        self.mock_api.side_effect = lambda *args, **kwargs: (None, 0)
+        assert not self.uiProtectApiClient.refresh_automation("another_rule")
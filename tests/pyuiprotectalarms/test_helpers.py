@@ -43,4 +43,36 @@ class TestHelpers:
         expired_token = jwt.encode(expired_payload, secret, algorithm='HS256')
 
         decoded_expired = Helpers.decode_token_cookie(expired_token)
-        assert decoded_expired is None
\ No newline at end of file
+        assert decoded_expired is None
+
+    def test_shared_session_keeps_no_cookies(self):
+        """Test API calls share one session, and cookies from a console are not kept."""
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        import threading
+
+        class CookieHandler(BaseHTTPRequestHandler):
+            """Answer every request with a session cookie."""
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Send a cookie and an empty body."""
+                self.send_response(200)
+                self.send_header("Set-Cookie", "TOKEN=abcd1234; Path=/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                """Keep the test output quiet."""
+
+        server = HTTPServer(("127.0.0.1", 0), CookieHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}"
+            response = Helpers.call_api(url, "/", "get", {})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert Helpers.get_session() is Helpers.get_session()
+        assert response.cookies.get("TOKEN") == "abcd1234"
+        assert len(Helpers.get_session().cookies) == 0
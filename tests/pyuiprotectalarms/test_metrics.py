@@ -0,0 +1,78 @@
+"""Tests for the metrics registry and its Prometheus rendering."""
+import time
+
+import pytest
+
+from custom_components.uiprotectalarms.pyuiprotectalarms.metrics import MetricsRegistry, render_prometheus
+
+
+class TestMetrics:
+    """Test counters, gauges, histograms and the text exposition."""
+
+    def test_render_prometheus(self):
+        """Test samples render with constant and child labels, and histograms are cumulative."""
+        registry = MetricsRegistry({"console": "nvr1"})
+        requests = registry.counter("test_requests", "Requests made", ("endpoint",))
+        requests.labels("get").inc()
+        requests.labels("get").inc(2)
+        registry.gauge("test_entities", "Entities").labels().set(5)
+        latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0)).labels()
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+
+        assert render_prometheus([registry]).splitlines() == [
+            "# HELP test_requests Requests made",
+            "# TYPE test_requests counter",
+            'test_requests_total{console="nvr1",endpoint="get"} 3',
+            "# HELP test_entities Entities",
+            "# TYPE test_entities gauge",
+            'test_entities{console="nvr1"} 5',
+            "# HELP test_latency_seconds Latency",
+            "# TYPE test_latency_seconds histogram",
+            'test_latency_seconds_bucket{console="nvr1",le="0.1"} 1',
+            'test_latency_seconds_bucket{console="nvr1",le="1"} 2',
+            'test_latency_seconds_bucket{console="nvr1",le="+Inf"} 3',
+            'test_latency_seconds_sum{console="nvr1"} 5.55',
+            'test_latency_seconds_count{console="nvr1"} 3',
+        ]
+
+    def test_families_merged_across_consoles(self):
+        """Test each family is described once, with the samples of every console."""
+        registries = [MetricsRegistry({"console": console}) for console in ("nvr1", 'nv"r2')]
+        for registry in registries:
+            registry.counter("test_logins", "Logins").labels().inc()
+
+        lines = render_prometheus(registries).splitlines()
+        assert lines.count("# TYPE test_logins counter") == 1
+        assert 'test_logins_total{console="nvr1"} 1' in lines
+        assert 'test_logins_total{console="nv\\"r2"} 1' in lines
+
+    def test_registration(self):
+        """Test families are shared by name, and conflicting registrations and labels are rejected."""
+        registry = MetricsRegistry()
+        family = registry.counter("test_calls", "Calls", ("endpoint",))
+        assert registry.counter("test_calls", "Calls", ("endpoint",)) is family
+        assert family.labels("get") is family.labels("get")
+
+        with pytest.raises(ValueError):
+            registry.gauge("test_calls", "Calls", ("endpoint",))
+        with pytest.raises(ValueError):
+            family.labels("get", "extra")
+
+    def test_recording_is_cheap(self):
+        """Test recording on a pre-bound child is fast enough for the request path."""
+        registry = MetricsRegistry()
+        counter = registry.counter("test_fast", "Fast").labels()
+        histogram = registry.histogram("test_fast_seconds", "Fast").labels()
+
+        start = time.perf_counter()
+        for _ in range(100_000):
+            counter.inc()
+            histogram.observe(0.2)
+        elapsed = time.perf_counter() - start
+
+        assert counter.value == 100_000
+        assert histogram.count == 100_000
+        # Well under a microsecond each on a normal machine; leave plenty of slack for CI
+        assert elapsed < 2.0
@@ -0,0 +1,72 @@
+"""Test the library end to end over HTTP against the NVR simulator."""
+import pytest
+
+from .imports import NotAuthorized, NvrError, PyUIProtectAlarms, UIProtectApi
+from .nvrsimulator import SIMULATOR_PASSWORD, SIMULATOR_USERNAME
+
+AUTOMATIONS_ROUTE = "/proxy/protect/api/automations"
+AUTOMATION_ROUTE = "/proxy/protect/api/automations/{id}"
+LOGIN_ROUTE = "/api/auth/login"
+
+
+def make_manager(nvr_simulator, password: str = SIMULATOR_PASSWORD) -> PyUIProtectAlarms:
+    """Return a manager pointed at the simulator."""
+    return PyUIProtectAlarms(nvr_simulator.address, SIMULATOR_USERNAME, password)
+
+
+class TestNvrSimulator:
+    """Test logins, loads, updates and failures over real HTTP."""
+
+    def test_login_and_load(self, nvr_simulator):
+        """Test logging in, loading everything and toggling an automation with the cookie and CSRF token."""
+        manager = make_manager(nvr_simulator)
+
+        assert manager.authenticate()
+        assert manager.load_automations()
+        assert manager.load_users()
+        assert manager.load_notifications()
+        assert len(manager.automations) == 50
+        assert len(manager.users) == 3
+        assert manager.notifications
+
+        automation = next(iter(manager.automations.values()))
+        enabled = automation.enabled
+        automation.enabled = not enabled
+
+        assert nvr_simulator.console.automations[automation.id]["enable"] is (not enabled)
+        assert nvr_simulator.count("PATCH", AUTOMATION_ROUTE, 200) == 1
+        # Loaded with one login, and the token was reused for every call
+        assert nvr_simulator.count("POST", LOGIN_ROUTE) == 1
+        # The connection was set up, TLS handshake included, for the login and then kept alive
+        endpoints = manager.stats.as_dict()["endpoints"]
+        assert endpoints["login"]["phases_seconds"]["tls"]["count"] == 1
+        assert endpoints["get_automations"]["phases_seconds"]["tls"]["count"] == 0
+
+    def test_wrong_password(self, nvr_simulator):
+        """Test a rejected login raises NotAuthorized."""
+        with pytest.raises(NotAuthorized):
+            make_manager(nvr_simulator, password="wrong").authenticate()
+
+    def test_expired_token(self, nvr_simulator):
+        """Test a token the console no longer accepts is replaced by logging in again."""
+        manager = make_manager(nvr_simulator)
+        manager.authenticate()
+        nvr_simulator.expire_tokens()
+
+        assert manager.load_automations()
+        assert nvr_simulator.count("GET", AUTOMATIONS_ROUTE, 401) == 1
+        assert nvr_simulator.count("POST", LOGIN_ROUTE, 200) == 2
+
+    def test_throttled_and_failing(self, nvr_simulator):
+        """Test 429s and 500s come back as status codes, and fail a full load with NvrError."""
+        manager = make_manager(nvr_simulator)
+        manager.authenticate()
+
+        nvr_simulator.rate_limit = 1
+        statuses = {manager.call_uiprotect_api(UIProtectApi.GET_USERS)[1] for _ in range(5)}
+        assert 429 in statuses
+
+        nvr_simulator.rate_limit = 0
+        nvr_simulator.error_rate = 1.0
+        with pytest.raises(NvrError):
+            manager.load_automations()
@@ -0,0 +1,195 @@
+"""Test the receiver matrix and channel changes compiled from it."""
+from concurrent.futures import ThreadPoolExecutor
+
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectreceivers import (
+    CHANNEL_BITS,
+    RECEIVER,
+    PyUIProtectReceiverMatrix,
+    notification_receivers,
+    receiver_field,
+    with_channel,
+)
+from .imports import PyUIProtectAlarms, UIProtectApi
+from .synthetic import SyntheticConsole
+
+
+def make_manager(console: SyntheticConsole) -> PyUIProtectAlarms:
+    manager = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+    manager.call_uiprotect_api = console
+    manager.load_automations()
+    manager.load_users()
+    manager.load_notifications()
+    return manager
+
+
+def console_channels(console: SyntheticConsole) -> dict[tuple[str, str], set[str]]:
+    """Return the channels of every receiver on the console, by automation and user."""
+    return {
+        (automation_id, receiver["user"]): set(receiver["channels"])
+        for automation_id, details in console.automations.items()
+        for receiver in notification_receivers(details)
+    }
+
+
+class TestReceiverMatrix:
+    def test_cells_match_payloads(self):
+        """Test every cell holds the receiver's channels, and users who aren't receivers have none."""
+        console = SyntheticConsole(automations=100, users=5, notification_ratio=0.7)
+        manager = make_manager(console)
+
+        for automation in manager.automations.values():
+            receivers = {receiver["user"]: receiver for receiver in notification_receivers(automation.raw_details)}
+            for user_id in manager.users:
+                cell = manager.receivers.cell(automation, user_id)
+                if user_id not in receivers:
+                    assert cell == 0
+                    continue
+                assert cell & RECEIVER
+                for channel, bit in CHANNEL_BITS.items():
+                    assert bool(cell & bit) == (channel in receivers[user_id]["channels"])
+
+    def test_rows_follow_updates(self):
+        """Test a row is compiled again only once its automation holds new details."""
+        console = SyntheticConsole(automations=20, users=3, notification_ratio=1.0)
+        manager = make_manager(console)
+        automation = next(iter(manager.automations.values()))
+        row = manager.receivers.row(automation)
+        assert manager.receivers.row(automation) is row
+
+        user_id = next(notification_receivers(automation.raw_details))["user"]
+        enabled = not manager.receivers.is_enabled(automation, user_id, "push")
+        assert manager.set_notification_channel("push", enabled, [user_id], [automation.id]) == 1
+        assert manager.receivers.is_enabled(automation, user_id, "push") is enabled
+
+        manager.refresh_automation(automation.id, force=True)
+        assert manager.receivers.is_enabled(automation, user_id, "push") is enabled
+
+
+    def test_rows_compiled_concurrently(self):
+        """Test rows compiled from several threads at once agree with the payloads."""
+        console = SyntheticConsole(automations=200, users=8, notification_ratio=0.7)
+        manager = make_manager(console)
+        automations = list(manager.automations.values())
+        matrix = PyUIProtectReceiverMatrix()
+
+        def compile_rows(start: int) -> None:
+            # Each thread starts at a different automation, so they race on new users and rows
+            for automation in automations[start:] + automations[:start]:
+                matrix.row(automation)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(compile_rows, range(0, len(automations), 25)))
+
+        assert sorted(matrix.user_ids) == sorted({receiver["user"] for automation in automations
+                                                   for receiver in notification_receivers(automation.raw_details)})
+        for automation in automations:
+            for user_id in manager.users:
+                assert matrix.cell(automation, user_id) == manager.receivers.cell(automation, user_id)
+
+
+class TestChannelUpdates:
+    def test_mute_user_everywhere(self):
+        """Test muting push for one user only updates the automations where it was on, and leaves the rest alone."""
+        console = SyntheticConsole(automations=200, users=5, notification_ratio=0.7)
+        manager = make_manager(console)
+        user_id = next(iter(manager.users))
+        before = console_channels(console)
+        expected = sum(1 for (_, user), channels in before.items() if user == user_id and "push" in channels)
+        console.calls.clear()
+
+        assert manager.set_notification_channel("push", False, [user_id]) == expected
+        assert console.calls.get(UIProtectApi.UPDATE_AUTOMATION, 0) == expected
+
+        after = console_channels(console)
+        for key, channels in before.items():
+            assert after[key] == (channels - {"push"} if key[1] == user_id else channels)
+        assert not any(manager.receivers.is_enabled(automation, user_id, "push")
+                       for automation in manager.automations.values())
+
+        # Nothing left to change
+        console.calls.clear()
+        assert manager.set_notification_channel("push", False, [user_id]) == 0
+        assert not console.calls
+
+    def test_notification_switch_keeps_other_channels(self):
+        """Test turning a channel on through a notification keeps each receiver's other channel."""
+        console = SyntheticConsole(automations=50, users=4, notification_ratio=1.0)
+        manager = make_manager(console)
+        automation_id = next(
+            automation_id for automation_id, details in console.automations.items()
+            if not {"email"} <= set(next(notification_receivers(details))["channels"])
+        )
+        # Give the first receiver push, so the receivers differ
+        first = next(notification_receivers(console.automations[automation_id]))
+        first["channels"] = ["push"]
+        manager.refresh_automation(automation_id)
+        before = [set(receiver["channels"]) for receiver in notification_receivers(console.automations[automation_id])]
+
+        manager.notifications[automation_id].email_enabled = True
+
+        after = [set(receiver["channels"]) for receiver in notification_receivers(console.automations[automation_id])]
+        assert after == [channels | {"email"} for channels in before]
+        assert manager.notifications[automation_id].email_enabled is True
+
+
+class TestReceiverFields:
+    def test_changed_fields(self):
+        """Test only the cells that differ are reported, as the user's cell and each changed channel."""
+        console = SyntheticConsole(automations=10, users=3, notification_ratio=1.0)
+        manager = make_manager(console)
+        automation = next(iter(manager.automations.values()))
+        receiver = next(notification_receivers(automation.raw_details))
+        user_id = receiver["user"]
+        push = "push" in receiver["channels"]
+
+        after = with_channel(automation.raw_details, "push", not push, {user_id})
+        assert manager.receivers.changed_fields(automation.raw_details, after) == [receiver_field(user_id, "push")]
+        assert manager.receivers.changed_fields(automation.raw_details, automation.raw_details) == []
+
+        removed = {**automation.raw_details, "actions": []}
+        assert receiver_field(user_id) in manager.receivers.changed_fields(automation.raw_details, removed)
+
+    def test_only_affected_user_wakes(self):
+        """Test changing one user's channel only runs the callbacks subscribed to that user's cell."""
+        console = SyntheticConsole(automations=10, users=4, notification_ratio=1.0)
+        manager = make_manager(console)
+        automation = next(iter(manager.automations.values()))
+        user_ids = [receiver["user"] for receiver in notification_receivers(automation.raw_details)]
+        calls = {user_id: [] for user_id in user_ids}
+        for user_id in user_ids:
+            automation.add_attr_callback(
+                lambda user_id=user_id: calls[user_id].append(1),
+                (receiver_field(user_id), receiver_field(user_id, "email")),
+            )
+
+        enabled = not manager.receivers.is_enabled(automation, user_ids[0], "email")
+        assert manager.set_notification_channel("email", enabled, [user_ids[0]], [automation.id]) == 1
+
+        assert calls[user_ids[0]]
+        assert not any(calls[user_id] for user_id in user_ids[1:])
+
+    def test_receivers_change_reported(self):
+        """Test an automation is reported when a user stops or starts receiving it, and not for a channel change."""
+        console = SyntheticConsole(automations=10, users=3, notification_ratio=1.0)
+        manager = make_manager(console)
+        reported = []
+        manager.add_change_callback(lambda changes: reported.append(set(changes.receivers_changed_automations)))
+        automation = next(iter(manager.automations.values()))
+        user_id = next(notification_receivers(automation.raw_details))["user"]
+
+        enabled = not manager.receivers.is_enabled(automation, user_id, "push")
+        assert manager.set_notification_channel("push", enabled, [user_id], [automation.id]) == 1
+        assert not reported
+
+        action = next(action for action in console.automations[automation.id]["actions"]
+                      if "receivers" in action.get("metadata", {}))
+        receivers = action["metadata"]["receivers"]
+        action["metadata"]["receivers"] = [receiver for receiver in receivers if receiver["user"] != user_id]
+        manager.refresh_automation(automation.id)
+        assert reported == [{automation.id}]
+        assert not manager.receivers.cell(automation, user_id) & RECEIVER
+
+        action["metadata"]["receivers"] = receivers
+        manager.refresh_automation(automation.id)
+        assert reported == [{automation.id}, {automation.id}]
+        assert manager.receivers.cell(automation, user_id) & RECEIVER
@@ -0,0 +1,35 @@
+"""Test concurrent updates of the same automations through the library, against the NVR simulator."""
+from .soak import DISABLED_SUFFIX, OPERATION_ENABLE, SoakOperation, SoakRunner, generate_operations
+
+
+class TestSoak:
+    """Run a short soak and check nothing written was lost."""
+
+    def test_concurrent_updates_are_consistent(self, nvr_simulator):
+        """Test enables, disables and channel changes racing on a few automations all land, last write winning."""
+        runner = SoakRunner(nvr_simulator, workers=8)
+        runner.load()
+        operations = generate_operations(nvr_simulator.console, 300, automations=4, channel_share=0.4, seed=1)
+
+        report = runner.run(operations)
+
+        assert report.errors == 0
+        assert report.unwritten == 0
+        assert len(report.latencies) == 300
+        assert report.percentile(50) <= report.percentile(99)
+        # Channel changes the console already held send nothing
+        assert nvr_simulator.count("PATCH", "/proxy/protect/api/automations/{id}", 200) == 300 - report.skipped
+        assert report.inconsistencies == [], report.format()
+
+    def test_check_finds_lost_suffix(self, nvr_simulator):
+        """Test the consistency check reports a disabled automation whose name lost its suffix."""
+        runner = SoakRunner(nvr_simulator, workers=2)
+        runner.load()
+        automation_id = generate_operations(nvr_simulator.console, 1, automations=1, channel_share=0, seed=0)[0].automation_id
+        runner.run([SoakOperation(automation_id, OPERATION_ENABLE, False)])
+        assert runner.check() == []
+
+        details = nvr_simulator.console.automations[automation_id]
+        details["name"] = details["name"].removesuffix(DISABLED_SUFFIX)
+
+        assert any("name" in inconsistency for inconsistency in runner.check())
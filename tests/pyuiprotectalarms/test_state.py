@@ -0,0 +1,106 @@
+"""Test the manager publishes its state as immutable versions."""
+import threading
+
+import pytest
+from custom_components.uiprotectalarms.pyuiprotectalarms import PyUIProtectAlarms
+from .synthetic import SyntheticConsole
+from .testbase import TestBase
+from .call_json import get_response_from_file
+
+CO_ALARM_ID = "6729da9901584d03e4001889"
+
+
+class TestState(TestBase):
+    def test_refresh_publishes_new_version(self):
+        """Test a refresh swaps in a new version and leaves the previous one untouched."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        before = self.uiProtectApiClient.state
+        assert before.version == 1
+
+        automations = [automation for automation in get_response_from_file("automations_1.json")
+                       if automation["id"] != CO_ALARM_ID]
+        self.mock_api.side_effect = lambda *args, **kwargs: (automations, 200)
+        self.uiProtectApiClient.load_automations()
+
+        after = self.uiProtectApiClient.state
+        assert after.version == 2
+        assert CO_ALARM_ID in before.automations
+        assert len(before.automations) == 33
+        assert CO_ALARM_ID not in after.automations
+
+        # Nothing changed, nothing published
+        self.uiProtectApiClient.load_automations()
+        assert self.uiProtectApiClient.state is after
+
+    def test_published_state_is_read_only(self):
+        """Test the published maps and records can't be changed in place."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        state = self.uiProtectApiClient.state
+
+        with pytest.raises(TypeError):
+            state.automations["new_rule"] = None
+        with pytest.raises(AttributeError):
+            state.version = 0
+        with pytest.raises(AttributeError):
+            state.automations[CO_ALARM_ID].record.enabled = False
+
+    def test_update_swaps_record(self):
+        """Test an update swaps in a new record, leaving the one read before as it was."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        state = self.uiProtectApiClient.state
+        automation = state.automations[CO_ALARM_ID]
+        record = automation.record
+
+        automation.enabled = False
+
+        assert record.enabled is True
+        assert automation.record.enabled is False
+        assert self.uiProtectApiClient.state is state
+
+    def test_change_callbacks_see_published_state(self):
+        """Test change callbacks run once the changes they report are published."""
+        self.api_response_file_name = "automations_1.json"
+        seen = []
+        self.uiProtectApiClient.add_change_callback(
+            lambda changes: seen.append(set(changes.added_automations) <= set(self.uiProtectApiClient.automations)))
+        self.uiProtectApiClient.load_automations()
+
+        assert seen == [True]
+
+    def test_enabled_setter_keeps_previous_details(self):
+        """Test toggling an automation publishes new details instead of changing the old ones."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        automation = self.uiProtectApiClient.automations[CO_ALARM_ID]
+        previous_details = automation.raw_details
+
+        automation.enabled = False
+
+        assert previous_details["enable"] is True
+        assert automation.raw_details is not previous_details
+
+    def test_notification_update_waits_for_writers(self):
+        """Test a pushed notification update is applied only once a writer staging changes is done."""
+        console = SyntheticConsole(automations=5, users=2, notification_ratio=1.0, dedicated_notifications=True)
+        manager = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+        manager.call_uiprotect_api = console
+        manager.load_automations()
+        manager.load_notifications()
+        notification = next(iter(manager.notifications.values()))
+        record = notification.record
+        update = threading.Thread(target=manager.process_websocket_update, args=(
+            {"action": "update", "modelKey": "notification", "id": notification.id},
+            {"channels": [] if record.push_enabled else ["push"]},
+        ))
+
+        with manager._staging():  # pylint: disable=W0212
+            update.start()
+            update.join(0.1)
+            assert update.is_alive()
+            assert notification.record is record
+        update.join()
+
+        assert notification.record.push_enabled is not record.push_enabled
@@ -0,0 +1,35 @@
+"""Tests for the operational statistics kept for diagnostics."""
+from .testbase import TestBase
+from .imports import UIProtectApi
+from custom_components.uiprotectalarms.pyuiprotectalarms.metrics import MetricsRegistry
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectstats import PyUIProtectEndpointStats
+
+
+class TestStats(TestBase):
+    """Test recording endpoint and cache statistics."""
+
+    def test_endpoint_stats(self):
+        """Test calls land in the right latency bucket and errors and sizes are counted."""
+        endpoint = PyUIProtectEndpointStats(MetricsRegistry(), "get_automations")
+        endpoint.record(0.01, 200, 100)
+        endpoint.record(0.3, 200, 400)
+        endpoint.record(30.0, 0, 0)
+
+        stats = endpoint.as_dict()
+        assert stats["calls"] == 3
+        assert stats["errors"] == 1
+        assert stats["latency_seconds"]["buckets"]["0.05"] == 1
+        assert stats["latency_seconds"]["buckets"]["0.5"] == 1
+        assert stats["latency_seconds"]["buckets"]["+Inf"] == 1
+        assert stats["payload_bytes"] == {"total": 500, "max": 400}
+
+    def test_change_detection_cache_and_refresh_timing(self):
+        """Test reloading unchanged automations counts as cache hits."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        self.uiProtectApiClient.load_automations()
+
+        stats = self.uiProtectApiClient.stats.as_dict()
+        assert stats["caches"]["automation_details"] == {"hits": 33, "misses": 0, "hit_rate": 1.0}
+        assert "load_automations" in stats["last_refresh_seconds"]
+        assert set(stats["endpoints"]) == {str(api) for api in UIProtectApi}
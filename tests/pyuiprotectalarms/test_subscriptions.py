@@ -0,0 +1,92 @@
+"""Test callbacks subscribed to the fields of automations and notifications."""
+import gc
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectsubscriptions import PyUIProtectSubscriptions
+from .testbase import TestBase
+
+CO_ALARM_ID = "6729da9901584d03e4001889"
+
+
+class Listener:
+    """Stands in for an entity, subscribing one of its methods."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def handle_update(self) -> None:
+        self.calls += 1
+
+
+class TestSubscriptions(TestBase):
+    def load_co_alarm(self):
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        return self.uiProtectApiClient.automations[CO_ALARM_ID]
+
+    def test_callbacks_filtered_by_field(self):
+        """Test a callback only runs when a field it subscribed to changed."""
+        automation = self.load_co_alarm()
+        enabled_changes, name_changes, updates = [], [], []
+        automation.add_attr_callback(lambda: enabled_changes.append(automation.enabled), ("enabled",))
+        automation.add_attr_callback(lambda: name_changes.append(automation.name), ("name",))
+        automation.add_attr_callback(lambda: updates.append(None))
+
+        automation.handle_server_update_base({**automation.raw_details, "name": "CO"})
+        automation.handle_server_update_base({**automation.raw_details, "enable": False})
+        automation.handle_server_update_base(automation.raw_details)
+
+        assert enabled_changes == [False]
+        assert name_changes == ["CO"]
+        assert len(updates) == 3
+
+    def test_unsubscribe(self):
+        """Test the returned handle and remove_attr_callback both unsubscribe."""
+        automation = self.load_co_alarm()
+        calls = []
+        unsubscribe = automation.add_attr_callback(lambda: calls.append(1))
+        callback = lambda: calls.append(2)  # pylint: disable=unnecessary-lambda-assignment
+        automation.add_attr_callback(callback, ("enabled", "name"))
+
+        unsubscribe()
+        automation.remove_attr_callback(callback)
+        automation.handle_server_update_base({**automation.raw_details, "enable": False})
+
+        assert not calls
+        assert not automation._subscriptions  # pylint: disable=protected-access
+
+    def test_methods_held_weakly(self):
+        """Test a subscribed method doesn't keep its instance alive, and is dropped once it is gone."""
+        automation = self.load_co_alarm()
+        listener, gone = Listener(), Listener()
+        automation.add_attr_callback(listener.handle_update, ("enabled",))
+        automation.add_attr_callback(gone.handle_update, ("enabled",))
+
+        del gone
+        gc.collect()
+        automation.handle_server_update_base({**automation.raw_details, "enable": False})
+
+        assert listener.calls == 1
+        assert len(automation._subscriptions) == 1  # pylint: disable=protected-access
+
+    def test_optimistic_update_still_notifies(self):
+        """Test changes made before the console answers are reported along with its answer."""
+        automation = self.load_co_alarm()
+        calls = []
+        automation.add_attr_callback(lambda: calls.append(automation.enabled), ("enabled",))
+
+        automation.update_state({**automation.raw_details, "enable": False})
+        automation.handle_server_update_base(automation.raw_details)
+
+        assert calls == [False]
+
+    def test_subscribers_in_order(self):
+        """Test the callbacks for a change across fields run once each, in the order they subscribed."""
+        subscriptions = PyUIProtectSubscriptions()
+        calls = []
+        subscriptions.subscribe(lambda: calls.append("name"), ("name",))
+        subscriptions.subscribe(lambda: calls.append("all"))
+        subscriptions.subscribe(lambda: calls.append("both"), ("enabled", "name"))
+
+        for cb in subscriptions.subscribers(("enabled", "name")):
+            cb()
+        assert calls == ["name", "all", "both"]
+        assert len(subscriptions.subscribers(("raw_details",))) == 1
@@ -0,0 +1,30 @@
+"""Test the library against a synthetic console."""
+from .imports import PyUIProtectAlarms, PyUIProtectChanges
+from .synthetic import SyntheticConsole
+
+
+class TestSyntheticConsole:
+    """Test loading and reloading a generated console."""
+
+    def test_load_and_reload(self):
+        """Test every automation loads, and a reload only updates the ones that changed."""
+        console = SyntheticConsole(automations=200, users=5, notification_ratio=0.5)
+        manager = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+        manager.call_uiprotect_api = console
+
+        assert manager.load_automations()
+        assert manager.load_users()
+        assert manager.load_notifications()
+        assert len(manager.automations) == 200
+        assert len(manager.users) == 5
+        senders = [
+            automation for automation in console.automations.values()
+            if automation["actions"][0]["type"] == "SEND_NOTIFICATION"
+        ]
+        assert len(manager.notifications) == len(senders)
+
+        changed = console.mutate(0.05)
+        summary = PyUIProtectChanges()
+        manager.load_automations(summary=summary)
+        assert sorted(summary.updated_automations) == sorted(changed)
+        assert len(summary.unchanged_automations) == 200 - len(changed)
@@ -0,0 +1,101 @@
+"""Test request phase timing and trace capture for PyUIProtectAlarms."""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import threading
+
+from custom_components.uiprotectalarms.pyuiprotectalarms.metrics import MetricsRegistry
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectstats import PyUIProtectEndpointStats
+from custom_components.uiprotectalarms.pyuiprotectalarms.tracing import TRACER, Tracer
+from .imports import Helpers
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    """Answer every request with a small JSON body."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Send a JSON list."""
+        body = json.dumps([{"id": str(index)} for index in range(100)]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Keep the test output quiet."""
+
+
+class TestTracing:
+    """Test spans, Chrome trace export and request phases."""
+
+    def test_span_without_capture_records_nothing(self):
+        """Test spans are no-ops until a capture is started, and stop with it."""
+        tracer = Tracer()
+        with tracer.span("before"):
+            pass
+
+        capture = tracer.start_capture()
+        with tracer.span("during", automations=3):
+            pass
+        tracer.stop_capture(capture)
+
+        with tracer.span("after"):
+            pass
+
+        assert not tracer.enabled
+        assert [span[0] for span in capture.spans] == ["during"]
+
+    def test_chrome_trace(self, tmp_path):
+        """Test captured spans are written as complete events with thread names."""
+        tracer = Tracer()
+        capture = tracer.start_capture()
+        tracer.add_span("reconcile_automations", 1.0, 1.5, automations=2)
+        tracer.stop_capture(capture)
+
+        path = tmp_path / "trace.json"
+        capture.write_chrome_trace(str(path))
+        trace = json.loads(path.read_text(encoding="utf-8"))
+
+        complete = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        assert complete == [
+            {
+                "name": "reconcile_automations",
+                "cat": "uiprotectalarms",
+                "ph": "X",
+                "ts": 1_000_000.0,
+                "dur": 500_000.0,
+                "pid": complete[0]["pid"],
+                "tid": threading.get_ident(),
+                "args": {"automations": 2},
+            }
+        ]
+        assert any(event["ph"] == "M" for event in trace["traceEvents"])
+
+    def test_request_phases(self):
+        """Test a real request records its connect, server, download and decode phases."""
+        server = HTTPServer(("127.0.0.1", 0), JsonHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        stats = PyUIProtectEndpointStats(MetricsRegistry(), "get_automations")
+        capture = TRACER.start_capture()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}"
+            response, status_code = Helpers.call_json_api(url, "/automations", "get", {}, stats=stats)
+        finally:
+            TRACER.stop_capture(capture)
+            server.shutdown()
+            server.server_close()
+
+        assert status_code == 200
+        assert len(response) == 100
+
+        phases = stats.as_dict()["phases_seconds"]
+        for phase in ("server", "download", "decode"):
+            assert phases[phase]["count"] == 1
+        # Plain HTTP has no TLS handshake
+        assert phases["tls"]["count"] == 0
+
+        names = [span[0] for span in capture.spans]
+        assert "GET /automations" in names
+        assert "server" in names
+        assert "decode" in names
@@ -0,0 +1,61 @@
+"""Test the user directory and its reloads."""
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectusers import (
+    PyUIProtectUser,
+    PyUIProtectUserDirectory,
+)
+from .imports import UIProtectApi
+from .testbase import TestBase
+
+
+class TestUserDirectory:
+    def test_compact_users(self):
+        """Test only the id and a name are kept, the name falling back to the full name, username and id."""
+        users = PyUIProtectUserDirectory.from_response([
+            {"id": "u1", "name": "Jane Doe", "email": "jane@example.com", "role": "admin"},
+            {"id": "u2", "firstName": "John", "lastName": "Doe"},
+            {"id": "u3", "localUsername": "guest"},
+            {"id": "u4"},
+            {"name": "No Id"},
+        ])
+
+        assert list(users) == ["u1", "u2", "u3", "u4"]
+        assert users["u1"] == PyUIProtectUser("u1", "Jane Doe")
+        assert [users.name_of(user_id) for user_id in ("u2", "u3", "u4", "gone")] == ["John Doe", "guest", "u4", "gone"]
+
+    def test_changed_ids(self):
+        """Test added, removed and renamed users are changes, and reordered ones aren't."""
+        before = PyUIProtectUserDirectory.from_response([{"id": "u1", "name": "A"}, {"id": "u2", "name": "B"}])
+        after = PyUIProtectUserDirectory.from_response([{"id": "u3", "name": "C"}, {"id": "u1", "name": "A2"}])
+
+        assert after.changed_ids(before) == {"u1", "u2", "u3"}
+        assert PyUIProtectUserDirectory(reversed(list(before.values()))).changed_ids(before) == set()
+
+
+class TestUserReloads(TestBase):
+    def test_unchanged_reload_not_published(self):
+        """Test reloading the same users keeps the published state, and a rename publishes a new one."""
+        assert self.uiProtectApiClient.load_users()
+        state = self.uiProtectApiClient.state
+
+        assert self.uiProtectApiClient.load_users()
+        assert self.uiProtectApiClient.state is state
+
+        self.users = [{**self.users[0], "name": "Renamed"}]
+        assert self.uiProtectApiClient.load_users()
+        assert self.uiProtectApiClient.state.version == state.version + 1
+        assert self.uiProtectApiClient.users.name_of("**USERID1**") == "Renamed"
+
+    def test_reloaded_once_stale(self):
+        """Test the users are only loaded again once their TTL has passed."""
+        assert self.uiProtectApiClient.users_stale
+        assert self.uiProtectApiClient.load_users_if_stale()
+        assert self.uiProtectApiClient.load_users_if_stale()
+        assert self.user_loads() == 1
+
+        self.uiProtectApiClient.users_ttl = 0
+        assert self.uiProtectApiClient.users_stale
+        assert self.uiProtectApiClient.load_users_if_stale()
+        assert self.user_loads() == 2
+
+    def user_loads(self) -> int:
+        return sum(1 for call in self.mock_api.call_args_list if call.args[0] == UIProtectApi.GET_USERS)
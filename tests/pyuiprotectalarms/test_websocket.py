@@ -0,0 +1,267 @@
+"""Tests for the UIProtect updates websocket subscription.
+
+The websocket is served by a local aiohttp server that stands in for the
+Protect console and pushes binary update frames.
+"""
+import asyncio
+from contextlib import contextmanager
+import threading
+from unittest.mock import patch
+
+import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from .imports import NvrError, PyUIProtectAlarms
+from .testbase import TestBase
+from .ws_frames import encode_ws_message
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectwebsocket import PyUIProtectWebsocket
+
+CO_ALARM_ID = "6729da9901584d03e4001889"
+
+
+class StandInProtectServer:
+    """Local websocket server that pushes queued messages to each connection."""
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.drop_after_first = False
+
+    async def handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+
+        if self.drop_after_first and self.connections == 1:
+            await ws.close()
+            return ws
+
+        while not ws.closed:
+            message = await self.messages.get()
+            await ws.send_bytes(message)
+        return ws
+
+
+class TestWebsocket(TestBase):
+    """Test applying pushed updates to the in-memory objects."""
+
+    async def _run_websocket(self, server: StandInProtectServer, until) -> PyUIProtectWebsocket:
+        app = web.Application()
+        app.router.add_get("/proxy/protect/ws/updates", server.handle)
+
+        async with TestServer(app) as test_server, ClientSession() as session:
+            websocket = PyUIProtectWebsocket(
+                self.uiProtectApiClient,
+                session,
+                url=str(test_server.make_url("/proxy/protect/ws/updates")),
+            )
+            with patch.object(self.uiProtectApiClient, "get_auth_headers", return_value={}), \
+                 patch("custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectwebsocket.WS_BACKOFF_MIN_SECONDS", 0):
+                task = asyncio.create_task(websocket.async_run())
+                try:
+                    for _ in range(200):
+                        if until():
+                            break
+                        await asyncio.sleep(0.01)
+                finally:
+                    await websocket.async_stop()
+                    task.cancel()
+        return websocket
+
+    @pytest.mark.asyncio
+    async def test_update_applied_to_automation(self):
+        """Test a pushed update changes the automation and runs its callbacks."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        automation = self.uiProtectApiClient.automations[CO_ALARM_ID]
+        callbacks = []
+        automation.add_attr_callback(lambda: callbacks.append(automation.enabled))
+
+        server = StandInProtectServer()
+        server.messages.put_nowait(encode_ws_message(
+            {"action": "update", "modelKey": "camera", "id": "camera1"},
+            {"name": "Front Door"},
+        ))
+        server.messages.put_nowait(encode_ws_message(
+            {"action": "update", "modelKey": "automation", "id": CO_ALARM_ID},
+            {"enable": False, "name": "CO Alarm (Disabled)"},
+            deflate=True,
+        ))
+
+        await self._run_websocket(server, lambda: callbacks)
+
+        assert callbacks == [False]
+        assert automation.name == "CO Alarm (Disabled)"
+        # Fields not in the update are kept
+        assert automation.raw_details["actions"]
+
+    @pytest.mark.asyncio
+    async def test_add_and_remove_automation(self):
+        """Test pushed add and remove actions."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+
+        server = StandInProtectServer()
+        server.messages.put_nowait(encode_ws_message(
+            {"action": "add", "modelKey": "automation", "id": "new_rule"},
+            {"id": "new_rule", "name": "New Rule", "enable": True, "actions": []},
+        ))
+        server.messages.put_nowait(encode_ws_message(
+            {"action": "remove", "modelKey": "automation", "id": CO_ALARM_ID},
+            {},
+        ))
+
+        await self._run_websocket(server, lambda: CO_ALARM_ID not in self.uiProtectApiClient.automations)
+
+        # Each update publishes a new version, read the latest one
+        automations = self.uiProtectApiClient.automations
+        assert "new_rule" in automations
+        assert CO_ALARM_ID not in automations
+        assert len(automations) == 33
+
+    @pytest.mark.asyncio
+    async def test_resync_after_reconnect(self):
+        """Test a dropped connection reconnects and reloads the automations."""
+        self.api_response_file_name = "automations_1.json"
+
+        server = StandInProtectServer()
+        server.drop_after_first = True
+
+        websocket = await self._run_websocket(server, lambda: self.uiProtectApiClient.automations)
+
+        assert server.connections >= 2
+        assert len(self.uiProtectApiClient.automations) == 33
+        assert not websocket.is_connected
+
+    @pytest.mark.asyncio
+    async def test_retries_while_console_unreachable(self):
+        """Test a login to an unreachable console goes through the backoff, and the loop keeps retrying."""
+        self.mock_api_call.stop()
+        manager = PyUIProtectAlarms("127.0.0.1:1", "USERNAME", "PASSWORD")
+
+        async with ClientSession() as session:
+            websocket = PyUIProtectWebsocket(manager, session)
+            with patch.object(manager, "authenticate", wraps=manager.authenticate) as mock_authenticate, \
+                 patch("custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectwebsocket.WS_BACKOFF_MIN_SECONDS", 0):
+                task = asyncio.create_task(websocket.async_run())
+                try:
+                    for _ in range(500):
+                        if mock_authenticate.call_count >= 3 or task.done():
+                            break
+                        await asyncio.sleep(0.01)
+                    assert not task.done()
+                    assert mock_authenticate.call_count >= 3
+                finally:
+                    await websocket.async_stop()
+                    task.cancel()
+        self.mock_api = self.mock_api_call.start()
+        self.mock_api.side_effect = self.call_uiprotect_api
+
+    @pytest.mark.asyncio
+    async def test_warm_start_resyncs_once_console_is_back(self):
+        """Test a warm start with the console offline resyncs the restored automations once it is reachable again."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        snapshot = self.uiProtectApiClient.export_snapshot()
+        stale = next(details for details in snapshot["automations"] if details["id"] == CO_ALARM_ID)
+        stale["name"] = "Stale"
+
+        # Offline: restored from the snapshot, and the reconcile fails
+        self.mock_api_call.stop()
+        manager = PyUIProtectAlarms("127.0.0.1:1", "USERNAME", "PASSWORD")
+        assert manager.restore_snapshot(snapshot)
+        with pytest.raises(NvrError):
+            manager.load_automations()
+
+        server = StandInProtectServer()
+        app = web.Application()
+        app.router.add_get("/proxy/protect/ws/updates", server.handle)
+        async with TestServer(app) as test_server, ClientSession() as session:
+            with patch.object(manager, "authenticate", wraps=manager.authenticate) as mock_authenticate, \
+                 patch("custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectwebsocket.WS_BACKOFF_MIN_SECONDS", 0):
+                websocket = PyUIProtectWebsocket(manager, session, url=str(test_server.make_url("/proxy/protect/ws/updates")))
+                websocket.request_resync()
+                task = asyncio.create_task(websocket.async_run())
+                try:
+                    for _ in range(500):
+                        if mock_authenticate.call_count >= 2:
+                            break
+                        await asyncio.sleep(0.01)
+                    assert not task.done()
+
+                    # The console is back
+                    self.mock_api = self.mock_api_call.start()
+                    self.mock_api.side_effect = self.call_uiprotect_api
+                    with patch.object(manager, "get_auth_headers", return_value={}):
+                        for _ in range(500):
+                            if manager.automations[CO_ALARM_ID].name != "Stale":
+                                break
+                            await asyncio.sleep(0.01)
+                finally:
+                    await websocket.async_stop()
+                    task.cancel()
+
+        assert server.connections >= 1
+        assert manager.automations[CO_ALARM_ID].name == "CO Alarm"
+
+    @pytest.mark.asyncio
+    async def test_bad_update_skipped(self):
+        """Test an update that can't be applied is logged and skipped, and the ones after it still apply."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        automation = self.uiProtectApiClient.automations[CO_ALARM_ID]
+        callbacks = []
+        automation.add_attr_callback(lambda: callbacks.append(automation.enabled))
+        # Adds are matched against the prefix by name
+        self.uiProtectApiClient.automation_rule_prefix = "CO"
+
+        server = StandInProtectServer()
+        server.messages.put_nowait(encode_ws_message(
+            {"action": "add", "modelKey": "automation", "id": "nameless_rule"},
+            {"id": "nameless_rule", "enable": True, "actions": []},
+        ))
+        server.messages.put_nowait(encode_ws_message(
+            {"action": "update", "modelKey": "automation", "id": CO_ALARM_ID},
+            {"enable": False},
+        ))
+
+        websocket = await self._run_websocket(server, lambda: callbacks)
+
+        assert callbacks == [False]
+        assert "nameless_rule" not in self.uiProtectApiClient.automations
+        assert server.connections == 1
+        assert not websocket.is_connected
+
+    @pytest.mark.asyncio
+    async def test_messages_of_a_burst_batched(self):
+        """Test the messages received before the first is applied share a batch, applied in the executor."""
+        self.api_response_file_name = "automations_1.json"
+        self.uiProtectApiClient.load_automations()
+        batches = []
+        threads = set()
+
+        @contextmanager
+        def batch():
+            batches.append("open")
+            yield
+            batches[-1] = "closed"
+
+        def process_websocket_update(*args):
+            threads.add(threading.get_ident())
+            process(*args)
+
+        process = self.uiProtectApiClient.process_websocket_update
+        websocket = PyUIProtectWebsocket(self.uiProtectApiClient, session=None, url="unused", batch=batch)
+        with patch.object(self.uiProtectApiClient, "process_websocket_update", process_websocket_update):
+            for enable in (False, True, False):
+                websocket._handle_message(encode_ws_message(  # pylint: disable=W0212
+                    {"action": "update", "modelKey": "automation", "id": CO_ALARM_ID}, {"enable": enable},
+                ))
+            apply_task = websocket._apply_task  # pylint: disable=W0212
+            assert not batches
+            await apply_task
+
+        assert batches == ["closed"]
+        assert threads and threading.get_ident() not in threads
+        assert self.uiProtectApiClient.automations[CO_ALARM_ID].enabled is False
@@ -0,0 +1,78 @@
+"""Tests for the Protect updates websocket frame decoder."""
+import json
+from unittest.mock import patch
+
+import pytest
+
+from .ws_frames import AUTOMATION_SHARE, encode_ws_message, encode_ws_packet, synthetic_stream
+from custom_components.uiprotectalarms.pyuiprotectalarms.websocketdecoder import (
+    WsDecoder,
+    WsDecodeError,
+    scan_model_key,
+)
+
+
+class TestWsDecoder:
+    """Test decoding and filtering update messages."""
+
+    def test_decode_plain_and_deflated(self):
+        """Test both frames decode, whether or not they are deflated."""
+        action = {"action": "update", "modelKey": "automation", "id": "a1"}
+        data = {"enable": False}
+        decoder = WsDecoder()
+
+        for deflate in (False, True):
+            message = decoder.decode(encode_ws_message(action, data, deflate))
+            assert message.action == action
+            assert message.data == data
+
+    def test_filter_by_model_key(self):
+        """Test messages for other models are dropped before their body is decoded."""
+        decoder = WsDecoder(model_keys=["automation"])
+
+        assert decoder.decode(encode_ws_message({"action": "update", "modelKey": "camera", "id": "c1"}, {})) is None
+        message = decoder.decode(encode_ws_message({"action": "update", "modelKey": "automation", "id": "a1"}, {}))
+        assert message.model_key == "automation"
+        assert decoder.messages_dropped == 1
+        assert decoder.messages_decoded == 1
+
+    def test_data_decoded_lazily(self):
+        """Test the data packet is only parsed when read."""
+        body = b"{not json"
+        raw = encode_ws_packet(1, {"modelKey": "automation"}) + bytes([2, 1, 0, 0]) + len(body).to_bytes(4, "big") + body
+        message = WsDecoder(model_keys=["automation"]).decode(memoryview(raw))
+
+        assert message.action == {"modelKey": "automation"}
+        with pytest.raises(ValueError):
+            _ = message.data
+
+    def test_truncated_message(self):
+        """Test a truncated message raises a decode error."""
+        raw = encode_ws_message({"modelKey": "automation"}, {"enable": True})
+        with pytest.raises(WsDecodeError):
+            WsDecoder().decode(raw[:-3])
+
+    def test_scan_model_key(self):
+        """Test the model key scan copes with whitespace and its absence."""
+        payload = b'{"action": "update", "modelKey" :  "automation"}'
+        assert scan_model_key(payload, 0, len(payload)) == b"automation"
+        assert scan_model_key(b'{"action": "update"}', 0, 20) is None
+        # The key must lie inside the given bounds
+        assert scan_model_key(payload, 0, 20) is None
+
+    def test_filtered_messages_not_parsed(self):
+        """Test JSON is only parsed for the messages of the model keys asked for."""
+        stream = synthetic_stream(1000)
+        decoder = WsDecoder(model_keys=["automation"])
+
+        with patch("custom_components.uiprotectalarms.pyuiprotectalarms.websocketdecoder.json.loads",
+                   wraps=json.loads) as mock_loads:
+            messages = [message for message in map(decoder.decode, stream) if message is not None]
+            assert mock_loads.call_count == 0
+            for message in messages:
+                _ = message.action, message.data
+
+        assert messages and len(messages) < len(stream) * AUTOMATION_SHARE * 2
+        assert decoder.messages_decoded + decoder.messages_dropped == len(stream)
+        # Only the action and data packets of the messages kept
+        assert mock_loads.call_count == 2 * len(messages)
@@ -40,6 +40,8 @@ class TestBase:
         Class instance with mocked call_api() function and Uiprotectalarms object
         """
         self._api_response_file_name = None
+        # Listed by the users endpoint
+        self.users = [{"id": "**USERID1**", "name": "User 1", "email": "user1@example.com"}]
         self.mock_api_call = patch(PATCH_CALL_UIPROTECT_API)
         self.caplog = caplog
         self.mock_api = self.mock_api_call.start()
@@ -92,3 +94,13 @@ class TestBase:
             # Echo back the submitted payload as if the server accepted it
             return (json_object, 200)
 
+        if api == UIProtectApi.GET_USERS:
+            return (self.users, 200)
+
+        if api == UIProtectApi.GET_NOTIFICATIONS:
+            # Not available on this console, notifications come from the automations
+            return (None, 404)
+
+        if api == UIProtectApi.LOGIN:
+            return ({}, 200)
+
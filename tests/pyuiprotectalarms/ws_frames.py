@@ -0,0 +1,52 @@
+"""Helper file for building Protect updates websocket frames in the tests."""
+import json
+import random
+import struct
+import zlib
+
+# Share of automation traffic in a synthetic stream; the rest is camera and
+# event chatter, which is what a busy console mostly sends.
+AUTOMATION_SHARE = 0.02
+
+
+def encode_ws_packet(packet_type: int, payload, deflate: bool = False) -> bytes:
+    """Encode one packet the way the Protect console does."""
+    body = json.dumps(payload).encode("utf-8")
+    if deflate:
+        body = zlib.compress(body)
+    return struct.pack(">BBBxI", packet_type, 1, int(deflate), len(body)) + body
+
+
+def encode_ws_message(action: dict, data, deflate: bool = False) -> bytes:
+    """Encode an action frame followed by its data frame."""
+    return encode_ws_packet(1, action, deflate) + encode_ws_packet(2, data, deflate)
+
+
+def synthetic_stream(size: int, seed: int = 1) -> list[bytes]:
+    """Build a stream of update messages resembling a busy console."""
+    rng = random.Random(seed)
+    stream = []
+    for index in range(size):
+        if rng.random() < AUTOMATION_SHARE:
+            action = {"action": "update", "newUpdateId": f"u{index}", "modelKey": "automation", "id": f"a{index % 50}"}
+            data = {"enable": rng.random() < 0.5}
+        else:
+            model_key = rng.choice(["camera", "event", "sensor"])
+            action = {"action": "update", "newUpdateId": f"u{index}", "modelKey": model_key, "id": f"c{index % 20}"}
+            data = {
+                "lastMotion": 1730796185243 + index,
+                "stats": {"rxBytes": index * 1024, "txBytes": index * 2048, "wifiQuality": 80},
+                "smartDetectZones": [{"name": f"zone{zone}", "points": [[0, 0], [1, 0], [1, 1]]} for zone in range(8)],
+            }
+        stream.append(encode_ws_message(action, data, deflate=rng.random() < 0.5))
+    return stream
+
+
+def decode_in_full(raw: bytes) -> None:
+    """Parse both packets of a message, as a decoder without filtering does."""
+    action_size = int.from_bytes(raw[4:8], "big")
+    for offset, size in ((0, action_size), (8 + action_size, int.from_bytes(raw[12 + action_size:16 + action_size], "big"))):
+        payload = raw[offset + 8:offset + 8 + size]
+        if raw[offset + 2]:
+            payload = zlib.decompress(payload)
+        json.loads(payload)
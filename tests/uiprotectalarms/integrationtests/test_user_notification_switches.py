@@ -0,0 +1,53 @@
+"""Tests for the per-user notification switches."""
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectreceivers import notification_receivers
+from custom_components.uiprotectalarms.user_notification_switch import get_user_notification_entries
+from tests.pyuiprotectalarms.synthetic import SyntheticConsole
+from .imports import PyUIProtectAlarms
+
+
+def make_manager(console: SyntheticConsole) -> PyUIProtectAlarms:
+    manager = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+    manager.call_uiprotect_api = console
+    manager.load_automations()
+    manager.load_users()
+    return manager
+
+
+class TestUserNotificationSwitches:
+    """Test switches are created for chosen users only, and follow the matrix."""
+
+    def test_created_for_receivers_only(self):
+        """Test a push and an email switch per automation the chosen user receives, and none for others."""
+        console = SyntheticConsole(automations=50, users=5, notification_ratio=0.7)
+        manager = make_manager(console)
+        user_id = next(iter(manager.users))
+        received = [
+            automation_id for automation_id, details in console.automations.items()
+            if any(receiver["user"] == user_id for receiver in notification_receivers(details))
+        ]
+
+        entities = get_user_notification_entries(manager, manager.automations, [user_id, "unknown-user"])
+
+        assert len(entities) == 2 * len(received)
+        assert {entity.pyuiprotect_base_obj.id for entity in entities} == set(received)
+        assert len({entity.unique_id for entity in entities}) == len(entities)
+        assert all(entity.available for entity in entities)
+
+    def test_state_follows_matrix(self):
+        """Test a switch reads its channel from the matrix, and is unavailable once the user no longer receives."""
+        console = SyntheticConsole(automations=10, users=3, notification_ratio=1.0)
+        manager = make_manager(console)
+        user_id = next(iter(manager.users))
+        entity = next(
+            entity for entity in get_user_notification_entries(manager, manager.automations, [user_id])
+            if entity.entity_description.channel_type == "push"
+        )
+        automation = entity.pyuiprotect_base_obj
+
+        enabled = not entity.is_on
+        manager.set_notification_channel("push", enabled, [user_id], [automation.id])
+        assert entity.is_on is enabled
+
+        console.automations[automation.id]["actions"] = []
+        manager.refresh_automation(automation.id, force=True)
+        assert not entity.available
@@ -0,0 +1,30 @@
+"""Tests for the diagnostics download."""
+import json
+
+from custom_components.uiprotectalarms.diagnostics import _get_diagnostics
+from custom_components.uiprotectalarms.pyuiprotectalarms import PyUIProtectAlarms
+from tests.pyuiprotectalarms.call_json import get_response_from_file
+
+
+class TestDiagnostics:
+    """Test building the diagnostics payload."""
+
+    def test_diagnostics_redacted_and_serialisable(self):
+        """Test automations, notifications, users and stats are included and personal data is redacted."""
+        manager = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+        manager.restore_snapshot({
+            "version": 1,
+            "automations": get_response_from_file("automations_1.json"),
+            "users": [{"id": "user1", "name": "Jane Doe", "email": "jane@example.com"}],
+            "notifications_from_automations": True,
+        })
+
+        diagnostics = json.loads(json.dumps(_get_diagnostics(manager)))
+
+        assert diagnostics["uiprotectalarms"]["automation_count"] == 33
+        assert len(diagnostics["automations"]) == 33
+        assert diagnostics["notifications"]
+        # Only the fields the integration keeps, with the name redacted
+        assert diagnostics["users"] == [{"id": "user1", "name": "**REDACTED**"}]
+        assert diagnostics["uiprotectalarms"]["users_stale"] is True
+        assert "endpoints" in diagnostics["stats"]
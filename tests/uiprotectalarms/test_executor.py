@@ -0,0 +1,63 @@
+"""Tests for the executor shared by all consoles."""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.uiprotectalarms.executor import UIProtectAlarmsExecutor
+
+
+def make_hass():
+    """Return a stand-in hass that runs executor jobs in the loop's default executor."""
+    loop = asyncio.get_running_loop()
+    return SimpleNamespace(loop=loop, async_add_executor_job=lambda func, *args: loop.run_in_executor(None, func, *args))
+
+
+class TestExecutor:
+    """Test limiting and staggering blocking calls."""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrent_jobs(self):
+        """Test no more than max_jobs blocking calls run at once."""
+        executor = UIProtectAlarmsExecutor(make_hass(), max_jobs=2)
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def job(value):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+            return value
+
+        results = await asyncio.gather(*(executor.async_run(job, index) for index in range(8)))
+
+        assert results == list(range(8))
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_staggered_jobs(self):
+        """Test jobs start one interval apart, and a failing job doesn't stop the others."""
+        executor = UIProtectAlarmsExecutor(make_hass())
+        loop = asyncio.get_running_loop()
+        started = []
+
+        def make_job(index):
+            async def job():
+                started.append(loop.time())
+                if index == 1:
+                    raise ValueError("console unreachable")
+                return index
+            return job
+
+        results = await executor.async_run_staggered([make_job(index) for index in range(3)], interval=0.05)
+
+        assert results[0] == 0 and results[2] == 2
+        assert isinstance(results[1], ValueError)
+        assert started[2] - started[0] >= 0.09
@@ -0,0 +1,78 @@
+"""Test what importing the integration costs on top of HomeAssistant, with python -X importtime."""
+from pathlib import Path
+import subprocess
+import sys
+
+# Modules HomeAssistant has loaded before it imports an integration
+HA_BASELINE = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.entity_registry",
+)
+# What HomeAssistant imports to set up the integration and its switches
+INTEGRATION_MODULES = (
+    "custom_components.uiprotectalarms",
+    "custom_components.uiprotectalarms.config_flow",
+    "custom_components.uiprotectalarms.switch",
+)
+# Only needed once a console is called, a cassette recorded or a refresh profiled
+DEFERRED_MODULES = ("requests", "urllib3", "cProfile", "pstats", "homeassistant.components.diagnostics")
+
+# Milliseconds the integration's own imports may take, best of IMPORT_RUNS
+IMPORT_TIME_BUDGET_MS = 50
+IMPORT_RUNS = 3
+
+MARKER = "-- integration --"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def import_integration() -> tuple[dict[str, int], set[str]]:
+    """Import the integration in a fresh interpreter after the HomeAssistant baseline.
+
+    Returns the microseconds each module imported by the integration took on
+    its own, and the names of every module loaded by the end.
+    """
+    script = "\n".join((
+        "import sys",
+        *(f"import {module}" for module in HA_BASELINE),
+        f"print({MARKER!r}, file=sys.stderr, flush=True)",
+        *(f"import {module}" for module in INTEGRATION_MODULES),
+        "print(' '.join(sys.modules))",
+    ))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+
+    self_times = {}
+    for line in result.stderr.split(MARKER, 1)[1].splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith("import time:") and "|" in line:
+            self_us, _, module = line[len("import time:"):].split("|")
+            if self_us.strip().isdigit():
+                self_times[module.strip()] = int(self_us)
+    return self_times, set(result.stdout.split())
+
+
+class TestImportTime:
+    """Keep the integration quick to load on slow HomeAssistant hardware."""
+
+    def test_import_time_within_budget(self):
+        """Test the modules the integration pulls in beyond HomeAssistant's import within budget."""
+        runs = [import_integration()[0] for _ in range(IMPORT_RUNS)]
+        best = min(runs, key=lambda self_times: sum(self_times.values()))
+        total_ms = sum(best.values()) / 1000
+
+        slowest = sorted(best.items(), key=lambda item: item[1], reverse=True)[:10]
+        assert total_ms <= IMPORT_TIME_BUDGET_MS, f"{total_ms:.1f} ms, slowest (us): {slowest}"
+
+    def test_heavy_modules_deferred(self):
+        """Test the HTTP client, profilers and diagnostics are not imported with the integration."""
+        self_times, modules = import_integration()
+
+        assert set(INTEGRATION_MODULES) <= modules
+        assert "custom_components.uiprotectalarms.switch" in self_times
+        assert sorted(modules & set(DEFERRED_MODULES)) == []
@@ -0,0 +1,31 @@
+"""Tests for the profile service."""
+import pytest
+
+from custom_components.uiprotectalarms.services import PROFILE_SCHEMA, async_handle_profile
+from .test_services import FakeManager, make_hass
+
+
+class TestProfileService:
+    """Test refreshes run under cProfile and tracemalloc."""
+
+    @pytest.mark.asyncio
+    async def test_profile_writes_reports(self, tmp_path):
+        """Test a profile refreshes every console and writes both reports to the config dir."""
+        managers = [FakeManager("nvr1", ["a1"]), FakeManager("nvr2", ["b1"])]
+        hass = make_hass(managers)
+        hass.config = type("Config", (), {"path": lambda self, name: str(tmp_path / name)})()
+
+        response = await async_handle_profile(hass, PROFILE_SCHEMA({"scope": ["automations", "users"], "top": 10}))
+
+        for manager in managers:
+            assert manager.calls == [("load_automations", True), ("load_users",)]
+
+        with open(response["profile"], encoding="utf-8") as report:
+            cpu_report = report.read()
+        assert "Refresh functions" in cpu_report
+        assert "load_automations" in cpu_report
+
+        with open(response["allocations"], encoding="utf-8") as report:
+            memory_report = report.read()
+        assert "peak traced memory" in memory_report
+        assert response["peak_memory_bytes"] > 0
@@ -0,0 +1,188 @@
+"""Tests for the services."""
+import asyncio
+import json
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+import voluptuous as vol
+
+from custom_components.uiprotectalarms.const import (
+    DOMAIN,
+    PYUIPROTECTALARMS_MANAGER,
+    UIPROTECTALARMS_DISPATCHER,
+    UIPROTECTALARMS_EXECUTOR,
+)
+from custom_components.uiprotectalarms.executor import UIProtectAlarmsExecutor
+from custom_components.uiprotectalarms.services import (
+    CASSETTE_RECORDING,
+    RECORD_CASSETTE_SCHEMA,
+    REFRESH_ALARMS_SCHEMA,
+    SET_NOTIFICATION_CHANNEL_SCHEMA,
+    async_handle_record_cassette,
+    async_handle_refresh_alarms,
+    async_handle_set_notification_channel,
+    async_setup_services,
+    async_unload_services,
+)
+
+
+class FakeManager:
+    """Stand-in manager that records which refreshes were asked for."""
+
+    def __init__(self, host: str, automation_ids: list[str]) -> None:
+        self.host = host
+        self.automations = dict.fromkeys(automation_ids)
+        self.users = [{"id": "user"}]
+        self.calls = []
+
+    def load_automations(self, force=False, summary=None):
+        """Record a full automation load."""
+        self.calls.append(("load_automations", force))
+        return True
+
+    def refresh_automation(self, automation_id, force=False, summary=None):
+        """Record a single automation refresh; unknown ids are added."""
+        self.calls.append(("refresh_automation", automation_id))
+        if summary is not None and automation_id not in self.automations:
+            summary.added_automations[automation_id] = None
+        return True
+
+    def load_users(self):
+        """Record a user load."""
+        self.calls.append(("load_users",))
+        return True
+
+    def load_notifications(self, force=False, summary=None):
+        """Record a notification load."""
+        self.calls.append(("load_notifications", force))
+        return True
+
+    def set_notification_channel(self, channel, enabled, user_ids=None, automation_ids=None):
+        """Record a channel change; every tracked automation is updated."""
+        self.calls.append(("set_notification_channel", channel, enabled, user_ids, automation_ids))
+        return len(self.automations)
+
+
+def make_hass(managers: list[FakeManager]):
+    """Return a stand-in hass with one loaded config entry per manager."""
+    loop = asyncio.get_running_loop()
+    hass = SimpleNamespace(loop=loop, data={})
+    hass.async_add_executor_job = lambda func, *args: loop.run_in_executor(None, func, *args)
+    hass.data[DOMAIN] = {UIPROTECTALARMS_EXECUTOR: UIProtectAlarmsExecutor(hass)}
+    entries = []
+    for manager in managers:
+        entry = SimpleNamespace(entry_id=f"entry_{manager.host}")
+        entries.append(entry)
+        hass.data[DOMAIN][entry.entry_id] = {
+            PYUIPROTECTALARMS_MANAGER: manager,
+            UIPROTECTALARMS_DISPATCHER: SimpleNamespace(batch=nullcontext),
+        }
+    hass.config_entries = SimpleNamespace(async_entries=lambda domain: entries)
+    return hass
+
+
+class TestRefreshAlarmsService:
+    """Test scoped and targeted refreshes across consoles."""
+
+    @pytest.mark.asyncio
+    async def test_full_refresh(self):
+        """Test a call without scope or targets reloads everything on every console."""
+        managers = [FakeManager("nvr1", ["a1"]), FakeManager("nvr2", ["b1"])]
+        hass = make_hass(managers)
+
+        response = await async_handle_refresh_alarms(hass, REFRESH_ALARMS_SCHEMA({"force": True}))
+
+        for manager in managers:
+            assert manager.calls == [("load_automations", True), ("load_users",), ("load_notifications", True)]
+        assert set(response["consoles"]) == {"nvr1", "nvr2"}
+        assert response["consoles"]["nvr1"]["users"] == 1
+
+    @pytest.mark.asyncio
+    async def test_targeted_refresh(self):
+        """Test automation ids are fetched one by one on the console that tracks them."""
+        managers = [FakeManager("nvr1", ["a1", "a2"]), FakeManager("nvr2", ["b1"])]
+        hass = make_hass(managers)
+
+        response = await async_handle_refresh_alarms(
+            hass, REFRESH_ALARMS_SCHEMA({"automation_ids": ["a1", "a2", "new"], "scope": "users"})
+        )
+
+        assert sorted(managers[0].calls) == [
+            ("load_users",),
+            ("refresh_automation", "a1"),
+            ("refresh_automation", "a2"),
+            ("refresh_automation", "new"),
+        ]
+        # The other console is only asked for the id nobody tracks yet
+        assert sorted(managers[1].calls) == [("load_users",), ("refresh_automation", "new")]
+        assert response["consoles"]["nvr2"]["automations"]["added"] == ["new"]
+
+
+class TestSetNotificationChannelService:
+    """Test channel changes across consoles."""
+
+    @pytest.mark.asyncio
+    async def test_mute_user_everywhere(self):
+        """Test the change is asked of every console, and the updates are counted per console."""
+        managers = [FakeManager("nvr1", ["a1", "a2"]), FakeManager("nvr2", ["b1"])]
+        hass = make_hass(managers)
+
+        response = await async_handle_set_notification_channel(
+            hass, SET_NOTIFICATION_CHANNEL_SCHEMA({"channel": "push", "enabled": False, "user_ids": "user"})
+        )
+
+        for manager in managers:
+            assert manager.calls == [("set_notification_channel", "push", False, ["user"], None)]
+        assert response == {"consoles": {"nvr1": {"updated": 2}, "nvr2": {"updated": 1}}}
+
+    def test_unknown_channel_rejected(self):
+        """Test only push and email are accepted."""
+        with pytest.raises(vol.Invalid):
+            SET_NOTIFICATION_CHANNEL_SCHEMA({"channel": "sms", "enabled": True})
+
+
+class TestServiceRegistration:
+    """Test the services are registered once, each with its handler and schema."""
+
+    def test_register_and_remove(self):
+        """Test every service is registered with a schema and removed again."""
+        registered = {}
+        hass = SimpleNamespace(services=SimpleNamespace(
+            has_service=lambda domain, service: service in registered,
+            async_register=lambda domain, service, handler, schema, supports_response: registered.update(
+                {service: (handler, schema)}
+            ),
+            async_remove=lambda domain, service: registered.pop(service),
+        ))
+
+        async_setup_services(hass)
+        async_setup_services(hass)
+
+        assert set(registered) == {
+            "refresh_alarms", "capture_traces", "profile", "record_cassette", "set_notification_channel",
+        }
+        assert all(callable(handler) and schema is not None for handler, schema in registered.values())
+        async_unload_services(hass)
+        assert not registered
+
+
+class TestRecordCassetteService:
+    """Test the record_cassette service."""
+
+    @pytest.mark.asyncio
+    async def test_record_cassette(self, tmp_path):
+        """Test a recording reloads every console and writes the cassette to the config dir."""
+        managers = [FakeManager("nvr1", ["a1"])]
+        hass = make_hass(managers)
+        hass.config = SimpleNamespace(path=lambda name: str(tmp_path / name))
+
+        response = await async_handle_record_cassette(
+            hass, RECORD_CASSETTE_SCHEMA({"duration": 1})
+        )
+
+        assert managers[0].calls[0] == ("load_automations", True)
+        with open(response["path"], encoding="utf-8") as cassette_file:
+            assert json.load(cassette_file)["interactions"] == []
+        assert response["interactions"] == 0
+        assert CASSETTE_RECORDING not in hass.data[DOMAIN]
@@ -0,0 +1,125 @@
+"""Tests for the executor and event loop stall detector."""
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from custom_components.uiprotectalarms.const import DOMAIN, UIPROTECTALARMS_EXECUTOR
+from custom_components.uiprotectalarms.executor import UIProtectAlarmsExecutor
+from custom_components.uiprotectalarms.stalldetector import UIProtectAlarmsStallDetector
+from custom_components.uiprotectalarms.switch import SWITCHES, UIProtectAlarmsSwitchHA
+from .test_executor import make_hass
+
+
+def block_loop(seconds):
+    """Block the calling thread, standing in for slow code on the event loop."""
+    # A busy wait, as HomeAssistant rejects time.sleep on the event loop
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class SlowAutomation:
+    """Stand-in automation whose enabled setter takes as long as a call to the console."""
+
+    id = "automation1"
+    name = "CO Alarm"
+
+    def __init__(self) -> None:
+        self._enabled = False
+        self.threads = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        self.threads.append(threading.current_thread())
+        time.sleep(0.02)
+        self._enabled = value
+
+
+class TestStallDetector:
+    """Test executor job timing and loop stall sampling."""
+
+    @pytest.mark.asyncio
+    async def test_times_executor_jobs(self):
+        """Test jobs run through the executor are counted and timed once detection is enabled."""
+        executor = UIProtectAlarmsExecutor(make_hass(), max_jobs=1)
+        assert await executor.async_run(sum, [1, 2]) == 3
+
+        stall_detector = executor.async_enable_stall_detection()
+        try:
+            await asyncio.gather(*(executor.async_run(time.sleep, 0.02) for _ in range(3)))
+        finally:
+            executor.shutdown()
+
+        stats = stall_detector.as_dict()
+        assert stats["jobs"] == 3
+        assert stats["run_seconds"]["sum"] >= 0.06
+        # With one slot, the later jobs waited for the limiter
+        assert stats["limiter_wait_seconds"]["sum"] >= 0.02
+        assert not stall_detector.running
+
+    @pytest.mark.asyncio
+    async def test_loop_stall_sampled(self, caplog):
+        """Test a blocked event loop is caught, and blamed on the integration when its code is on the stack."""
+        stall_detector = UIProtectAlarmsStallDetector(make_hass(), loop_lag_warning=0.05, interval=0.05)
+        stall_detector.async_start()
+        try:
+            await asyncio.sleep(0.1)
+            block_loop(0.3)
+            await asyncio.sleep(0.1)
+        finally:
+            stall_detector.stop()
+
+        stats = stall_detector.as_dict()
+        assert stats["max_loop_lag_seconds"] >= 0.05
+        # The test module is not part of the integration, so the stall is not ours
+        assert stats["loop_stalls"]["other"] >= 1
+        assert stats["loop_stalls"]["uiprotectalarms"] == 0
+        assert any(
+            record.levelno == logging.DEBUG and "block_loop" in record.getMessage() for record in caplog.records
+        )
+
+    @pytest.mark.asyncio
+    async def test_slow_job_sampled(self, caplog):
+        """Test a job running past its threshold is logged with the stack of its thread."""
+        hass = make_hass()
+        executor = UIProtectAlarmsExecutor(hass)
+        executor.stall_detector = UIProtectAlarmsStallDetector(hass, run_warning=0.05, interval=0.05)
+        executor.stall_detector.async_start()
+        try:
+            await executor.async_run(time.sleep, 0.3)
+        finally:
+            executor.shutdown()
+
+        assert executor.stall_detector.as_dict()["slow_jobs"]["run"] == 1
+        assert "sleep has been running in the executor" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_switch_toggles_timed(self):
+        """Test toggling an automation switch runs in the executor, timed like any other job."""
+        hass = make_hass()
+        executor = UIProtectAlarmsExecutor(hass)
+        hass.data = {DOMAIN: {UIPROTECTALARMS_EXECUTOR: executor}}
+        automation = SlowAutomation()
+        switch = UIProtectAlarmsSwitchHA(automation, SWITCHES[0])
+        switch.hass = hass
+
+        stall_detector = executor.async_enable_stall_detection()
+        try:
+            await switch.async_turn_on()
+            assert automation.enabled is True
+            await switch.async_turn_off()
+        finally:
+            executor.shutdown()
+
+        assert automation.enabled is False
+        assert threading.main_thread() not in automation.threads
+        stats = stall_detector.as_dict()
+        assert stats["jobs"] == 2
+        assert stats["run_seconds"]["sum"] >= 0.04
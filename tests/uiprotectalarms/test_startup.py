@@ -0,0 +1,73 @@
+"""Tests for the startup pipeline."""
+import asyncio
+
+import pytest
+
+from custom_components.uiprotectalarms.startup import StartupPipeline, StartupStage
+
+
+def make_stage_func(events: list, name: str, result=True, delay: float = 0.01):
+    """Return a stage function that records when it starts and ends."""
+    async def stage_func():
+        events.append(f"{name}:start")
+        await asyncio.sleep(delay)
+        events.append(f"{name}:end")
+        return result
+    return stage_func
+
+
+class TestStartupPipeline:
+    """Test running startup stages as a dependency graph."""
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_run_concurrently(self):
+        """Test users and automations load side by side after login."""
+        events = []
+        pipeline = StartupPipeline([
+            StartupStage("authenticate", make_stage_func(events, "authenticate")),
+            StartupStage("load_automations", make_stage_func(events, "load_automations"), ("authenticate",)),
+            StartupStage("load_users", make_stage_func(events, "load_users"), ("authenticate",)),
+            StartupStage("load_notifications", make_stage_func(events, "load_notifications"),
+                         ("load_automations",), runs_after=("load_users",)),
+        ])
+
+        assert await pipeline.async_run()
+        assert events[:2] == ["authenticate:start", "authenticate:end"]
+        assert set(events[2:4]) == {"load_automations:start", "load_users:start"}
+        assert events[-2:] == ["load_notifications:start", "load_notifications:end"]
+        assert set(pipeline.timings) == {"authenticate", "load_automations", "load_users", "load_notifications"}
+
+    @pytest.mark.asyncio
+    async def test_failed_stage_skips_dependents(self):
+        """Test a failed required stage fails the pipeline and skips its dependents."""
+        events = []
+        pipeline = StartupPipeline([
+            StartupStage("authenticate", make_stage_func(events, "authenticate", result=False)),
+            StartupStage("load_automations", make_stage_func(events, "load_automations"), ("authenticate",)),
+        ])
+
+        assert not await pipeline.async_run()
+        assert "load_automations:start" not in events
+
+    @pytest.mark.asyncio
+    async def test_optional_stage_failure_tolerated(self):
+        """Test an optional stage can fail, and stages running after it still run."""
+        events = []
+        pipeline = StartupPipeline([
+            StartupStage("load_users", make_stage_func(events, "load_users", result=False), required=False),
+            StartupStage("load_notifications", make_stage_func(events, "load_notifications"),
+                         runs_after=("load_users",)),
+        ])
+
+        assert await pipeline.async_run()
+        assert "load_notifications:end" in events
+
+    def test_invalid_graph(self):
+        """Test unknown dependencies and cycles are rejected."""
+        async def stage_func():
+            return True
+
+        with pytest.raises(ValueError):
+            StartupPipeline([StartupStage("a", stage_func, ("missing",))])
+        with pytest.raises(ValueError):
+            StartupPipeline([StartupStage("a", stage_func, ("b",)), StartupStage("b", stage_func, ("a",))])
@@ -0,0 +1,102 @@
+"""Tests for the coalesced state write dispatcher."""
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.uiprotectalarms.pyuiprotectalarms import PyUIProtectAlarms
+from custom_components.uiprotectalarms.pyuiprotectalarms.pyuiprotectwebsocket import PyUIProtectWebsocket
+from custom_components.uiprotectalarms.statedispatcher import UIProtectAlarmsStateDispatcher
+from ..pyuiprotectalarms.synthetic import SyntheticConsole
+
+
+class FakeEntity:
+    """Stand-in entity that counts state writes."""
+
+    def __init__(self, hass) -> None:
+        self.hass = hass
+        self.writes = 0
+
+    def async_write_ha_state(self) -> None:
+        """Record a state write."""
+        self.writes += 1
+
+
+class TestStateDispatcher:
+    """Test marking entities dirty and flushing them."""
+
+    @pytest.mark.asyncio
+    async def test_marks_deduplicated_and_flushed_once(self):
+        """Test repeated marks from a thread result in one write per entity."""
+        hass = SimpleNamespace(loop=asyncio.get_running_loop())
+        dispatcher = UIProtectAlarmsStateDispatcher(hass)
+        entities = [FakeEntity(hass) for _ in range(10)]
+
+        def refresh():
+            for _ in range(3):
+                for entity in entities:
+                    dispatcher.mark_dirty(entity)
+
+        with patch.object(hass.loop, "call_soon_threadsafe", wraps=hass.loop.call_soon_threadsafe) as mock_schedule:
+            thread = threading.Thread(target=refresh)
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0)
+
+        assert mock_schedule.call_count == 1
+        assert [entity.writes for entity in entities] == [1] * 10
+
+    @pytest.mark.asyncio
+    async def test_batch_holds_writes(self):
+        """Test writes are held back until the batch ends."""
+        hass = SimpleNamespace(loop=asyncio.get_running_loop())
+        dispatcher = UIProtectAlarmsStateDispatcher(hass)
+        entity = FakeEntity(hass)
+
+        with dispatcher.batch():
+            dispatcher.mark_dirty(entity)
+            await asyncio.sleep(0)
+            assert entity.writes == 0
+
+        await asyncio.sleep(0)
+        assert entity.writes == 1
+
+    @pytest.mark.asyncio
+    async def test_removed_entity_skipped(self):
+        """Test an entity removed before the flush is not written."""
+        hass = SimpleNamespace(loop=asyncio.get_running_loop())
+        dispatcher = UIProtectAlarmsStateDispatcher(hass)
+        entity = FakeEntity(hass)
+
+        dispatcher.mark_dirty(entity)
+        entity.hass = None
+        await asyncio.sleep(0)
+
+        assert entity.writes == 0
+
+    @pytest.mark.asyncio
+    async def test_websocket_resync_flushed_once(self):
+        """Test a resync changing many automations from the executor is written in a single flush."""
+        hass = SimpleNamespace(loop=asyncio.get_running_loop())
+        flushes = []
+        dispatcher = UIProtectAlarmsStateDispatcher(hass, on_flush=lambda: flushes.append(None))
+        console = SyntheticConsole(automations=200, users=2)
+        manager = PyUIProtectAlarms("192.168.1.123", "USERNAME", "PASSWORD")
+        manager.call_uiprotect_api = console
+        manager.load_automations()
+
+        entities = []
+        for automation in manager.automations.values():
+            entity = FakeEntity(hass)
+            entities.append(entity)
+            automation.add_attr_callback(lambda entity=entity: dispatcher.mark_dirty(entity), ("enabled", "name"))
+        console.mutate(1.0)
+
+        websocket = PyUIProtectWebsocket(manager, session=None, url="unused", batch=dispatcher.batch)
+        await websocket._async_resync()  # pylint: disable=W0212
+        await asyncio.sleep(0)
+
+        assert len(flushes) == 1
+        assert [entity.writes for entity in entities] == [1] * len(entities)